@@ -13,6 +13,7 @@ import numpy as np
 import obspy
 import os
 from wfs_input_generator import rotations
+from wfs_input_generator.stores import StationTable
 
 EARTH_RADIUS = 6371 * 1000
 
@@ -295,30 +296,34 @@ def write(config, events, stations):
     # recfile
     # =========================================================================
 
+    stations = StationTable.from_stations(stations)
+    # Depth below the surface, negative depths are clipped to zero.
+    depths = -1.0 * (stations.elevation_in_m - stations.local_depth_in_m)
+    depths[depths < 0] = 0.0
     recfile_parts = []
-    for station in stations:
+    network_codes, station_codes = stations.seed_codes()
+    for station_id, network, station, station_lat, station_lng, depth in zip(
+            stations.ids, network_codes, station_codes,
+            stations.latitude.tolist(), stations.longitude.tolist(),
+            depths.tolist()):
         # Also rotate each station if desired.
         if config.rotation_angle_in_degree:
             lat, lng = rotations.rotate_lat_lon(
-                station["latitude"], station["longitude"],
+                station_lat, station_lng,
                 config.rotation_axis, config.rotation_angle_in_degree)
         else:
-            lat, lng = (station["latitude"], station["longitude"])
+            lat, lng = (station_lat, station_lng)
 
         # Check if the stations still lies within bounds of the mesh.
         if not _is_in_bounds(lat, lng, mesh):
             msg = "Stations %s is not in the domain. Will be skipped." % \
-                station["id"]
+                station_id
             print msg
             continue
 
-        depth = -1.0 * (station["elevation_in_m"] -
-                        station["local_depth_in_m"])
-        if depth < 0:
-            depth = 0.0
         recfile_parts.append("{network:_<2s}.{station:_<5s}.___".format(
-            network=station["id"].split(".")[0],
-            station=station["id"].split(".")[1]))
+            network=network,
+            station=station))
         recfile_parts.append(
             "{colatitude:.6f} {longitude:.6f} {depth:.1f}"
             .format(colatitude=rotations.lat2colat(float(lat)),
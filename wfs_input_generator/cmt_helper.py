@@ -0,0 +1,354 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Readers for the GCMT NDK format and for SPECFEM CMTSOLUTION files returning
+the event dictionaries needed for the wfs_input_generator and a writer for
+CMTSOLUTION files.
+
+Files are read in blocks of events and the fixed-width fields of each block
+are converted with NumPy all at once. No ObsPy objects are created and files
+of any size are streamed.
+
+Both formats give moment tensors in dyne * cm which are converted to N * m.
+The origin is the centroid, its time is the reference time plus the time
+shift of the centroid. Event ids are the same as the ones of ObsPy's readers.
+
+:copyright:
+    Lion Krischer (krischer@geophysik.uni-muenchen.de), 2013
+:license:
+    GNU General Public License, Version 3
+    (http://www.gnu.org/copyleft/gpl.html)
+"""
+import itertools
+import re
+
+import numpy as np
+import obspy
+from obspy.geodetics import FlinnEngdahl
+
+from wfs_input_generator.stores import event_columns
+
+# Number of events converted at once.
+BLOCK_SIZE = 1000
+
+# Columns of the first four lines of an NDK record as described in the
+# allorder.ndk_explained document of the GCMT project.
+_NDK_LINE_LENGTH = 80
+_NDK_DATE_TIME = [("year", 0, 5, 9), ("month", 0, 10, 12),
+                  ("day", 0, 13, 15), ("hour", 0, 16, 18),
+                  ("minute", 0, 19, 21), ("second", 0, 22, 26)]
+_NDK_CENTROID = [("centroid time", 2, 10, 18), ("latitude", 2, 22, 29),
+                 ("longitude", 2, 34, 42), ("depth", 2, 47, 53)]
+_NDK_EXPONENT = ("exponent", 3, 0, 2)
+# Each component is followed by its error.
+_NDK_TENSOR = [(_name, 3, 2 + 13 * _i, 9 + 13 * _i) for _i, _name in
+               enumerate(("m_rr", "m_tt", "m_pp", "m_rt", "m_rp", "m_tp"))]
+
+# Keys of the twelve lines following the first line of a CMTSOLUTION file.
+_CMTSOLUTION_KEYS = ["event name", "time shift", "half duration", "latitude",
+                     "longitude", "depth", "mrr", "mtt", "mpp", "mrt", "mrp",
+                     "mtp"]
+
+# The first line of a CMTSOLUTION file: The catalog, possibly fused with the
+# year as in "PDEW2015", followed by the date and time of the reference event.
+_CMTSOLUTION_HEADER = re.compile(
+    br"^\s*\S*?\s*(\d{4})\s+(\d{1,2})\s+(\d{1,2})\s+(\d{1,2})\s+(\d{1,2})"
+    br"\s+(\S+)")
+
+# Origin times are stored as 64 bit integer nanoseconds since 1970 which
+# cover the years 1678 to 2261.
+_MIN_YEAR, _MAX_YEAR = 1678, 2261
+_MAX_SECONDS = np.iinfo(np.int64).max / 1E9
+
+_TENSOR_KEYS = ["m_rr", "m_tt", "m_pp", "m_rt", "m_rp", "m_tp"]
+
+# The CMTSOLUTION files written for the SPECFEM solvers.
+CMTSOLUTION_TEMPLATE = (
+    "PDE {time_year} {time_month} {time_day} {time_hh} {time_mm} "
+    "{time_ss:.2f} {event_latitude:.5f} {event_longitude:.5f} "
+    "{event_depth:.5f} {event_mag:.1f} {event_mag:.1f} {event_name}\n"
+    "event name:      0000000\n"
+    "time shift:       0.0000\n"
+    "half duration:    {half_duration:.4f}\n"
+    "latitude:       {event_latitude:.5f}\n"
+    "longitude:      {event_longitude:.5f}\n"
+    "depth:{event_depth: 17.5f}\n"
+    "Mrr:         {mrr:.6g}\n"
+    "Mtt:         {mtt:.6g}\n"
+    "Mpp:         {mpp:.6g}\n"
+    "Mrt:         {mrt:.6g}\n"
+    "Mrp:         {mrp:.6g}\n"
+    "Mtp:         {mtp:.6g}")
+
+_FLINN_ENGDAHL = []
+
+
+def _region(latitude, longitude):
+    if not _FLINN_ENGDAHL:
+        _FLINN_ENGDAHL.append(FlinnEngdahl())
+    return _FLINN_ENGDAHL[0].get_region(longitude, latitude)
+
+
+def _open(filename_or_buf):
+    if hasattr(filename_or_buf, "read") and \
+            hasattr(filename_or_buf.read, "__call__"):
+        return filename_or_buf, False
+    return open(filename_or_buf, "rb"), True
+
+
+def _blocks(filename_or_buf, lines_per_event):
+    """
+    Generator yielding lists of the non-empty lines of up to BLOCK_SIZE
+    events.
+    """
+    fh, close = _open(filename_or_buf)
+    try:
+        lines = (_i.rstrip(b"\r\n") for _i in fh if _i.strip())
+        while True:
+            block = list(itertools.islice(
+                lines, BLOCK_SIZE * lines_per_event))
+            if not block:
+                break
+            if len(block) % lines_per_event:
+                msg = "%s does not consist of complete events with %i " \
+                    "lines each." % (filename_or_buf, lines_per_event)
+                raise ValueError(msg)
+            yield block
+    finally:
+        if close:
+            fh.close()
+
+
+def _float_column(column, name, filename_or_buf):
+    try:
+        return np.char.strip(column).astype(np.float64)
+    except ValueError:
+        msg = "Invalid %s in %s." % (name, filename_or_buf)
+        raise ValueError(msg)
+
+
+def _nanoseconds(year, month, day, hour, minute, second, filename_or_buf):
+    """
+    Nanoseconds since 1970 of arrays of date and time components. Seconds
+    may be 60 which occurs in NDK files.
+    """
+    year, month, day, hour, minute = [np.asarray(_i, dtype=np.int64) for _i
+                                      in (year, month, day, hour, minute)]
+    second = np.asarray(second, dtype=np.float64)
+    if ((year < _MIN_YEAR) | (year > _MAX_YEAR)).any():
+        msg = "Invalid year in %s. Only the years %i to %i are supported." % (
+            filename_or_buf, _MIN_YEAR, _MAX_YEAR)
+        raise ValueError(msg)
+    if ((month < 1) | (month > 12) | (day < 1) | (day > 31) | (hour < 0) |
+            (hour > 23) | (minute < 0) | (minute > 59) | (second < 0) |
+            (second > 60)).any():
+        msg = "Invalid date or time in %s." % filename_or_buf
+        raise ValueError(msg)
+    days = ((year - 1970) * 12 + month - 1).astype("datetime64[M]").astype(
+        "datetime64[D]").astype(np.int64) + day - 1
+    seconds = days * 86400 + hour * 3600 + minute * 60
+    if (np.abs(seconds + second) >= _MAX_SECONDS).any():
+        msg = "Invalid date or time in %s." % filename_or_buf
+        raise ValueError(msg)
+    return seconds * 1000000000 + np.round(second * 1E9).astype(np.int64)
+
+
+def _events(event_ids, ns, latitude, longitude, depth_in_km, tensor,
+            descriptions, id_filter):
+    """
+    Event dictionaries from columns. tensor is a list of the six component
+    columns in N * m.
+    """
+    if id_filter is not None:
+        mask = np.array([bool(id_filter(_i)) for _i in event_ids],
+                        dtype=bool)
+        event_ids = [_i for _i, keep in zip(event_ids, mask) if keep]
+        descriptions = [_i for _i, keep in zip(descriptions, mask) if keep]
+        ns, latitude, longitude, depth_in_km = [
+            _i[mask] for _i in (ns, latitude, longitude, depth_in_km)]
+        tensor = [_i[mask] for _i in tensor]
+    columns = [latitude.tolist(), longitude.tolist(), depth_in_km.tolist(),
+               [obspy.UTCDateTime(ns=_i) for _i in ns.tolist()]] + \
+        [_i.tolist() for _i in tensor] + [event_ids, descriptions]
+    keys = ["latitude", "longitude", "depth_in_km", "origin_time"] + \
+        _TENSOR_KEYS + ["_event_id", "description"]
+    return [dict(zip(keys, _i)) for _i in zip(*columns)]
+
+
+def iter_events_from_NDK(filename_or_buf, id_filter=None):
+    """
+    Generator yielding the event dictionaries of a GCMT NDK file.
+
+    :type filename_or_buf: str or file-like object
+    :param filename_or_buf: The filename or an open file-like object.
+    :type id_filter: function
+    :param id_filter: Optional function taking an event id and returning
+        False for events that are to be skipped.
+    """
+    for block in _blocks(filename_or_buf, 5):
+        # The first four lines of all records as an array of characters.
+        count = len(block) // 5
+        chars = np.frombuffer(b"".join(
+            line[:_NDK_LINE_LENGTH].ljust(_NDK_LINE_LENGTH)
+            for _i, line in enumerate(block) if _i % 5 != 4),
+            dtype="S1").reshape(count, 4, _NDK_LINE_LENGTH)
+
+        def _field(line, start, stop):
+            return chars[:, line, start:stop].copy().view(
+                "S%i" % (stop - start)).ravel()
+
+        if (_field(2, 0, 9) != b"CENTROID:").any():
+            msg = "Invalid NDK record in %s." % filename_or_buf
+            raise ValueError(msg)
+        values = dict(
+            (_i[0], _float_column(_field(*_i[1:]), _i[0], filename_or_buf))
+            for _i in _NDK_DATE_TIME + _NDK_CENTROID)
+        ns = _nanoseconds(*[values[_i[0]] for _i in _NDK_DATE_TIME],
+                          filename_or_buf=filename_or_buf) + \
+            np.round(values["centroid time"] * 1E9).astype(np.int64)
+
+        # The exponent converts to dyne * cm. It is applied to the strings
+        # so that no additional rounding errors are introduced.
+        exponent = _float_column(_field(*_NDK_EXPONENT[1:]),
+                                 _NDK_EXPONENT[0], filename_or_buf)
+        exponent = np.char.mod(b"E%i", exponent.astype(np.int64) - 7)
+        tensor = [_float_column(np.char.add(np.char.strip(_field(*_i[1:])),
+                                            exponent), _i[0],
+                                filename_or_buf) for _i in _NDK_TENSOR]
+
+        names = [_i.strip() for _i in _field(1, 0, 16).tolist()]
+        latitude, longitude = values["latitude"], values["longitude"]
+        # Same as ObsPy: The Flinn-Engdahl region of the centroid and the
+        # name.
+        descriptions = ["%s, %s" % (_region(lat, lng), name) for lat, lng,
+                        name in zip(latitude.tolist(), longitude.tolist(),
+                                    names)]
+        for event in _events(
+                ["smi:local/ndk/%s/event" % _i for _i in names], ns,
+                latitude, longitude, values["depth"], tensor, descriptions,
+                id_filter):
+            yield event
+
+
+def extract_events_from_NDK(filename_or_buf, id_filter=None):
+    """
+    Returns a list of event dictionaries, one for each event in the NDK file.
+    """
+    return list(iter_events_from_NDK(filename_or_buf, id_filter))
+
+
+def iter_events_from_CMTSOLUTION(filename_or_buf, id_filter=None):
+    """
+    Generator yielding the event dictionaries of a CMTSOLUTION file with one
+    or more events.
+
+    :type filename_or_buf: str or file-like object
+    :param filename_or_buf: The filename or an open file-like object.
+    :type id_filter: function
+    :param id_filter: Optional function taking an event id and returning
+        False for events that are to be skipped.
+    """
+    for block in _blocks(filename_or_buf, 13):
+        count = len(block) // 13
+        # The first line has the catalog followed by the date and time.
+        date_time = [_CMTSOLUTION_HEADER.match(_i) for _i in block[::13]]
+        if None in date_time:
+            msg = "Invalid CMTSOLUTION header line in %s." % filename_or_buf
+            raise ValueError(msg)
+        date_time = [_i.groups() for _i in date_time]
+        date_time = [_float_column(np.array(_i, dtype=np.bytes_), name,
+                                   filename_or_buf)
+                     for _i, name in zip(zip(*date_time), (
+                         "year", "month", "day", "hour", "minute",
+                         "second"))]
+
+        # All others are "key: value" lines.
+        keys, _, fields = zip(*[line.partition(b":") for _i, line in
+                                enumerate(block) if _i % 13])
+        keys = np.char.lower(np.char.strip(np.array(keys, dtype=np.bytes_)))
+        if (keys.reshape(count, 12) != [_CMTSOLUTION_KEYS]).any():
+            msg = "Invalid CMTSOLUTION file %s." % filename_or_buf
+            raise ValueError(msg)
+        fields = np.array(fields, dtype=np.bytes_).reshape(count, 12)
+        values = dict((key, _float_column(fields[:, _i], key,
+                                          filename_or_buf))
+                      for _i, key in enumerate(_CMTSOLUTION_KEYS)
+                      if key != "event name")
+
+        ns = _nanoseconds(*date_time, filename_or_buf=filename_or_buf) + \
+            np.round(values["time shift"] * 1E9).astype(np.int64)
+        names = [_i.strip() for _i in fields[:, 0].tolist()]
+        # Convert to N * m.
+        tensor = [values[_i] / 1E7
+                  for _i in ("mrr", "mtt", "mpp", "mrt", "mrp", "mtp")]
+        for event in _events(
+                ["smi:local/cmtsolution/%s/event" % _i for _i in names],
+                ns, values["latitude"], values["longitude"],
+                values["depth"], tensor, names, id_filter):
+            yield event
+
+
+def extract_events_from_CMTSOLUTION(filename_or_buf, id_filter=None):
+    """
+    Returns a list of event dictionaries, one for each event in the
+    CMTSOLUTION file.
+    """
+    return list(iter_events_from_CMTSOLUTION(filename_or_buf, id_filter))
+
+
+def _header_magnitudes(m_rr, m_tt, m_pp):
+    """
+    The magnitudes written to the header line of CMTSOLUTION files. Only
+    the diagonal of the moment tensor is used. Kept as is so the files stay
+    the same, see :func:`~wfs_input_generator.stores.moment_magnitudes` for
+    actual moment magnitudes.
+    """
+    m_0 = 1.0 / np.sqrt(2.0) * np.sqrt(m_rr ** 2 + m_tt ** 2 + m_pp ** 2)
+    with np.errstate(divide="ignore"):
+        return 2.0 / 3.0 * np.log10(m_0) - 6.0
+
+
+def render_CMTSOLUTIONs(events, template=CMTSOLUTION_TEMPLATE):
+    """
+    Returns the contents of one CMTSOLUTION file for each event. All values
+    are computed for all events at once, only the final formatting is done
+    per event.
+
+    :type events: list of dict or
+        :class:`~wfs_input_generator.stores.EventStore`
+    :param events: The events.
+    """
+    columns = event_columns(events)
+    # Origin times rounded to microseconds like UTCDateTime does.
+    times = ((columns["origin_time_ns"] + 500) // 1000).astype(
+        "datetime64[us]")
+    microseconds = times.astype(np.int64)
+    days = times.astype("datetime64[D]")
+    months = times.astype("datetime64[M]")
+    seconds_of_day = (microseconds - days.astype("datetime64[us]").astype(
+        np.int64)) // 1000000
+    magnitudes = _header_magnitudes(columns["m_rr"], columns["m_tt"],
+                                    columns["m_pp"])
+    names = [u"%sZ_%.1f" % _i for _i in zip(
+        np.datetime_as_string(times).tolist(), magnitudes.tolist())]
+
+    fields = {
+        "time_year": times.astype("datetime64[Y]").astype(np.int64) + 1970,
+        "time_month": months.astype(np.int64) % 12 + 1,
+        "time_day": (days - months.astype("datetime64[D]")).astype(
+            np.int64) + 1,
+        "time_hh": seconds_of_day // 3600,
+        "time_mm": seconds_of_day // 60 % 60,
+        "time_ss": seconds_of_day % 60 + microseconds % 1000000 / 1E6,
+        "event_mag": magnitudes,
+        "event_latitude": columns["latitude"],
+        "event_longitude": columns["longitude"],
+        "event_depth": columns["depth_in_km"],
+        "half_duration": np.zeros(len(magnitudes))}
+    # Convert to dyne * cm.
+    for key in _TENSOR_KEYS:
+        fields[key.replace("_", "")] = columns[key] * 1E7
+    keys = list(fields.keys())
+    return [template.format(event_name=name, **dict(zip(keys, _i)))
+            for name, _i in zip(names, zip(*[fields[_j].tolist()
+                                             for _j in keys]))]
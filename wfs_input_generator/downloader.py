@@ -0,0 +1,215 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Concurrent downloading of station and event files.
+
+A bounded pool of threads fetches all URLs. Every thread keeps one
+persistent HTTP/1.1 connection per host, each request has a timeout and
+failed requests are retried with an exponential backoff. Responses can
+optionally be cached on disk.
+
+:copyright:
+    Lion Krischer (krischer@geophysik.uni-muenchen.de), 2013
+:license:
+    GNU General Public License, Version 3
+    (http://www.gnu.org/copyleft/gpl.html)
+"""
+import httplib
+import Queue
+import socket
+import threading
+import time
+import urllib2
+import urlparse
+
+# Default settings for download_urls().
+MAX_CONNECTIONS = 8
+TIMEOUT_IN_S = 30.0
+RETRIES = 3
+BACKOFF_IN_S = 0.5
+MAX_REDIRECTS = 5
+
+_REDIRECT_CODES = (301, 302, 303, 307, 308)
+
+
+class _TransientError(Exception):
+    """
+    Errors that might go away when trying again.
+    """
+    pass
+
+
+class _ConnectionPool(object):
+    """
+    Persistent connections, one per host. Not thread safe, every thread has
+    its own pool.
+    """
+    def __init__(self, timeout):
+        self.timeout = timeout
+        self._connections = {}
+
+    def get(self, scheme, netloc):
+        key = (scheme, netloc)
+        if key not in self._connections:
+            cls = httplib.HTTPSConnection if scheme == "https" else \
+                httplib.HTTPConnection
+            self._connections[key] = cls(netloc, timeout=self.timeout)
+        return self._connections[key]
+
+    def discard(self, scheme, netloc):
+        connection = self._connections.pop((scheme, netloc), None)
+        if connection is not None:
+            connection.close()
+
+    def close(self):
+        for connection in self._connections.values():
+            connection.close()
+        self._connections.clear()
+
+
+def _fetch(pool, url, headers=None, redirects=MAX_REDIRECTS):
+    """
+    Fetch a single URL once. Raises _TransientError for errors worth a
+    retry.
+
+    Returns a tuple of the HTTP status code, a dictionary with the lower case
+    response headers and the content.
+    """
+    parts = urlparse.urlsplit(url)
+    # Anything but HTTP is handed to urllib2.
+    if parts.scheme not in ("http", "https"):
+        try:
+            return 200, {}, urllib2.urlopen(url, timeout=pool.timeout).read()
+        except (urllib2.URLError, socket.error) as e:
+            raise _TransientError(str(e))
+
+    path = parts.path or "/"
+    if parts.query:
+        path += "?" + parts.query
+    connection = pool.get(parts.scheme, parts.netloc)
+    try:
+        connection.request("GET", path, headers=headers or {})
+        response = connection.getresponse()
+        data = response.read()
+    except (httplib.HTTPException, socket.error) as e:
+        # The connection is in an unknown state.
+        pool.discard(parts.scheme, parts.netloc)
+        raise _TransientError("%s: %s" % (e.__class__.__name__, str(e)))
+
+    if response.status in _REDIRECT_CODES:
+        location = response.getheader("location")
+        if not location or redirects <= 0:
+            msg = "Too many or invalid redirects for %s." % url
+            raise ValueError(msg)
+        return _fetch(pool, urlparse.urljoin(url, location), headers,
+                      redirects - 1)
+    msg = "HTTP Error %i: %s" % (response.status, response.reason)
+    if response.status >= 500:
+        raise _TransientError(msg)
+    elif response.status >= 400:
+        raise ValueError(msg)
+    return response.status, dict(response.getheaders()), data
+
+
+def _fetch_with_retries(pool, url, retries, backoff, headers=None):
+    attempt = 0
+    while True:
+        try:
+            return _fetch(pool, url, headers=headers)
+        except _TransientError:
+            if attempt >= retries:
+                raise
+            time.sleep(backoff * 2 ** attempt)
+            attempt += 1
+
+
+def _download(pool, url, retries, backoff, cache):
+    """
+    Download a single URL, using and updating the cache if one is given.
+    """
+    if cache is None:
+        return _fetch_with_retries(pool, url, retries, backoff)[2]
+
+    entry = cache.get(url)
+    if entry is not None and (cache.offline or cache.is_fresh(entry)):
+        return entry.data
+    if cache.offline:
+        msg = "Not in the cache and the cache is offline."
+        raise ValueError(msg)
+
+    # Revalidate stale entries if possible.
+    headers = entry.validators if entry is not None else None
+    status, response_headers, data = _fetch_with_retries(
+        pool, url, retries, backoff, headers=headers)
+    if status == 304 and entry is not None:
+        return cache.revalidated(entry).data
+    cache.store(url, data, etag=response_headers.get("etag"),
+                last_modified=response_headers.get("last-modified"))
+    return data
+
+
+def download_urls(urls, max_connections=MAX_CONNECTIONS,
+                  timeout=TIMEOUT_IN_S, retries=RETRIES,
+                  backoff=BACKOFF_IN_S, cache=None):
+    """
+    Download all URLs concurrently and return their contents in the order of
+    the input. Each distinct URL is only downloaded once.
+
+    Raises a ValueError listing all URLs that could not be downloaded.
+
+    :type urls: list of str
+    :param urls: The URLs to fetch.
+    :type max_connections: int
+    :param max_connections: The maximum number of concurrent downloads.
+    :type timeout: float
+    :param timeout: Timeout in seconds for every single request.
+    :type retries: int
+    :param retries: How often a request is repeated after a connection error,
+        a timeout or a server side (5xx) error.
+    :type backoff: float
+    :param backoff: Seconds to wait before the first retry. Doubled for each
+        further retry.
+    :type cache: :class:`~wfs_input_generator.http_cache.HTTPCache`
+    :param cache: If given, fresh cached responses are used without any
+        network access, stale ones are revalidated and all downloads are
+        stored in it.
+    """
+    urls = list(urls)
+    unique_urls = list(set(urls))
+    results = {}
+    errors = {}
+    queue = Queue.Queue()
+    for url in unique_urls:
+        queue.put(url)
+
+    def work():
+        pool = _ConnectionPool(timeout=timeout)
+        try:
+            while True:
+                try:
+                    url = queue.get_nowait()
+                except Queue.Empty:
+                    return
+                try:
+                    results[url] = _download(pool, url, retries, backoff,
+                                             cache)
+                except _TransientError as e:
+                    errors[url] = str(e)
+                except Exception as e:
+                    errors[url] = "%s: %s" % (e.__class__.__name__, str(e))
+        finally:
+            pool.close()
+
+    threads = [threading.Thread(target=work) for _ in
+               range(max(1, min(max_connections, len(unique_urls))))]
+    for thread in threads:
+        thread.daemon = True
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    if errors:
+        msg = "Could not download %i URL(s):\n%s" % (len(errors), "\n".join(
+            "\t%s: %s" % (url, errors[url]) for url in sorted(errors)))
+        raise ValueError(msg)
+    return [results[_i] for _i in urls]
@@ -0,0 +1,145 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+A reader for the pipe separated text format of FDSN station web services at
+the station and the channel level.
+
+All columns are converted at once with NumPy and the result is a
+:class:`~wfs_input_generator.stores.StationTable`, so no dictionary is ever
+created per station. Stations appearing in several rows, e.g. for several
+epochs or channels, result in a single station of the latest epoch.
+
+:copyright:
+    Lion Krischer (krischer@geophysik.uni-muenchen.de), 2013
+:license:
+    GNU General Public License, Version 3
+    (http://www.gnu.org/copyleft/gpl.html)
+"""
+import numpy as np
+
+from wfs_input_generator.stores import StationTable
+
+# The columns of both levels.
+STATION_COLUMNS = ["network", "station", "latitude", "longitude",
+                   "elevation", "sitename", "starttime", "endtime"]
+CHANNEL_COLUMNS = ["network", "station", "location", "channel", "latitude",
+                   "longitude", "elevation", "depth", "azimuth", "dip",
+                   "sensordescription", "scale", "scalefreq", "scaleunits",
+                   "samplerate", "starttime", "endtime"]
+
+
+def _float_column(column, name, filename_or_buf, optional=False):
+    column = np.char.strip(column)
+    empty = column == b""
+    if empty.any():
+        if not optional:
+            msg = "Missing %s in %s." % (name, filename_or_buf)
+            raise ValueError(msg)
+        column = np.where(empty, b"nan", column)
+    try:
+        return column.astype(np.float64)
+    except ValueError:
+        msg = "Invalid %s in %s." % (name, filename_or_buf)
+        raise ValueError(msg)
+
+
+def _latest_rows(ids, endtime):
+    """
+    Indices of a single row per station id in the order of their first
+    appearance. The row with the latest end time is chosen, open epochs
+    without an end time are the latest. Of several rows with the same end
+    time the first one is chosen.
+    """
+    # All times of a file have the same format so the strings can be
+    # compared directly.
+    endtime = np.char.strip(endtime).astype("S19")
+    endtime[endtime == b""] = b"9999-12-31T23:59:59"
+    rank = np.unique(endtime, return_inverse=True)[1]
+    rows = np.arange(len(ids))
+    order = np.lexsort((rows, -rank, ids))
+    sorted_ids = ids[order]
+    chosen = order[np.concatenate(([True], sorted_ids[1:] !=
+                                   sorted_ids[:-1]))]
+    first_rows = np.unique(ids, return_index=True)[1]
+    return chosen[np.argsort(first_rows)]
+
+
+def read_FDSN_text(filename_or_buf, id_filter=None):
+    """
+    Reads a FDSN station text file at the station or channel level and
+    returns a StationTable.
+
+    Each station is added once. Of several epochs of a station the one with
+    the latest end time is used and open epochs are the latest. Channel
+    level files contain every channel of a station. The coordinates and the
+    depth of the first channel of the latest epoch of each station are used,
+    the same as for SEED files. Stations lack a local depth at the station
+    level.
+
+    Rows of stations for which the optional function id_filter returns
+    False are dropped before any coordinate is converted.
+    """
+    if hasattr(filename_or_buf, "read") and \
+            hasattr(filename_or_buf.read, "__call__"):
+        data = filename_or_buf.read()
+    else:
+        with open(filename_or_buf, "rb") as fh:
+            data = fh.read()
+
+    lines = data.splitlines()
+    header = [_i.strip().lower() for _i in
+              lines[0].lstrip().lstrip(b"#").split(b"|")] if lines else []
+    if header == STATION_COLUMNS:
+        columns = STATION_COLUMNS
+    elif header == CHANNEL_COLUMNS:
+        columns = CHANNEL_COLUMNS
+    else:
+        msg = ("%s is not a FDSN station text file at the station or channel "
+               "level." % filename_or_buf)
+        raise ValueError(msg)
+
+    needed = ["network", "station", "latitude", "longitude", "elevation",
+              "endtime"]
+    if columns is CHANNEL_COLUMNS:
+        needed.append("depth")
+    count = len(columns)
+    rows = [_i.split(b"|", count - 1) for _i in lines[1:]
+            if _i.strip() and not _i.lstrip().startswith(b"#")]
+    table = StationTable()
+    if not rows:
+        return table
+    if any(len(_i) != count for _i in rows):
+        msg = "Rows with a wrong number of columns in %s." % filename_or_buf
+        raise ValueError(msg)
+    values = dict((name, np.array(column, dtype=np.bytes_))
+                  for name, column in zip(columns, zip(*rows))
+                  if name in needed)
+
+    ids = np.char.add(np.char.add(np.char.strip(values["network"]), b"."),
+                      np.char.strip(values["station"]))
+    if id_filter is not None:
+        keep = np.array([bool(id_filter(_i)) for _i in ids.tolist()],
+                        dtype=bool)
+        ids = ids[keep]
+        values = dict((name, column[keep])
+                      for name, column in values.items())
+    if not len(ids):
+        return table
+    # A single row per station.
+    latest = _latest_rows(ids, values["endtime"])
+    ids = ids[latest]
+    values = dict((name, column[latest]) for name, column in values.items())
+    latitude = _float_column(values["latitude"], "latitude", filename_or_buf)
+    longitude = _float_column(values["longitude"], "longitude",
+                              filename_or_buf)
+    elevation = _float_column(values["elevation"], "elevation",
+                              filename_or_buf)
+    if columns is CHANNEL_COLUMNS:
+        depth = _float_column(values["depth"], "depth", filename_or_buf,
+                              optional=True)
+        depth[np.isnan(depth)] = 0.0
+    else:
+        depth = None
+
+    table.add_columns(ids.tolist(), latitude, longitude, elevation, depth)
+    return table
@@ -0,0 +1,125 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Lazy expansion of directories and glob patterns into filenames.
+
+Python's glob module neither supports recursive ``**`` patterns nor works
+lazily, it always builds the full list of matches. The functions here walk
+the file system and yield one filename after another instead.
+
+:copyright:
+    Lion Krischer (krischer@geophysik.uni-muenchen.de), 2013
+:license:
+    GNU General Public License, Version 3
+    (http://www.gnu.org/copyleft/gpl.html)
+"""
+import glob
+import os
+import re
+
+
+def is_path_pattern(item):
+    """
+    True if item is a string that names an existing directory or is a glob
+    pattern not naming an existing file.
+
+    >>> is_path_pattern("/")
+    True
+    >>> is_path_pattern("inventory/**/*.xml")
+    True
+    >>> is_path_pattern("http://some_url.com/*")
+    False
+    """
+    if not isinstance(item, basestring) or "://" in item:
+        return False
+    if os.path.isdir(item):
+        return True
+    return glob.has_magic(item) and not os.path.exists(item)
+
+
+def _translate(part):
+    """
+    Translates a single path component with shell wildcards to a regular
+    expression never matching a path separator.
+    """
+    regex = ""
+    index = 0
+    while index < len(part):
+        char = part[index]
+        index += 1
+        if char == "*":
+            regex += "[^/]*"
+        elif char == "?":
+            regex += "[^/]"
+        elif char == "[":
+            end = part.find("]", index + 1 if part[index:index + 1] in
+                            ("!", "]") else index)
+            if end == -1:
+                regex += "\\["
+                continue
+            content = part[index:end].replace("\\", "\\\\")
+            if content.startswith("!"):
+                content = "^" + content[1:]
+            regex += "[%s]" % content
+            index = end + 1
+        else:
+            regex += re.escape(char)
+    return regex
+
+
+def iter_files(path_or_pattern):
+    """
+    Yields all files in a directory and all of its subdirectories or all
+    files matching a glob pattern in which ``**`` matches any number of
+    directories. Hidden files and directories are only matched by patterns
+    explicitly starting with a dot.
+
+    The file system is walked lazily in sorted order, nothing but the
+    current directory listing is kept in memory.
+    """
+    if os.path.isdir(path_or_pattern):
+        path_or_pattern = os.path.join(path_or_pattern, "**", "*")
+    parts = path_or_pattern.split(os.sep)
+
+    # Everything up to the first component with wildcards is the fixed
+    # directory to start the walk in.
+    index = 0
+    while index < len(parts) - 1 and not glob.has_magic(parts[index]):
+        index += 1
+    base = os.sep.join(parts[:index])
+    if not base and path_or_pattern.startswith(os.sep):
+        base = os.sep
+    parts = parts[index:]
+    if parts[-1] == "**":
+        parts.append("*")
+
+    regex = ""
+    for index, part in enumerate(parts):
+        if part == "**":
+            regex += "(?:[^/.][^/]*/)*"
+            continue
+        if not part.startswith("."):
+            regex += "(?!\\.)"
+        regex += _translate(part)
+        if index < len(parts) - 1:
+            regex += "/"
+    regex = re.compile(regex + "\\Z")
+    # Without ** only files exactly this many directories deep can match.
+    max_depth = None if "**" in parts else len(parts) - 1
+
+    start = base or os.curdir
+    for dirpath, dirnames, filenames in os.walk(start):
+        relative = os.path.relpath(dirpath, start)
+        relative = "" if relative == os.curdir else \
+            relative.replace(os.sep, "/") + "/"
+        depth = relative.count("/")
+        if max_depth is not None and depth >= max_depth:
+            del dirnames[:]
+        else:
+            dirnames.sort()
+        if max_depth is not None and depth != max_depth:
+            continue
+        for filename in sorted(filenames):
+            if regex.match(relative + filename):
+                yield os.path.join(base, relative, filename) if base else \
+                    os.path.join(relative, filename)
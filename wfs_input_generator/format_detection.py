@@ -0,0 +1,219 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Cheap detection of the file formats the input file generator can read.
+
+Each format has a sniffer which decides from the first few kilobytes of a file
+whether the file is of that format or not. Nothing is parsed beyond that, so
+every input is only read once by the actual parser.
+
+New formats can be added with :func:`register_sniffer`.
+
+:copyright:
+    Lion Krischer (krischer@geophysik.uni-muenchen.de), 2013
+:license:
+    GNU General Public License, Version 3
+    (http://www.gnu.org/copyleft/gpl.html)
+"""
+import collections
+import re
+import struct
+
+# Number of bytes handed to the sniffers.
+SNIFF_SIZE = 4096
+
+# Name => sniffer function. Tried in order.
+_SNIFFERS = collections.OrderedDict()
+
+# Matches the first element tag of an XML document after the optional XML
+# declaration, processing instructions, comments and a doctype.
+_XML_ROOT_PATTERN = re.compile(
+    br"^\s*(?:<\?.*?\?>\s*|<!--.*?-->\s*|<!DOCTYPE[^>]*>\s*)*"
+    br"<([A-Za-z_][\w.\-]*:)?([A-Za-z_][\w.\-]*)([^>]*)>", re.DOTALL)
+_XML_NAMESPACE_PATTERN = br"""xmlns%s\s*=\s*["']([^"']*)["']"""
+# The first line of NDK records: The catalog and the date of the reference
+# event.
+_NDK_PATTERN = re.compile(br"^.{4} \d{4}/\d{2}/\d{2} ")
+# The header line of FDSN station text files.
+_FDSN_TEXT_PATTERN = re.compile(br"^\s*#\s*network\s*\|\s*station\s*\|",
+                                re.IGNORECASE)
+# The start of a JSON object or of an array of values.
+_JSON_PATTERN = re.compile(br"^(?:\{\s*[\"}]|\[\s*[\[{\"\]\-\dtfn])")
+
+
+def register_sniffer(name, sniffer, first=False):
+    """
+    Register a new format.
+
+    :type name: str
+    :param name: The name of the format. Replaces any existing sniffer of the
+        same name.
+    :type sniffer: function
+    :param sniffer: Function taking the first bytes of a file and returning
+        True if they belong to the format.
+    :type first: bool
+    :param first: Try the new sniffer before all others.
+    """
+    _SNIFFERS.pop(name, None)
+    _SNIFFERS[name] = sniffer
+    if first:
+        for other in list(_SNIFFERS.keys()):
+            if other != name:
+                _SNIFFERS[other] = _SNIFFERS.pop(other)
+
+
+def sniff_format(head):
+    """
+    Returns the name of the format of the given bytes or None if it cannot be
+    determined.
+    """
+    for name, sniffer in _SNIFFERS.items():
+        try:
+            if sniffer(head):
+                return name
+        except:
+            continue
+    return None
+
+
+def read_head(item, size=SNIFF_SIZE):
+    """
+    Reads the first bytes of a filename or an open file-like object. The
+    position of file-like objects is restored afterwards.
+    """
+    if hasattr(item, "read") and hasattr(item.read, "__call__"):
+        position = item.tell()
+        try:
+            return item.read(size)
+        finally:
+            item.seek(position, 0)
+    with open(item, "rb") as fh:
+        return fh.read(size)
+
+
+def detect_format(item):
+    """
+    Determine the format of a filename or file-like object. Returns None for
+    unknown formats.
+    """
+    return sniff_format(read_head(item))
+
+
+def xml_root(head):
+    """
+    Returns the local name and the namespace of the root element or
+    (None, None) if head does not start like an XML document.
+
+    >>> xml_root(b'<?xml version="1.0"?><a:b xmlns:a="http://c"/>')
+    ('b', 'http://c')
+    >>> xml_root(b'<root>')
+    ('root', None)
+    >>> xml_root(b'Some text')
+    (None, None)
+    """
+    # Skip a potential UTF-8 byte order mark.
+    if head.startswith(b"\xef\xbb\xbf"):
+        head = head[3:]
+    match = _XML_ROOT_PATTERN.match(head)
+    if match is None:
+        return None, None
+    prefix, tag, attributes = match.groups()
+    prefix = b":" + prefix[:-1] if prefix else b""
+    namespace = re.search(_XML_NAMESPACE_PATTERN % re.escape(prefix),
+                          attributes)
+    return tag, namespace.group(1) if namespace else None
+
+
+def is_json(head):
+    """
+    JSON objects and arrays. The opening bracket has to be followed by the
+    start of a key or a value, a single brace could just as well be the
+    first byte of a binary file.
+
+    >>> is_json(b'  {"id": "BW.FURT"}')
+    True
+    >>> is_json(b'{\xc7T<')
+    False
+    """
+    head = head.lstrip()
+    if head.startswith(b"\xef\xbb\xbf"):
+        head = head[3:].lstrip()
+    return _JSON_PATTERN.match(head) is not None
+
+
+def is_fdsn_text(head):
+    """
+    FDSN station text files at any level start with a commented header line.
+    """
+    return _FDSN_TEXT_PATTERN.match(head) is not None
+
+
+def is_sac(head):
+    """
+    Binary SAC files in either byte order. The header version (nvhdr) has to
+    be 6.
+    """
+    if len(head) < 632:
+        return False
+    return 6 in (struct.unpack(b"<i", head[304:308])[0],
+                 struct.unpack(b">i", head[304:308])[0])
+
+
+def is_seed(head):
+    """
+    Binary (dataless) SEED volumes. Every logical record starts with a six
+    digit sequence number, the record type and the continuation flag. The
+    first record of a volume contains a volume control blockette.
+    """
+    return len(head) >= 11 and head[:6].isdigit() and \
+        head[6:7] == b"V" and head[7:8] in (b" ", b"*") and \
+        head[8:11] in (b"005", b"008", b"010")
+
+
+def is_xseed(head):
+    return xml_root(head)[0] == "xseed"
+
+
+def is_stationxml(head):
+    tag, namespace = xml_root(head)
+    return tag == "FDSNStationXML" and \
+        (namespace or "").startswith("http://www.fdsn.org/xml/station/")
+
+
+def is_quakeml(head):
+    tag, namespace = xml_root(head)
+    return tag == "quakeml" and \
+        (namespace or "").startswith("http://quakeml.org/xmlns/quakeml/")
+
+
+def is_ndk(head):
+    """
+    GCMT NDK files. Records have five lines, the third one starts with the
+    centroid parameters.
+    """
+    lines = head.lstrip(b"\r\n").splitlines()
+    return len(lines) >= 3 and _NDK_PATTERN.match(lines[0]) is not None and \
+        lines[2].startswith(b"CENTROID:")
+
+
+def is_cmtsolution(head):
+    """
+    CMTSOLUTION files. The line with the reference event is followed by the
+    event name and the time shift.
+    """
+    lines = head.lstrip(b"\r\n").splitlines()
+    return len(lines) >= 3 and [
+        _i.partition(b":")[0].strip().lower() for _i in lines[1:3]] == \
+        [b"event name", b"time shift"]
+
+
+# The binary formats are tried first, their headers are checked more strictly.
+register_sniffer("sac", is_sac)
+register_sniffer("seed", is_seed)
+register_sniffer("json", is_json)
+register_sniffer("fdsn_text", is_fdsn_text)
+register_sniffer("xseed", is_xseed)
+register_sniffer("stationxml", is_stationxml)
+register_sniffer("quakeml", is_quakeml)
+register_sniffer("ndk", is_ndk)
+register_sniffer("cmtsolution", is_cmtsolution)
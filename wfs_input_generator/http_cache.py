@@ -0,0 +1,214 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+A persistent on-disk cache for downloaded station and event files.
+
+Every URL is stored as two files in the cache directory, the raw content and
+a small JSON document with the metadata needed for expiration, revalidation
+and the least recently used eviction.
+
+:copyright:
+    Lion Krischer (krischer@geophysik.uni-muenchen.de), 2013
+:license:
+    GNU General Public License, Version 3
+    (http://www.gnu.org/copyleft/gpl.html)
+"""
+import glob
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+
+
+class CacheEntry(object):
+    """
+    A single cached response.
+    """
+    def __init__(self, url, data, etag=None, last_modified=None,
+                 fetched_at=None, last_access=None):
+        self.url = url
+        self.data = data
+        self.etag = etag
+        self.last_modified = last_modified
+        self.fetched_at = time.time() if fetched_at is None else fetched_at
+        self.last_access = self.fetched_at if last_access is None \
+            else last_access
+
+    @property
+    def validators(self):
+        """
+        Headers for a conditional request revalidating this entry.
+        """
+        headers = {}
+        if self.etag:
+            headers["If-None-Match"] = self.etag
+        if self.last_modified:
+            headers["If-Modified-Since"] = self.last_modified
+        return headers
+
+
+class HTTPCache(object):
+    """
+    Caches downloaded files keyed by their URL.
+
+    :type directory: str
+    :param directory: The cache directory. Will be created if necessary.
+    :type ttl_in_s: float
+    :param ttl_in_s: Entries younger than this are used without contacting
+        the server. Older ones are revalidated with their ETag or
+        Last-Modified header if the server sent one and downloaded again
+        otherwise.
+    :type max_size_in_bytes: int
+    :param max_size_in_bytes: The least recently used entries are removed
+        once the total size of the cached content exceeds this.
+    :type offline: bool
+    :param offline: Never access the network. Cached entries are used no
+        matter their age and all other URLs fail.
+    """
+    def __init__(self, directory, ttl_in_s=24 * 3600.0,
+                 max_size_in_bytes=1024 ** 3, offline=False):
+        self.directory = os.path.abspath(os.path.expanduser(directory))
+        self.ttl_in_s = ttl_in_s
+        self.max_size_in_bytes = max_size_in_bytes
+        self.offline = offline
+        self._lock = threading.Lock()
+        # URL => (last access, size) of all entries. Loaded on first use.
+        self._index = None
+        if not os.path.exists(self.directory):
+            os.makedirs(self.directory)
+
+    def _get_index(self):
+        if self._index is None:
+            self._index = {}
+            for filename in glob.glob(os.path.join(self.directory,
+                                                   "*.json")):
+                metadata = self._read_metadata(filename)
+                if metadata is not None:
+                    self._index[metadata["url"]] = (metadata["last_access"],
+                                                    metadata["size"])
+        return self._index
+
+    def _filename(self, url, extension):
+        return os.path.join(self.directory, "%s.%s" % (
+            hashlib.sha1(url.encode("utf-8")).hexdigest(), extension))
+
+    def _read_metadata(self, filename):
+        try:
+            with open(filename, "rt") as fh:
+                return json.load(fh)
+        except (IOError, OSError, ValueError):
+            return None
+
+    def _write_atomically(self, filename, content):
+        fd, temp = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        with os.fdopen(fd, "wb") as fh:
+            fh.write(content)
+        os.rename(temp, filename)
+
+    def _write_metadata(self, entry):
+        self._get_index()[entry.url] = (entry.last_access, len(entry.data))
+        self._write_atomically(self._filename(entry.url, "json"), json.dumps({
+            "url": entry.url,
+            "etag": entry.etag,
+            "last_modified": entry.last_modified,
+            "fetched_at": entry.fetched_at,
+            "last_access": entry.last_access,
+            "size": len(entry.data)}).encode("utf-8"))
+
+    def get(self, url):
+        """
+        Returns the CacheEntry of the URL or None if it is not cached. Marks
+        the entry as recently used.
+        """
+        with self._lock:
+            metadata = self._read_metadata(self._filename(url, "json"))
+            if metadata is None or metadata["url"] != url:
+                return None
+            try:
+                with open(self._filename(url, "data"), "rb") as fh:
+                    data = fh.read()
+            except (IOError, OSError):
+                return None
+            entry = CacheEntry(
+                url=url, data=data, etag=metadata["etag"],
+                last_modified=metadata["last_modified"],
+                fetched_at=metadata["fetched_at"], last_access=time.time())
+            self._write_metadata(entry)
+            return entry
+
+    def is_fresh(self, entry):
+        return time.time() - entry.fetched_at < self.ttl_in_s
+
+    def store(self, url, data, etag=None, last_modified=None):
+        """
+        Stores a freshly downloaded response and evicts the least recently
+        used entries if the cache grew too large.
+        """
+        entry = CacheEntry(url=url, data=data, etag=etag,
+                           last_modified=last_modified)
+        with self._lock:
+            self._write_atomically(self._filename(url, "data"), data)
+            self._write_metadata(entry)
+            self._evict()
+        return entry
+
+    def revalidated(self, entry):
+        """
+        Marks an entry as fresh again after the server confirmed it did not
+        change.
+        """
+        entry.fetched_at = time.time()
+        with self._lock:
+            self._write_metadata(entry)
+        return entry
+
+    def _evict(self):
+        index = self._get_index()
+        total_size = sum(_i[1] for _i in index.values())
+        if total_size <= self.max_size_in_bytes:
+            return
+        for (_, size), url in sorted(
+                (value, key) for key, value in index.items()):
+            if total_size <= self.max_size_in_bytes:
+                break
+            self._remove(url)
+            total_size -= size
+
+    @property
+    def size_in_bytes(self):
+        """
+        The total size of all cached content.
+        """
+        with self._lock:
+            return sum(_i[1] for _i in self._get_index().values())
+
+    def __contains__(self, url):
+        with self._lock:
+            return url in self._get_index()
+
+    def _remove(self, url):
+        self._get_index().pop(url, None)
+        for extension in ("json", "data"):
+            try:
+                os.remove(self._filename(url, extension))
+            except OSError:
+                pass
+
+    def invalidate(self, url):
+        """
+        Remove a single URL from the cache.
+        """
+        with self._lock:
+            self._remove(url)
+
+    def clear(self):
+        """
+        Remove everything from the cache.
+        """
+        with self._lock:
+            for filename in glob.glob(os.path.join(self.directory, "*.json")) \
+                    + glob.glob(os.path.join(self.directory, "*.data")):
+                os.remove(filename)
+            self._index = {}
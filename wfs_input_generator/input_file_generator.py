@@ -10,51 +10,617 @@ solvers.
     GNU General Public License, Version 3
     (http://www.gnu.org/copyleft/gpl.html)
 """
+from wfs_input_generator.cmt_helper import extract_events_from_CMTSOLUTION, \
+    extract_events_from_NDK
+from wfs_input_generator.downloader import download_urls
+from wfs_input_generator.fdsn_text_helper import read_FDSN_text
+from wfs_input_generator.file_discovery import is_path_pattern, iter_files
+from wfs_input_generator.format_detection import detect_format
+from wfs_input_generator.json_stream import iter_json_elements
+from wfs_input_generator.parallel import parallel_map, raise_on_errors
+from wfs_input_generator.quakeml_helper import extract_events_from_QuakeML
+from wfs_input_generator.sac_helper import extract_coordinates_from_SAC
+from wfs_input_generator.seed_helper import extract_coordinates_from_SEED, \
+    extract_coordinates_from_XSEED
 from wfs_input_generator.station_xml_helper \
-    import extract_coordinates_from_StationXML
+    import iter_coordinates_from_StationXML
+from wfs_input_generator.station_filters import IdPatterns, StationFilter
+from wfs_input_generator.stores import DUPLICATE_TOLERANCES, EventStore, \
+    KEEP_LAST, StationTable, unique_event_positions
+from wfs_input_generator.tables import events_from_dicts, read_table, \
+    station_columns_from_dicts, validate_station_columns
 
 import copy
-import fnmatch
+import functools
 import glob
 import inspect
 import io
+import itertools
 import json
+import numpy as np
 import obspy
 from obspy import read_events
-from obspy.core import AttribDict, read
+from obspy.core import AttribDict
 from obspy.core.event import Event
-from obspy.io.xseed import Parser
 import os
-import pkg_resources
-import urllib2
 import warnings
 
-# Proper way to get the is_sac function.
-is_sac = pkg_resources.load_entry_point(
-    "obspy", "obspy.plugin.waveform.SAC", "isFormat")
+
+def _station_from_dict(station_item):
+    """
+    Checks a station dictionary and returns a new one with only the known
+    keys.
+    """
+    if "latitude" not in station_item or \
+            "longitude" not in station_item or \
+            "elevation_in_m" not in station_item or \
+            "id" not in station_item:
+        msg = (
+            "Each station dictionary needs to at least have "
+            "'latitude', 'longitude', 'elevation_in_m', and 'id' "
+            "keys.")
+        raise ValueError(msg)
+    # Create new dict to not carry around any additional keys.
+    stat = {
+        "latitude": float(station_item["latitude"]),
+        "longitude": float(station_item["longitude"]),
+        "elevation_in_m": float(station_item["elevation_in_m"]),
+        "id": str(station_item["id"])}
+    try:
+        stat["local_depth_in_m"] = \
+            float(station_item["local_depth_in_m"])
+    except:
+        pass
+    return stat
+
+
+def _event_from_dict(event):
+    """
+    Checks an event dictionary and returns a new one with only the known
+    keys.
+    """
+    required_keys = ["latitude", "longitude", "depth_in_km",
+                     "origin_time", "m_rr", "m_tt", "m_pp", "m_rt",
+                     "m_rp", "m_tp"]
+    for key in required_keys:
+        if key not in event:
+            msg = (
+                "Each station events needs to at least have "
+                "{keys} keys.").format(
+                keys=", ".join(required_keys))
+            raise ValueError(msg)
+    # Create new dict to not carry around any additional keys.
+    ev = {
+        "latitude": float(event["latitude"]),
+        "longitude": float(event["longitude"]),
+        "depth_in_km": float(event["depth_in_km"]),
+        "origin_time": obspy.UTCDateTime(event["origin_time"]),
+        "m_rr": float(event["m_rr"]),
+        "m_tt": float(event["m_tt"]),
+        "m_pp": float(event["m_pp"]),
+        "m_rt": float(event["m_rt"]),
+        "m_rp": float(event["m_rp"]),
+        "m_tp": float(event["m_tp"])}
+    if "description" in event and \
+            event["description"] is not None:
+        ev["description"] = str(event["description"])
+    else:
+        ev["description"] = None
+    return ev
+
+
+def _iter_json_dicts(filename_or_buf, kind):
+    """
+    Yields chunks of the objects in a JSON file with either a single object
+    or an array of objects. The file is decoded incrementally.
+    """
+    for chunk in _chunks(iter_json_elements(filename_or_buf)):
+        if not all(isinstance(_i, dict) for _i in chunk):
+            msg = "JSON %s files must only contain %s objects." % (kind, kind)
+            raise ValueError(msg)
+        yield chunk
+
+
+def _read_json_stations(filename_or_buf, id_filter=None):
+    """
+    Reads a JSON file with either a single station object or an array of
+    station objects into a StationTable. Only a single chunk of station
+    objects is held in memory at any time.
+
+    Stations rejected by the optional id_filter are skipped without being
+    checked.
+    """
+    table = StationTable()
+    offset = 0
+    for chunk in _iter_json_dicts(filename_or_buf, "station"):
+        count = len(chunk)
+        if id_filter is not None:
+            chunk = [_i for _i in chunk
+                     if "id" not in _i or id_filter(str(_i["id"]))]
+        table.add_columns(*station_columns_from_dicts(chunk, offset))
+        offset += count
+    return table
+
+
+def _read_json_events(filename_or_buf):
+    """
+    Reads a JSON file with either a single event object or an array of event
+    objects.
+    """
+    events = []
+    for chunk in _iter_json_dicts(filename_or_buf, "event"):
+        events.extend(events_from_dicts(chunk, len(events)))
+    return events
+
+
+def _event_from_obspy(event):
+    """
+    Check and parse an obspy event. Returns an event dictionary.
+
+    Each event at least needs to have an origin and a moment tensor,
+    otherwise an error will be raised.
+    """
+    # Do a lot of checks first to be able to give descriptive error
+    # messages.
+    if not event.origins:
+        msg = "Each event needs to have an origin."
+        raise ValueError(msg)
+    if not event.focal_mechanisms:
+        msg = "Each event needs to have a focal mechanism."
+        raise ValueError(msg)
+    # Choose either the preferred origin or the first one.
+    origin = event.preferred_origin() or event.origins[0]
+    # Same with the focal mechanism.
+    foc_mec = event.preferred_focal_mechanism() or \
+        event.focal_mechanisms[0]
+    # The focal mechanism of course needs to have a moment tensor.
+    if not foc_mec.moment_tensor or not foc_mec.moment_tensor.tensor:
+        msg = "Every event needs to have a moment tensor."
+        raise ValueError(msg)
+
+    # Now check if the moment tensor has a derived origin - if yes: use
+    # that.
+    if foc_mec.moment_tensor.derived_origin_id:
+        new_origin = \
+            foc_mec.moment_tensor.derived_origin_id.get_referred_object()
+        if new_origin is None:
+            warnings.warn("Could not find the derived origin of the "
+                          "moment tensor - will use the preferred or "
+                          "first instead.")
+        else:
+            origin = new_origin
+
+    # Origin needs to have latitude, longitude, depth and time
+    if None in (origin.latitude, origin.longitude, origin.depth,
+                origin.time):
+        msg = ("Every event origin needs to have latitude, longitude, "
+               "depth and time")
+        raise ValueError(msg)
+    # Also all six components need to be specified.
+    mt = foc_mec.moment_tensor.tensor
+    if None in (mt.m_rr, mt.m_tt, mt.m_pp, mt.m_rt, mt.m_rp, mt.m_tp):
+        msg = "Every event needs all six moment tensor components."
+        raise ValueError(msg)
+
+    # Extract event descriptions.
+    if event.event_descriptions:
+        description = ", ".join(i.text for i in event.event_descriptions)
+    else:
+        description = None
+
+    # Now the event should be valid.
+    return {
+        "latitude": origin.latitude,
+        "longitude": origin.longitude,
+        "depth_in_km": origin.depth / 1000.0,
+        "origin_time": origin.time,
+        "m_rr": mt.m_rr,
+        "m_tt": mt.m_tt,
+        "m_pp": mt.m_pp,
+        "m_rt": mt.m_rt,
+        "m_rp": mt.m_rp,
+        "m_tp": mt.m_tp,
+        "_event_id": event.resource_id.resource_id,
+        "description": description}
+
+
+# Maps the formats detected by wfs_input_generator.format_detection to
+# functions reading a list of station dictionaries or a StationTable from a
+# filename or a file-like object. Register additional formats here and with
+# wfs_input_generator.format_detection.register_sniffer().
+STATION_READERS = {
+    "json": _read_json_stations,
+    "fdsn_text": read_FDSN_text,
+    "sac": extract_coordinates_from_SAC,
+    "seed": extract_coordinates_from_SEED,
+    "xseed": extract_coordinates_from_XSEED,
+    "stationxml": iter_coordinates_from_StationXML}
+
+
+# Maps event formats to functions reading a list of event dictionaries from a
+# filename or a file-like object, skipping events rejected by an optional
+# id_filter. All other formats except JSON are read with ObsPy.
+EVENT_READERS = {
+    "quakeml": extract_events_from_QuakeML,
+    "ndk": extract_events_from_NDK,
+    "cmtsolution": extract_events_from_CMTSOLUTION}
+
+# Formats of event files found in directories or with glob patterns. All
+# other files are skipped.
+EVENT_FORMATS = set(["json", "quakeml", "ndk", "cmtsolution"])
+
+# Default number of files and other items processed at once. Directories,
+# glob patterns and iterators are consumed lazily and each chunk is added
+# before the next one is read so at most this many items are ever held in
+# memory in addition to the stores.
+CHUNK_SIZE = 1000
+
+
+class _EventIdFilter(object):
+    """
+    Picklable function returning True for event ids equal to any of the
+    given ids, ignoring the case.
+    """
+    def __init__(self, event_ids):
+        self.event_ids = set(_i.lower() for _i in event_ids)
+
+    def __call__(self, event_id):
+        return event_id is not None and event_id.lower() in self.event_ids
+
+
+# Criteria of event filters given as a dictionary.
+EVENT_FILTER_KEYS = ("event_ids", "starttime", "endtime", "min_magnitude",
+                     "max_magnitude", "min_depth_in_km", "max_depth_in_km")
+
+
+def _event_criteria(event_filter):
+    """
+    Converts an event filter, either a list of event ids or a dictionary with
+    any of the EVENT_FILTER_KEYS, to keyword arguments for
+    :meth:`~wfs_input_generator.stores.EventIndex.select`.
+    """
+    if not isinstance(event_filter, dict):
+        return {"event_ids": list(event_filter)}
+    unknown = sorted(set(event_filter) - set(EVENT_FILTER_KEYS))
+    if unknown:
+        msg = "Unknown event filter criteria: %s. Valid are: %s." % (
+            ", ".join(unknown), ", ".join(EVENT_FILTER_KEYS))
+        raise ValueError(msg)
+    criteria = {}
+    for key, value in event_filter.items():
+        if value is None:
+            continue
+        if key == "event_ids":
+            value = list(value)
+        elif key in ("starttime", "endtime"):
+            value = obspy.UTCDateTime(value)
+        else:
+            value = float(value)
+        criteria[key] = value
+    return criteria
+
+
+def _deduplication_options(options):
+    """
+    Checks the dictionary of event deduplication options and returns it as
+    keyword arguments for
+    :func:`~wfs_input_generator.stores.remove_duplicate_events`.
+    """
+    unknown = sorted(set(options) - set(DUPLICATE_TOLERANCES) -
+                     set(["preference"]))
+    if unknown:
+        msg = "Unknown event deduplication options: %s. Valid are: %s." % (
+            ", ".join(unknown),
+            ", ".join(sorted(DUPLICATE_TOLERANCES) + ["preference"]))
+        raise ValueError(msg)
+    kwargs = dict(DUPLICATE_TOLERANCES)
+    for key, value in options.items():
+        if key == "preference":
+            if isinstance(value, basestring):
+                value = [value]
+            kwargs[key] = list(value or [])
+        else:
+            kwargs[key] = float(value)
+    return kwargs
+
+
+def _accepts_id_filter(reader):
+    try:
+        return "id_filter" in inspect.getargspec(reader).args
+    except TypeError:
+        return False
+
+
+def _read_station_file(filename_or_buf, id_filter=None):
+    """
+    Reads all stations from a filename or file-like object of any of the
+    registered formats.
+
+    Stations rejected by the optional id_filter are skipped. Readers taking
+    an id_filter argument skip them while parsing, the results of all other
+    readers are filtered afterwards.
+    """
+    filename_or_buf, file_format = _unwrap(filename_or_buf)
+    reader = STATION_READERS.get(file_format or
+                                 detect_format(filename_or_buf))
+    if reader is None:
+        msg = "Could not read %s." % filename_or_buf
+        raise ValueError(msg)
+    if id_filter is None:
+        return reader(filename_or_buf)
+    if _accepts_id_filter(reader):
+        return reader(filename_or_buf, id_filter=id_filter)
+    records = reader(filename_or_buf)
+    if isinstance(records, StationTable):
+        return records.take([id_filter(_i) for _i in records.ids])
+    return [_i for _i in records if id_filter(str(_i["id"]))]
+
+
+class _SniffedFilename(str):
+    """
+    A filename found in a directory or by a glob pattern together with its
+    already detected format.
+    """
+    def __new__(cls, filename, file_format):
+        self = str.__new__(cls, filename)
+        self.file_format = file_format
+        return self
+
+    def __getnewargs__(self):
+        return str(self), self.file_format
+
+
+def _unwrap(item):
+    """
+    Returns a plain filename and its format for filenames found by
+    _expand_paths() and the item itself and None for everything else. Some
+    parsers only accept plain strings.
+    """
+    if isinstance(item, _SniffedFilename):
+        return str(item), item.file_format
+    return item, None
 
 
-def unique_list(items):
+def _file_format(item):
     """
-    Helper function taking a list of items and returning a list with duplicate
-    items removed.
+    The format of a filename or file-like object. Filenames found by
+    _expand_paths() are not sniffed again.
     """
-    output = []
+    return _unwrap(item)[1] or detect_format(item)
+
+
+def _sniff(item):
+    """
+    The format of a filename or file-like object or None if it cannot be
+    determined.
+    """
+    if not isinstance(item, basestring) and not hasattr(item, "read"):
+        return None
+    try:
+        return _file_format(item)
+    except (IOError, OSError):
+        return None
+
+
+def _events_from_catalog(catalog, id_filter=None):
+    """
+    Converts all events of a catalog accepted by the optional id_filter.
+    """
+    return [_event_from_obspy(_i) for _i in catalog
+            if id_filter is None or id_filter(_i.resource_id.resource_id)]
+
+
+def _read_event_file(filename_or_buf, id_filter=None, file_format=None):
+    """
+    Reads all events from a filename or file-like object of any format
+    supported by ObsPy or a JSON file. QuakeML, NDK and CMTSOLUTION files
+    are streamed without creating ObsPy objects.
+
+    Only events accepted by the optional id_filter are converted. JSON events
+    have no id and are thus all skipped if an id_filter is given. The format
+    is detected unless it is given.
+    """
+    filename_or_buf, sniffed_format = _unwrap(filename_or_buf)
+    if file_format is None:
+        file_format = sniffed_format or _sniff(filename_or_buf)
+    if file_format == "json":
+        if id_filter is not None:
+            return []
+        return _read_json_events(filename_or_buf)
+    elif file_format in EVENT_READERS:
+        return EVENT_READERS[file_format](filename_or_buf, id_filter)
+    return _events_from_catalog(read_events(filename_or_buf), id_filter)
+
+
+def _download_all(items, cache=None):
+    """
+    Concurrently downloads all URLs in items. Returns a dictionary mapping
+    each URL to a file-like object with its content.
+    """
+    urls = [_i for _i in items if isinstance(_i, basestring) and "://" in _i]
+    if not urls:
+        return {}
+    return dict((url, io.BytesIO(data))
+                for url, data in zip(urls, download_urls(urls, cache=cache)))
+
+
+def _is_local_file(item):
+    return isinstance(item, basestring) and "://" not in item
+
+
+def _from_json(value):
+    """
+    If value is a JSON document with an array or an object, returns an
+    iterator over the elements of the array or the object itself. Returns
+    value unchanged otherwise.
+    """
+    if not isinstance(value, basestring):
+        return value
+    stripped = value.lstrip()
+    if stripped.startswith("["):
+        data = value.encode("utf-8") if isinstance(value, unicode) else value
+        elements = iter_json_elements(io.BytesIO(data))
+        # Glob patterns can also start with a bracket.
+        try:
+            first = list(itertools.islice(elements, 1))
+        except ValueError:
+            return value
+        return itertools.chain(first, elements)
+    elif stripped.startswith("{"):
+        try:
+            return json.loads(value)
+        except ValueError:
+            pass
+    return value
+
+
+def _rewind(items):
+    """
+    Rewinds all file-like objects in items so they can be read again.
+    """
+    if hasattr(items, "read") or not isinstance(items, (list, tuple)):
+        items = [items]
     for item in items:
-        if item not in output:
-            output.append(item)
-    return output
+        if hasattr(item, "read") and hasattr(item, "seek"):
+            item.seek(0)
+
+
+def _expand_paths(items, formats):
+    """
+    Lazily replaces all directories and glob patterns in items with the
+    files in them whose sniffed format is one of the given formats. Their
+    format is passed along so the files are not sniffed again.
+    """
+    for item in items:
+        if not is_path_pattern(item):
+            yield item
+            continue
+        for filename in iter_files(item):
+            try:
+                file_format = detect_format(filename)
+            except (IOError, OSError):
+                continue
+            if file_format not in formats:
+                continue
+            if isinstance(filename, str):
+                filename = _SniffedFilename(filename, file_format)
+            yield filename
+
+
+def _chunks(items, size=CHUNK_SIZE):
+    """
+    Splits an iterable into lists of at most size items.
+    """
+    items = iter(items)
+    while True:
+        chunk = list(itertools.islice(items, size))
+        if not chunk:
+            return
+        yield chunk
 
 
 class InputFileGenerator(object):
     """
+    :type station_conflict: str
+    :param station_conflict: How to deal with a station id that is added
+        again with different coordinates. One of ``"keep_first"``,
+        ``"keep_last"`` (the default) and ``"error"``.
+    :type http_cache: :class:`~wfs_input_generator.http_cache.HTTPCache`
+    :param http_cache: Optional cache for all downloaded station and event
+        files.
+    :type parse_cache: :class:`~wfs_input_generator.parse_cache.ParseCache`
+    :param parse_cache: Optional cache for the stations and events parsed
+        from local files. Unchanged files are not parsed again.
+    :type lazy: bool
+    :param lazy: If True, add_stations() and add_events() only register
+        their sources. These are parsed once the stations or events are
+        needed, usually by write(), and the station and event filters are
+        then applied while parsing so that nothing else is ever
+        materialized. The sources are parsed again whenever the filters
+        change.
     """
-    def __init__(self):
+    def __init__(self, station_conflict=KEEP_LAST, http_cache=None,
+                 parse_cache=None, lazy=False):
         self.config = AttribDict()
-        self._events = []
-        self._stations = []
+        self.http_cache = http_cache
+        self.parse_cache = parse_cache
+        self.lazy = lazy
+        self._event_store = EventStore()
+        self._station_table = StationTable(on_conflict=station_conflict)
         self.__station_filter = None
         self.__event_filter = None
+        self.__compiled_station_filter = None
+        self.__event_criteria = (None, None)
+        self.__event_deduplication = None
+        self.__filtered_events_cache = (None, None, None, None)
+        # The version of the station table and the patterns the filtered
+        # stations have been computed for and the result.
+        self.__filtered_stations_cache = (None, None, None)
+        # The (items, workers, chunk_size) tuples registered in lazy mode.
+        self._lazy_sources = {"stations": [], "events": []}
+        # The filter the lazy sources have been parsed with and the number
+        # of sources already parsed with it.
+        self._lazy_state = {"stations": (None, 0), "events": (None, 0)}
+
+    @property
+    def station_conflict(self):
+        return self._station_table.on_conflict
+
+    @station_conflict.setter
+    def station_conflict(self, value):
+        self._station_table.on_conflict = value
+
+    @property
+    def _stations(self):
+        self._resolve("stations")
+        return self._station_table.values()
+
+    @property
+    def _events(self):
+        self._resolve("events")
+        return self._event_store.values()
+
+    def _register_source(self, kind, items, workers, chunk_size):
+        """
+        Registers the items passed to add_stations() or add_events() in lazy
+        mode.
+        """
+        # One-shot iterators are materialized so that the sources can be
+        # parsed again if the filters change.
+        if hasattr(items, "__iter__") and not hasattr(items, "read") and \
+                iter(items) is items:
+            items = list(items)
+        self._lazy_sources[kind].append((items, workers, chunk_size))
+
+    def _resolve(self, kind):
+        """
+        Parses all sources of the given kind registered in lazy mode that
+        have not yet been parsed with the current filter. All of them are
+        parsed again if the filter changed since.
+        """
+        sources = self._lazy_sources[kind]
+        if not sources:
+            return
+        if kind == "stations":
+            key = self._compiled_station_filter
+            id_filter = key.id_filter() if key is not None else None
+            store, ingest = self._station_table, self._ingest_stations
+        else:
+            key = self._event_criteria
+            id_filter = _EventIdFilter(key["event_ids"]) \
+                if key and "event_ids" in key else None
+            store, ingest = self._event_store, self._ingest_events
+
+        filter_key, count = self._lazy_state[kind]
+        if filter_key != key:
+            store.clear()
+            count = 0
+            self._lazy_state[kind] = (key, count)
+        for items, workers, chunk_size in sources[count:]:
+            _rewind(items)
+            ingest(items, workers, chunk_size, id_filter)
+            count += 1
+            self._lazy_state[kind] = (key, count)
 
     def add_configuration(self, config):
         """
@@ -80,29 +646,47 @@ class InputFileGenerator(object):
 
         self.config.__dict__.update(config)
 
-    def add_events(self, events):
+    def add_events(self, events, workers=None, chunk_size=CHUNK_SIZE):
         """
         Add one or more events to the input file generator. Most inversions
         should specify only one event but some codes can deal with multiple
         events.
 
-        Can currently deal with QuakeML files and obspy.core.event.Event
-        objects.
+        Can currently deal with QuakeML, NDK, CMTSOLUTION and JSON files and
+        obspy.core.event.Event objects.
+
+        Directories and glob patterns, where ``**`` matches any number of
+        directories, are expanded to all QuakeML, NDK, CMTSOLUTION and JSON
+        files in them.
 
         :type events: list or obspy.core.event.Catalog object
         :param events: A list of filenames, a list of obspy.core.event.Event
             objects, or an obspy.core.event.Catalog object.
+        :type workers: int
+        :param workers: If given, all files are parsed in a pool of this many
+            processes. The events are added in the order of the input and
+            a single error listing all files that could not be read is
+            raised at the end of each chunk of files.
+        :type chunk_size: int
+        :param chunk_size: The number of items taken from events at once.
+            Every chunk is added before the next one is taken, so even
+            generators yielding millions of dictionaries are never
+            materialized as a whole.
         """
-        # Try to interpret it as json. If it works and results in a list or
-        # dicionary, use it!
-        try:
-            json_e = json.loads(events)
-        except:
-            pass
-        else:
-            # A simple string is also a valid JSON document.
-            if isinstance(json_e, list) or isinstance(json_e, dict):
-                events = json_e
+        if self.lazy:
+            self._register_source("events", events, workers, chunk_size)
+            return
+        self._ingest_events(events, workers, chunk_size)
+
+    def _ingest_events(self, events, workers=None, chunk_size=CHUNK_SIZE,
+                       id_filter=None):
+        """
+        Parses and adds events. Files and event objects with an id rejected
+        by the optional id_filter are skipped.
+        """
+        # Try to interpret it as JSON. Arrays are decoded one element at a
+        # time.
+        events = _from_json(events)
 
         # Thin wrapper to enable single element treatment.
         if isinstance(events, Event) or isinstance(events, dict) or \
@@ -111,62 +695,64 @@ class InputFileGenerator(object):
                  hasattr(events.read, "__call__")):
             events = [events, ]
 
+        offset = 0
+        for chunk in _chunks(_expand_paths(events, EVENT_FORMATS),
+                             chunk_size):
+            self.__add_event_items(chunk, workers, offset, id_filter)
+            offset += len(chunk)
+        if self.parse_cache is not None:
+            self.parse_cache.save()
+
+    def __add_event_items(self, events, workers, offset, id_filter=None):
+        """
+        Adds a list of event files, objects and dictionaries. offset is the
+        position of the first one in all events of the call.
+        """
+        # Lists of only dictionaries are checked column by column.
+        if all(isinstance(_i, dict) for _i in events):
+            self._event_store.extend(events_from_dicts(events, offset))
+            return
+
+        parsed_files = self._read_local_files(_read_event_file, "events",
+                                              events, workers, id_filter)
+        downloaded = _download_all(events, cache=self.http_cache)
+
         # Loop over all events.
-        for event in events:
-            # Download it if it is some kind of URL.
+        for index, event in enumerate(events):
+            if index in parsed_files:
+                self._event_store.extend(parsed_files[index])
+                continue
+
+            # Use the downloaded content if it is some kind of URL.
             if isinstance(event, basestring) and "://" in event:
-                event = io.BytesIO(urllib2.urlopen(event).read())
+                event = downloaded[event]
 
             if isinstance(event, Event):
-                self._parse_event(event)
+                if id_filter is None or \
+                        id_filter(event.resource_id.resource_id):
+                    self._parse_event(event)
                 continue
             # If it is a dict do some checks and add it.
             elif isinstance(event, dict):
-                required_keys = ["latitude", "longitude", "depth_in_km",
-                                 "origin_time", "m_rr", "m_tt", "m_pp", "m_rt",
-                                 "m_rp", "m_tp"]
-                for key in required_keys:
-                    if key not in event:
-                        msg = (
-                            "Each station events needs to at least have "
-                            "{keys} keys.").format(
-                            keys=", ".join(required_keys))
-                        raise ValueError(msg)
-                # Create new dict to not carry around any additional keys.
-                ev = {
-                    "latitude": float(event["latitude"]),
-                    "longitude": float(event["longitude"]),
-                    "depth_in_km": float(event["depth_in_km"]),
-                    "origin_time": obspy.UTCDateTime(event["origin_time"]),
-                    "m_rr": float(event["m_rr"]),
-                    "m_tt": float(event["m_tt"]),
-                    "m_pp": float(event["m_pp"]),
-                    "m_rt": float(event["m_rt"]),
-                    "m_rp": float(event["m_rp"]),
-                    "m_tp": float(event["m_tp"])}
-                if "description" in event and \
-                        event["description"] is not None:
-                    ev["description"] = str(event["description"])
-                else:
-                    ev["description"] = None
-                self._events.append(ev)
+                self._event_store.add(_event_from_dict(event))
                 continue
 
-            try:
-                cat = read_events(event)
-            except:
-                pass
+            # Errors in files of a detected format are raised as they are.
+            file_format = _sniff(event)
+            if file_format == "json" or file_format in EVENT_READERS:
+                records = _read_event_file(event, id_filter, file_format)
             else:
-                for event in cat:
-                    self._parse_event(event)
-                continue
-
-            msg = "Could not read %s." % event
-            raise ValueError(msg)
-        # Make sure each event is unique.
-        self._events = unique_list(self._events)
+                # Anything else might still be readable by ObsPy.
+                try:
+                    catalog = read_events(event)
+                except:
+                    msg = "Could not read %s." % event
+                    raise ValueError(msg)
+                records = _events_from_catalog(catalog, id_filter)
+            self._cache_records(event, "events", records, id_filter)
+            self._event_store.extend(records)
 
-    def add_stations(self, stations):
+    def add_stations(self, stations, workers=None, chunk_size=CHUNK_SIZE):
         """
         Add the desired output stations to the input file generator.
 
@@ -183,22 +769,43 @@ class InputFileGenerator(object):
         present. It denotes the burrial of the sensor beneath the surface.
 
         If it is a SEED/XML-SEED files, all stations in it will be added.
+        Directories and glob patterns, where ``**`` matches any number of
+        directories, are expanded to all station files in them.
 
-        :type stations: List of filenames, list of dictionaries or a single
-            filename, single dictionary.
+        :type stations: List of filenames, list of dictionaries, a single
+            filename, single dictionary or a StationTable.
         :param stations: The stations for which output files should be
             generated.
+        :type workers: int
+        :param workers: If given, all files are parsed in a pool of this many
+            processes. The stations are added in the order of the input and
+            a single error listing all files that could not be read is
+            raised at the end of each chunk of files.
+        :type chunk_size: int
+        :param chunk_size: The number of items taken from stations at once.
+            Every chunk is added before the next one is taken, so even
+            generators yielding millions of dictionaries are never
+            materialized as a whole.
         """
-        # Try to interpret it as json. If it works and results in a list or
-        # dicionary, use it!
-        try:
-            json_s = json.loads(stations)
-        except:
-            pass
-        else:
-            # A simple string is also a valid JSON document.
-            if isinstance(json_s, list) or isinstance(json_s, dict):
-                stations = json_s
+        if self.lazy:
+            self._register_source("stations", stations, workers, chunk_size)
+            return
+        self._ingest_stations(stations, workers, chunk_size)
+
+    def _ingest_stations(self, stations, workers=None,
+                         chunk_size=CHUNK_SIZE, id_filter=None):
+        """
+        Parses and adds stations. Stations in files with an id rejected by
+        the optional id_filter are skipped.
+        """
+        # Tables can be merged directly.
+        if isinstance(stations, StationTable):
+            self._station_table.extend(stations)
+            return
+
+        # Try to interpret it as JSON. Arrays are decoded one element at a
+        # time.
+        stations = _from_json(stations)
 
         # Thin wrapper to enable single element treatment.
         if isinstance(stations, dict) or not hasattr(stations, "__iter__") or \
@@ -206,114 +813,135 @@ class InputFileGenerator(object):
                  hasattr(stations.read, "__call__")):
             stations = [stations, ]
 
-        all_stations = {}
+        offset = 0
+        for chunk in _chunks(_expand_paths(stations, STATION_READERS),
+                             chunk_size):
+            self.__add_station_items(chunk, workers, offset, id_filter)
+            offset += len(chunk)
+        if self.parse_cache is not None:
+            self.parse_cache.save()
 
-        for station_item in stations:
-            # Store the original pointer position to be able to restore it.
-            original_position = None
-            try:
-                original_position = station_item.tell()
-                station_item.seek(original_position, 0)
-            except:
-                pass
+    def add_stations_from_table(self, table):
+        """
+        Add many stations at once from a table.
+
+        The columns are checked as a whole and added to the station table
+        without creating a dictionary per station.
+
+        :type table: str, file-like object or dict
+        :param table: A CSV file with a header line, a NumPy npz file or a
+            dictionary of equal length arrays. Required columns are ``id``
+            (or ``network`` and ``station``), ``latitude`` (or ``lat``),
+            ``longitude`` (or ``lon``) and ``elevation_in_m`` (or ``ele``).
+            ``local_depth_in_m`` (or ``depth``) is optional and zero if not
+            given.
+        """
+        stations = StationTable()
+        stations.add_columns(*validate_station_columns(read_table(table)))
+        self.add_stations(stations)
+
+    def __add_station_items(self, stations, workers, offset,
+                            id_filter=None):
+        """
+        Adds a list of station files and dictionaries. offset is the position
+        of the first one in all stations of the call.
+        """
+        # Lists of only dictionaries are checked column by column and added
+        # without creating a new dictionary per station.
+        if all(isinstance(_i, dict) for _i in stations):
+            self._station_table.add_columns(
+                *station_columns_from_dicts(stations, offset))
+            return
+
+        parsed_files = self._read_local_files(_read_station_file, "stations",
+                                              stations, workers, id_filter)
+        downloaded = _download_all(stations, cache=self.http_cache)
+        # Lists of station dictionaries and StationTables, added in order
+        # once everything could be read.
+        batches = []
+
+        for index, station_item in enumerate(stations):
+            if index in parsed_files:
+                batches.append(parsed_files[index])
+                continue
 
-            # Download it if it is some kind of URL.
+            # Use the downloaded content if it is some kind of URL.
             if isinstance(station_item, basestring) and "://" in station_item:
-                station_item = io.BytesIO(urllib2.urlopen(station_item).read())
+                station_item = downloaded[station_item]
 
             # If it is a dict do some checks and add it.
             if isinstance(station_item, dict):
-                if "latitude" not in station_item or \
-                        "longitude" not in station_item or \
-                        "elevation_in_m" not in station_item or \
-                        "id" not in station_item:
-                    msg = (
-                        "Each station dictionary needs to at least have "
-                        "'latitude', 'longitude', 'elevation_in_m', and 'id' "
-                        "keys.")
-                    raise ValueError(msg)
-                # Create new dict to not carry around any additional keys.
-                stat = {
-                    "latitude": float(station_item["latitude"]),
-                    "longitude": float(station_item["longitude"]),
-                    "elevation_in_m": float(station_item["elevation_in_m"]),
-                    "id": str(station_item["id"])}
-                try:
-                    stat["local_depth_in_m"] = \
-                        float(station_item["local_depth_in_m"])
-                except:
-                    pass
-                all_stations[stat["id"]] = stat
-                continue
-
-            # Also accepts SAC files.
-            if is_sac(station_item):
-                st = read(station_item)
-                for tr in st:
-                    stat = {}
-                    stat["id"] = "%s.%s" % (tr.stats.network,
-                                            tr.stats.station)
-
-                    # lat/lng/ele must be given.
-                    sac_stat = tr.stats.sac
-                    if "stla" not in sac_stat or \
-                            "stlo" not in sac_stat or \
-                            "stel" not in sac_stat:
-                        warnings.warn("No coordinates for channel '%s'."
-                                      % str(tr))
-                        continue
-
-                    stat["latitude"] = float(sac_stat.stla)
-                    stat["longitude"] = float(sac_stat.stlo)
-                    stat["elevation_in_m"] = float(sac_stat.stel)
-                    # Local depth may be neclected.
-                    if "stdp" in sac_stat:
-                        stat["local_depth_in_m"] = float(sac_stat.stdp)
-                    all_stations[stat["id"]] = stat
-                    continue
+                batches.append([_station_from_dict(station_item)])
                 continue
 
-            # Reset pointer.
-            if original_position is not None:
-                station_item.seek(original_position, 0)
-
-            # SEED / XML-SEED
-            try:
-                Parser(station_item)
-                is_seed = True
-            except:
-                is_seed = False
-            # Reset.
-            if original_position is not None:
-                station_item.seek(original_position, 0)
-            if is_seed is True:
-                self._parse_seed(station_item, all_stations)
-                continue
-
-            # StationXML
-            try:
-                stations = extract_coordinates_from_StationXML(station_item)
-            except:
-                pass
+            # Everything else is a file or file-like object. Determine the
+            # format from the first few bytes and let exactly one reader
+            # parse it.
+            records = _read_station_file(station_item, id_filter)
+            if not isinstance(records, StationTable):
+                records = list(records)
+            self._cache_records(station_item, "stations", records, id_filter)
+            batches.append(records)
+
+        for batch in batches:
+            if isinstance(batch, StationTable):
+                self._station_table.extend(batch)
             else:
-                for station in stations:
-                    all_stations[station["id"]] = station
-                continue
-
-            msg = "Could not read %s." % station_item
-            raise ValueError(msg)
+                self.__add_stations(batch)
 
-        self.__add_stations(all_stations.values())
+    def _read_local_files(self, function, kind, items, workers,
+                          id_filter=None):
+        """
+        Returns a dictionary mapping the index of local files in items to the
+        list of records of the given kind parsed from them.
+
+        Files in the parse cache are taken from it. If workers is given, all
+        others are parsed with function in a pool of that many processes and
+        a ValueError listing all files that could not be parsed is raised.
+        Otherwise they are left to the caller. A given id_filter is passed on
+        to function.
+        """
+        parsed = {}
+        indices = [_i for _i, item in enumerate(items)
+                   if _is_local_file(item)]
+        if self.parse_cache is not None:
+            for index in indices:
+                records = self.parse_cache.get(items[index], kind)
+                if records is not None:
+                    parsed[index] = records
+        if not workers:
+            return parsed
+
+        indices = [_i for _i in indices if _i not in parsed]
+        if id_filter is not None:
+            function = functools.partial(function, id_filter=id_filter)
+        results = parallel_map(function, [items[_i] for _i in indices],
+                               workers)
+        raise_on_errors(results)
+        for index, (item, records, _) in zip(indices, results):
+            self._cache_records(item, kind, records, id_filter)
+            parsed[index] = records
+        return parsed
+
+    def _cache_records(self, item, kind, records, id_filter=None):
+        """
+        Stores the records parsed from item in the parse cache if there is
+        one and item is a local file. Records read with an id_filter are
+        incomplete and never stored.
+        """
+        if self.parse_cache is not None and _is_local_file(item) and \
+                id_filter is None:
+            self.parse_cache.put(item, kind, records)
 
     def __add_stations(self, stations):
         """
         Helper function to assure all supported file formats result in the same
-        station dictionary format.
+        station dictionary format. Repeated ids are resolved according to the
+        station_conflict policy.
 
         Will set the local depth to zero if not found. Should work across all
         formats.
         """
-        _s = []
         for station_item in stations:
             station = {"latitude": float(station_item["latitude"]),
                        "longitude": float(station_item["longitude"]),
@@ -324,22 +952,47 @@ class InputFileGenerator(object):
                     float(station_item["local_depth_in_m"])
             except:
                 station["local_depth_in_m"] = 0.0
-            _s.append(station)
-        self._stations.extend(_s)
-        self._stations = unique_list(self._stations)
+            self._station_table.add(station)
 
     @property
-    def _filtered_stations(self):
-        if not self.station_filter:
-            return self._stations
+    def _compiled_station_filter(self):
+        """
+        The station filter as a StationFilter or None if there is none. Lists
+        of id patterns are compiled again if they have been changed in
+        place.
+        """
+        station_filter = self.station_filter
+        if isinstance(station_filter, StationFilter):
+            return station_filter
+        if not station_filter:
+            return None
+        compiled = self.__compiled_station_filter
+        if compiled is None or \
+                compiled.patterns.patterns != tuple(station_filter):
+            compiled = IdPatterns(station_filter)
+            self.__compiled_station_filter = compiled
+        return compiled
 
-        def filt(station):
-            for pattern in self.station_filter:
-                if fnmatch.fnmatch(station["id"], pattern):
-                    return True
-            return False
+    @property
+    def _filtered_station_table(self):
+        self._resolve("stations")
+        station_filter = self._compiled_station_filter
+        if station_filter is None:
+            return self._station_table
+
+        # Cached until the stations or the filter change.
+        version, cached_filter, table = self.__filtered_stations_cache
+        if version != self._station_table.version or \
+                cached_filter is not station_filter:
+            table = self._station_table.take(
+                station_filter.mask(self._station_table))
+            self.__filtered_stations_cache = (
+                self._station_table.version, station_filter, table)
+        return table
 
-        return filter(filt, self._stations)
+    @property
+    def _filtered_stations(self):
+        return self._filtered_station_table.values()
 
     @property
     def station_filter(self):
@@ -352,27 +1005,84 @@ class InputFileGenerator(object):
         except:
             pass
 
-        if not hasattr(value, "__iter__") and value is not None:
-            msg = "Needs to be a list or other iterable."
+        if not hasattr(value, "__iter__") and value is not None and \
+                not isinstance(value, StationFilter):
+            msg = "Needs to be a list or other iterable or a StationFilter."
             raise TypeError(msg)
         self.__station_filter = value
+        self.__compiled_station_filter = None
 
     @property
-    def _filtered_events(self):
+    def _event_criteria(self):
+        """
+        The event filter as keyword arguments for EventIndex.select() or None
+        if there is none. Converted again if the filter has been changed in
+        place.
+        """
         if not self.event_filter:
+            return None
+        snapshot, criteria = self.__event_criteria
+        if criteria is None or snapshot != self.event_filter:
+            criteria = _event_criteria(self.event_filter)
+            self.__event_criteria = (copy.deepcopy(self.event_filter),
+                                     criteria)
+        return criteria
+
+    @property
+    def _filtered_events(self):
+        self._resolve("events")
+        criteria = self._event_criteria
+        deduplication = self.event_deduplication
+        if criteria is None and deduplication is None:
             return self._events
 
-        def filt(event):
-            # No id will remove the event.
-            if "_event_id" not in event:
-                return False
+        # Cached until the events, the filter or the deduplication change.
+        version, cached_criteria, cached_deduplication, events = \
+            self.__filtered_events_cache
+        if version != self._event_store.version or \
+                cached_criteria is not criteria or \
+                cached_deduplication != deduplication:
+            store = self._event_store
+            positions = store.index.select(**criteria) \
+                if criteria is not None else np.arange(len(store))
+            if deduplication is not None:
+                positions = positions[unique_event_positions(
+                    store.take(positions),
+                    **_deduplication_options(deduplication))]
+            events = [store.row(_i) for _i in positions.tolist()]
+            self.__filtered_events_cache = (
+                self._event_store.version, criteria,
+                copy.deepcopy(deduplication), events)
+        return list(events)
 
-            for event_id in self.event_filter:
-                if event["_event_id"].lower() == event_id.lower():
-                    return True
-            return False
+    @property
+    def event_deduplication(self):
+        """
+        None if duplicate events are kept, otherwise a dictionary with any of
+        the tolerances in DUPLICATE_TOLERANCES and a "preference" list of
+        event id patterns. See
+        :func:`~wfs_input_generator.stores.remove_duplicate_events`.
+        """
+        return self.__event_deduplication
 
-        return filter(filt, self._events)
+    @event_deduplication.setter
+    def event_deduplication(self, value):
+        try:
+            value = json.loads(value)
+        except:
+            pass
+
+        if value is True:
+            value = {}
+        elif value is False:
+            value = None
+        if value is not None:
+            if not isinstance(value, dict):
+                msg = "Needs to be a dictionary, True or None."
+                raise TypeError(msg)
+            # Raises for invalid options.
+            _deduplication_options(value)
+        self.__event_deduplication = value
 
     @property
     def event_filter(self):
@@ -388,47 +1098,10 @@ class InputFileGenerator(object):
         if not hasattr(value, "__iter__") and value is not None:
             msg = "Needs to be a list or other iterable."
             raise TypeError(msg)
+        # Raises for invalid criteria.
+        criteria = _event_criteria(value) if value else None
         self.__event_filter = value
-
-    def _parse_seed(self, station_item, all_stations):
-        """
-        Helper function to parse SEED and XSEED files.
-        """
-        parser = Parser(station_item)
-        for station in parser.stations:
-            network_code = None
-            station_code = None
-            latitude = None
-            longitude = None
-            elevation = None
-            local_depth = None
-            for blockette in station:
-                if blockette.id not in [50, 52]:
-                    continue
-                elif blockette.id == 50:
-                    network_code = str(blockette.network_code)
-                    station_code = str(blockette.station_call_letters)
-                    continue
-                elif blockette.id == 52:
-                    latitude = blockette.latitude
-                    longitude = blockette.longitude
-                    elevation = blockette.elevation
-                    local_depth = blockette.local_depth
-                    break
-            if None in [network_code, station_code, latitude, longitude,
-                        elevation, local_depth]:
-                msg = "Could not parse %s" % station_item
-                raise ValueError(msg)
-            stat = {
-                "id": "%s.%s" % (network_code, station_code),
-                "latitude": latitude,
-                "longitude": longitude,
-                "elevation_in_m": elevation,
-                "local_depth_in_m": local_depth}
-            if stat["id"] in all_stations:
-                all_stations[stat["id"]].update(stat)
-            else:
-                all_stations[stat["id"]] = stat
+        self.__event_criteria = (copy.deepcopy(value), criteria)
 
     def write(self, format, output_dir=None):
         """
@@ -450,11 +1123,10 @@ class InputFileGenerator(object):
                 format, list(self.__write_functions.keys()))
             raise ValueError(msg)
 
-        # Make sure only unique stations and events are passed on. Sort
-        # stations by id.
-        _stations = copy.deepcopy(sorted(unique_list(self._filtered_stations),
-                                         key=lambda x: x["id"]))
-        _events = copy.deepcopy(unique_list(self._filtered_events))
+        # The stores already guarantee unique stations and events. Sort
+        # stations by id. This always results in a new table.
+        _stations = self._filtered_station_table.sorted_by_id()
+        _events = copy.deepcopy(self._filtered_events)
         # Remove the "_event_id"s everywhere
         for event in _events:
             try:
@@ -573,70 +1245,6 @@ class InputFileGenerator(object):
 
     def _parse_event(self, event):
         """
-        Check and parse events.
-
-        Each event at least needs to have an origin and a moment tensor,
-        otherwise an error will be raised.
+        Check and parse an obspy event and add it.
         """
-        # Do a lot of checks first to be able to give descriptive error
-        # messages.
-        if not event.origins:
-            msg = "Each event needs to have an origin."
-            raise ValueError(msg)
-        if not event.focal_mechanisms:
-            msg = "Each event needs to have a focal mechanism."
-            raise ValueError(msg)
-        # Choose either the preferred origin or the first one.
-        origin = event.preferred_origin() or event.origins[0]
-        # Same with the focal mechanism.
-        foc_mec = event.preferred_focal_mechanism() or \
-            event.focal_mechanisms[0]
-        # The focal mechanism of course needs to have a moment tensor.
-        if not foc_mec.moment_tensor or not foc_mec.moment_tensor.tensor:
-            msg = "Every event needs to have a moment tensor."
-            raise ValueError(msg)
-
-        # Now check if the moment tensor has a derived origin - if yes: use
-        # that.
-        if foc_mec.moment_tensor.derived_origin_id:
-            new_origin = \
-                foc_mec.moment_tensor.derived_origin_id.get_referred_object()
-            if new_origin is None:
-                warnings.warn("Could not find the derived origin of the "
-                              "moment tensor - will use the preferred or "
-                              "first instead.")
-            else:
-                origin = new_origin
-
-        # Origin needs to have latitude, longitude, depth and time
-        if None in (origin.latitude, origin.longitude, origin.depth,
-                    origin.time):
-            msg = ("Every event origin needs to have latitude, longitude, "
-                   "depth and time")
-            raise ValueError(msg)
-        # Also all six components need to be specified.
-        mt = foc_mec.moment_tensor.tensor
-        if None in (mt.m_rr, mt.m_tt, mt.m_pp, mt.m_rt, mt.m_rp, mt.m_tp):
-            msg = "Every event needs all six moment tensor components."
-            raise ValueError(msg)
-
-        # Extract event descriptions.
-        if event.event_descriptions:
-            description = ", ".join(i.text for i in event.event_descriptions)
-        else:
-            description = None
-
-        # Now the event should be valid.
-        self._events.append({
-            "latitude": origin.latitude,
-            "longitude": origin.longitude,
-            "depth_in_km": origin.depth / 1000.0,
-            "origin_time": origin.time,
-            "m_rr": mt.m_rr,
-            "m_tt": mt.m_tt,
-            "m_pp": mt.m_pp,
-            "m_rt": mt.m_rt,
-            "m_rp": mt.m_rp,
-            "m_tp": mt.m_tp,
-            "_event_id": event.resource_id.resource_id,
-            "description": description})
+        self._event_store.add(_event_from_obspy(event))
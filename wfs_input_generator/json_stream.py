@@ -0,0 +1,135 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Incremental decoding of large JSON documents.
+
+The elements of a top-level JSON array are decoded and returned one after
+another while the document is read in small blocks. Only the current element
+and a single block are ever held in memory.
+
+:copyright:
+    Lion Krischer (krischer@geophysik.uni-muenchen.de), 2013
+:license:
+    GNU General Public License, Version 3
+    (http://www.gnu.org/copyleft/gpl.html)
+"""
+import codecs
+import json
+import re
+
+# Number of bytes read at once.
+READ_SIZE = 64 * 1024
+
+_WHITESPACE = re.compile(r"[ \t\n\r]*")
+
+
+class _Buffer(object):
+    """
+    Decoded text of a file with a read position. Consumed text is dropped
+    whenever more is read.
+    """
+    def __init__(self, fh, read_size):
+        self.fh = fh
+        self.read_size = read_size
+        self.decoder = codecs.getincrementaldecoder("utf-8-sig")()
+        self.text = u""
+        self.pos = 0
+        self.eof = False
+
+    def more(self):
+        """
+        Reads more text. Returns False at the end of the file.
+        """
+        if self.eof:
+            return False
+        self.text = self.text[self.pos:]
+        self.pos = 0
+        # Grows geometrically for elements larger than a block.
+        data = self.fh.read(max(self.read_size, len(self.text)))
+        if isinstance(data, unicode):
+            data = data.encode("utf-8")
+        self.eof = not data
+        self.text += self.decoder.decode(data, final=self.eof)
+        return True
+
+    def skip_whitespace(self):
+        """
+        Moves to the next non-whitespace character and returns it or an
+        empty string at the end of the file.
+        """
+        while True:
+            self.pos = _WHITESPACE.match(self.text, self.pos).end()
+            if self.pos < len(self.text) or not self.more():
+                return self.text[self.pos:self.pos + 1]
+
+
+def _invalid(filename_or_buf):
+    msg = "Invalid JSON document %s." % filename_or_buf
+    return ValueError(msg)
+
+
+def iter_json_elements(filename_or_buf, read_size=READ_SIZE):
+    """
+    Generator yielding the elements of the top-level array of a JSON
+    document one at a time. Any other top-level value is yielded as the only
+    element.
+
+    :type filename_or_buf: str or file-like object
+    :param filename_or_buf: The filename or an open file-like object with the
+        UTF-8 encoded JSON document.
+    :type read_size: int
+    :param read_size: The number of bytes read at once.
+    """
+    if hasattr(filename_or_buf, "read") and \
+            hasattr(filename_or_buf.read, "__call__"):
+        fh, close = filename_or_buf, False
+    else:
+        fh, close = open(filename_or_buf, "rb"), True
+
+    try:
+        decoder = json.JSONDecoder()
+        buf = _Buffer(fh, read_size)
+        first = buf.skip_whitespace()
+        if first != u"[":
+            while buf.more():
+                pass
+            try:
+                yield json.loads(buf.text[buf.pos:])
+            except ValueError:
+                raise _invalid(filename_or_buf)
+            return
+
+        buf.pos += 1
+        delimiter = buf.skip_whitespace()
+        while delimiter != u"]":
+            # An element is only complete once it is followed by a delimiter.
+            # Otherwise a number might just be cut off at the end of the
+            # block.
+            while True:
+                try:
+                    value, end = decoder.raw_decode(buf.text, buf.pos)
+                except ValueError:
+                    if not buf.more():
+                        raise _invalid(filename_or_buf)
+                    continue
+                following = _WHITESPACE.match(buf.text, end).end()
+                if buf.text[following:following + 1] in (u",", u"]") or \
+                        not buf.more():
+                    break
+            buf.pos = end
+            yield value
+
+            delimiter = buf.skip_whitespace()
+            if delimiter == u",":
+                buf.pos += 1
+                buf.skip_whitespace()
+            elif delimiter != u"]":
+                raise _invalid(filename_or_buf)
+
+        # Nothing but whitespace may follow.
+        buf.pos += 1
+        if buf.skip_whitespace():
+            raise _invalid(filename_or_buf)
+    finally:
+        if close:
+            fh.close()
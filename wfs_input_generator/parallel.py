@@ -0,0 +1,82 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Parallel parsing of many input files in a pool of processes.
+
+Parsing SEED, StationXML and QuakeML files is CPU bound pure Python so
+threads do not help.
+
+:copyright:
+    Lion Krischer (krischer@geophysik.uni-muenchen.de), 2013
+:license:
+    GNU General Public License, Version 3
+    (http://www.gnu.org/copyleft/gpl.html)
+"""
+import multiprocessing
+import traceback
+
+
+class _Call(object):
+    """
+    Picklable wrapper calling function on a single item. Never raises but
+    returns a (result, error message) tuple.
+    """
+    def __init__(self, function):
+        self.function = function
+
+    def __call__(self, item):
+        try:
+            return list(self.function(item)), None
+        except Exception as e:
+            return None, "%s: %s\n%s" % (e.__class__.__name__, str(e),
+                                         traceback.format_exc())
+
+
+def parallel_map(function, items, workers):
+    """
+    Apply function to every item in a pool of worker processes.
+
+    Returns a list of (item, result, error) tuples in the order of the input
+    items. result is the list of whatever the function returned for that
+    item and None if it raised. error is then a string describing the
+    exception, otherwise None.
+
+    :type function: function
+    :param function: Picklable, e.g. module level, function taking a single
+        item and returning an iterable.
+    :type items: list
+    :param items: Picklable items, usually filenames.
+    :type workers: int
+    :param workers: The number of processes. Items are parsed in the current
+        process if it is one.
+    """
+    items = list(items)
+    call = _Call(function)
+    if workers <= 1 or len(items) <= 1:
+        results = [call(_i) for _i in items]
+    else:
+        pool = multiprocessing.Pool(min(workers, len(items)))
+        try:
+            # A couple of items per task to amortize the communication
+            # overhead without hurting the load balancing.
+            chunksize = max(1, len(items) // (4 * workers))
+            results = pool.map(call, items, chunksize=chunksize)
+        finally:
+            pool.close()
+            pool.join()
+    return [(item, result, error)
+            for item, (result, error) in zip(items, results)]
+
+
+def raise_on_errors(results):
+    """
+    Raises a ValueError listing every failed item of the output of
+    parallel_map().
+    """
+    errors = [(item, error) for item, _, error in results
+              if error is not None]
+    if not errors:
+        return
+    msg = "Could not read %i file(s):\n%s" % (len(errors), "\n".join(
+        "\t%s: %s" % (item, error.splitlines()[0]) for item, error in errors))
+    raise ValueError(msg)
@@ -0,0 +1,167 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+A persistent cache for the stations and events parsed from local files.
+
+Parsing SEED, StationXML or QuakeML files is expensive but only a handful of
+numbers per station or event are kept. These records are cached in a single
+compressed binary file, keyed by the absolute path of the parsed file and
+validated by its size, modification time and optionally a hash of its
+content. Unchanged files are thus never parsed again.
+
+:copyright:
+    Lion Krischer (krischer@geophysik.uni-muenchen.de), 2013
+:license:
+    GNU General Public License, Version 3
+    (http://www.gnu.org/copyleft/gpl.html)
+"""
+import cPickle
+import hashlib
+import os
+import tempfile
+import zlib
+
+from wfs_input_generator.stores import StationTable
+
+# Bump whenever the format of the cached records changes.
+CACHE_VERSION = 2
+
+
+def _content_hash(filename):
+    sha1 = hashlib.sha1()
+    with open(filename, "rb") as fh:
+        while True:
+            chunk = fh.read(1024 ** 2)
+            if not chunk:
+                break
+            sha1.update(chunk)
+    return sha1.hexdigest()
+
+
+class ParseCache(object):
+    """
+    Cache of the records parsed from local files.
+
+    :type filename: str
+    :param filename: The cache file. Will be created if it does not exist.
+    :type max_entries: int
+    :param max_entries: The maximum number of cached files. The least recently
+        used ones are evicted once this is exceeded.
+    :type use_content_hash: bool
+    :param use_content_hash: Also compare a SHA1 hash of the file content and
+        not only its size and modification time. Safer but every file has to
+        be read once per lookup.
+    """
+    def __init__(self, filename, max_entries=100000, use_content_hash=False):
+        self.filename = os.path.abspath(os.path.expanduser(filename))
+        self.max_entries = max_entries
+        self.use_content_hash = use_content_hash
+        self._entries = {}
+        self._clock = 0
+        self._dirty = False
+        self._load()
+
+    def _load(self):
+        try:
+            with open(self.filename, "rb") as fh:
+                version, entries = cPickle.loads(zlib.decompress(fh.read()))
+        except (IOError, OSError):
+            return
+        except Exception:
+            # Corrupt caches are ignored and overwritten on the next save.
+            return
+        if version != CACHE_VERSION:
+            return
+        self._entries = entries
+        if entries:
+            self._clock = max(_i["last_used"] for _i in entries.values())
+
+    def _identity(self, filename):
+        stat = os.stat(filename)
+        identity = (stat.st_size, stat.st_mtime)
+        if self.use_content_hash:
+            identity += (_content_hash(filename),)
+        return identity
+
+    def _tick(self):
+        self._clock += 1
+        return self._clock
+
+    def get(self, filename, kind):
+        """
+        Returns the cached records of the given kind (e.g. ``"stations"`` or
+        ``"events"``) of a file or None if the file is not cached or changed
+        since it has been cached.
+        """
+        key = (kind, os.path.abspath(filename))
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        try:
+            identity = self._identity(filename)
+        except (IOError, OSError):
+            return None
+        if identity != entry["identity"]:
+            del self._entries[key]
+            self._dirty = True
+            return None
+        entry["last_used"] = self._tick()
+        self._dirty = True
+        return entry["records"]
+
+    def put(self, filename, kind, records):
+        """
+        Cache the records of the given kind parsed from a file. Station
+        tables are stored as they are and returned unchanged, all other
+        records as a list of dictionaries.
+        """
+        key = (kind, os.path.abspath(filename))
+        if not isinstance(records, StationTable):
+            records = [dict(_i) for _i in records]
+        self._entries[key] = {
+            "identity": self._identity(filename),
+            "records": records,
+            "last_used": self._tick()}
+        self._dirty = True
+        self._evict()
+
+    def _evict(self):
+        excess = len(self._entries) - self.max_entries
+        if excess <= 0:
+            return
+        oldest = sorted(self._entries.items(),
+                        key=lambda x: x[1]["last_used"])[:excess]
+        for key, _ in oldest:
+            del self._entries[key]
+
+    def invalidate(self, filename=None):
+        """
+        Remove a single file or, if no filename is given, everything from the
+        cache.
+        """
+        if filename is None:
+            self._entries.clear()
+        else:
+            filename = os.path.abspath(filename)
+            for key in [_i for _i in self._entries if _i[1] == filename]:
+                del self._entries[key]
+        self._dirty = True
+
+    def save(self):
+        """
+        Write the cache to disk if anything changed.
+        """
+        if not self._dirty:
+            return
+        directory = os.path.dirname(self.filename)
+        if not os.path.exists(directory):
+            os.makedirs(directory)
+        fd, temp = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        with os.fdopen(fd, "wb") as fh:
+            fh.write(zlib.compress(cPickle.dumps(
+                (CACHE_VERSION, self._entries), cPickle.HIGHEST_PROTOCOL)))
+        os.rename(temp, self.filename)
+        self._dirty = False
+
+    def __len__(self):
+        return len(self._entries)
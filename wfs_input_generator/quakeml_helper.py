@@ -0,0 +1,169 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+A helper function extracting the event dictionaries needed for the
+wfs_input_generator from a QuakeML file without creating ObsPy Catalog
+objects.
+
+:copyright:
+    Lion Krischer (krischer@geophysik.uni-muenchen.de), 2013
+:license:
+    GNU General Public License, Version 3
+    (http://www.gnu.org/copyleft/gpl.html)
+"""
+import warnings
+
+from lxml import etree
+import obspy
+from obspy.core.event import ResourceIdentifier
+
+from wfs_input_generator.station_xml_helper import _free
+
+
+def extract_events_from_QuakeML(file_or_file_object, id_filter=None):
+    """
+    Returns a list of event dictionaries, one for each event in the QuakeML
+    file.
+    """
+    return list(iter_events_from_QuakeML(file_or_file_object, id_filter))
+
+
+def iter_events_from_QuakeML(file_or_file_object, id_filter=None):
+    """
+    Generator yielding one event dictionary after another.
+
+    The document is parsed incrementally and every event element is discarded
+    once it has been converted, thus at most a single event subtree is kept
+    in memory, no matter the size of the file. Picks, amplitudes and all
+    other parts of an event that are not needed are never converted.
+
+    The origin and the focal mechanism are chosen exactly like for ObsPy
+    events: The preferred ones or the first ones and the derived origin of
+    the moment tensor if there is one. Ids are only resolved within each
+    event.
+
+    :type id_filter: function
+    :param id_filter: Optional function taking an event id and returning
+        False for events that are to be skipped.
+    """
+    context = etree.iterparse(file_or_file_object, events=("end",))
+    for _, element in context:
+        if not isinstance(element.tag, basestring):
+            continue
+        tag = etree.QName(element)
+        if tag.localname != "event":
+            continue
+        event_id = element.get("publicID")
+        if id_filter is not None and not id_filter(event_id):
+            _free(element)
+            continue
+        event = _extract_event(element, event_id, tag.namespace)
+        _free(element)
+        yield event
+    del context
+
+
+def _extract_event(event, event_id, namespace):
+    """
+    Extracts the event dictionary from a single event element.
+    """
+    def _ns(*tagnames):
+        return "/".join("{%s}%s" % (namespace, _i) for _i in tagnames)
+
+    origins = event.findall(_ns("origin"))
+    focal_mechanisms = event.findall(_ns("focalMechanism"))
+    if not origins:
+        msg = "Each event needs to have an origin."
+        raise ValueError(msg)
+    if not focal_mechanisms:
+        msg = "Each event needs to have a focal mechanism."
+        raise ValueError(msg)
+    # Choose either the preferred origin or the first one.
+    origin = _by_id(origins, event.findtext(_ns("preferredOriginID")),
+                    origins[0])
+    # Same with the focal mechanism.
+    foc_mec = _by_id(focal_mechanisms,
+                     event.findtext(_ns("preferredFocalMechanismID")),
+                     focal_mechanisms[0])
+    # The focal mechanism of course needs to have a moment tensor.
+    mt = foc_mec.find(_ns("momentTensor", "tensor"))
+    if mt is None:
+        msg = "Every event needs to have a moment tensor."
+        raise ValueError(msg)
+
+    # Now check if the moment tensor has a derived origin - if yes: use
+    # that.
+    derived_origin_id = foc_mec.findtext(_ns("momentTensor",
+                                             "derivedOriginID"))
+    if derived_origin_id and derived_origin_id.strip():
+        new_origin = _by_id(origins, derived_origin_id)
+        if new_origin is None:
+            warnings.warn("Could not find the derived origin of the "
+                          "moment tensor - will use the preferred or "
+                          "first instead.")
+        else:
+            origin = new_origin
+
+    # Origin needs to have latitude, longitude, depth and time
+    latitude, longitude, depth = [
+        _value(origin, _ns(_i, "value"), float)
+        for _i in ("latitude", "longitude", "depth")]
+    time = _value(origin, _ns("time", "value"), obspy.UTCDateTime)
+    if None in (latitude, longitude, depth, time):
+        msg = ("Every event origin needs to have latitude, longitude, "
+               "depth and time")
+        raise ValueError(msg)
+    # Also all six components need to be specified.
+    components = [_value(mt, _ns(_i, "value"), float)
+                  for _i in ("Mrr", "Mtt", "Mpp", "Mrt", "Mrp", "Mtp")]
+    if None in components:
+        msg = "Every event needs all six moment tensor components."
+        raise ValueError(msg)
+
+    # Extract event descriptions.
+    descriptions = [_i for _i in event.findall(_ns("description", "text"))
+                    if _i.text is not None]
+    if descriptions:
+        description = ", ".join(_i.text.strip() for _i in descriptions)
+    else:
+        description = None
+
+    event = {
+        "latitude": latitude,
+        "longitude": longitude,
+        "depth_in_km": depth / 1000.0,
+        "origin_time": time,
+        "_event_id": event_id.strip() if event_id
+        else str(ResourceIdentifier()),
+        "description": description}
+    event.update(zip(("m_rr", "m_tt", "m_pp", "m_rt", "m_rp", "m_tp"),
+                     components))
+    return event
+
+
+def _by_id(elements, public_id, default=None):
+    """
+    Returns the element with the given public id or the default.
+    """
+    if not public_id:
+        return default
+    public_id = public_id.strip()
+    for element in elements:
+        if (element.get("publicID") or "").strip() == public_id:
+            return element
+    return default
+
+
+def _value(element, path, convert):
+    """
+    Converted text of a subelement or None if it does not exist.
+    """
+    text = element.findtext(path)
+    if text is None or not text.strip():
+        return None
+    try:
+        return convert(text.strip())
+    except Exception:
+        msg = "Could not convert '%s' of element '%s'." % (
+            text.strip(), etree.QName(element).localname)
+        raise ValueError(msg)
@@ -0,0 +1,138 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Helper functions extracting the station dictionaries needed for the
+wfs_input_generator from the headers of binary SAC files.
+
+Only the fixed size header is read, the waveform samples are never touched.
+
+:copyright:
+    Lion Krischer (krischer@geophysik.uni-muenchen.de), 2013
+:license:
+    GNU General Public License, Version 3
+    (http://www.gnu.org/copyleft/gpl.html)
+"""
+import warnings
+
+import numpy as np
+
+SAC_HEADER_SIZE = 632
+
+# Undefined header values.
+FLOAT_NULL = -12345.0
+STRING_NULL = b"-12345  "
+
+# Byte offsets of the header fields used here. Floats and integers are four
+# bytes, strings eight bytes long.
+_FIELDS = [
+    ("stla", "f4", 124),
+    ("stlo", "f4", 128),
+    ("stel", "f4", 132),
+    ("stdp", "f4", 136),
+    ("nvhdr", "i4", 304),
+    ("kstnm", "S8", 440),
+    ("khole", "S8", 464),
+    ("kcmpnm", "S8", 600),
+    ("knetwk", "S8", 608)]
+
+
+def _header_dtype(byteorder):
+    return np.dtype({
+        "names": [_i[0] for _i in _FIELDS],
+        "formats": [byteorder + _i[1] if _i[1] != "S8" else _i[1]
+                    for _i in _FIELDS],
+        "offsets": [_i[2] for _i in _FIELDS],
+        "itemsize": SAC_HEADER_SIZE})
+
+
+_LITTLE_ENDIAN = _header_dtype("<")
+_BIG_ENDIAN = _header_dtype(">")
+
+
+def _read_header(item):
+    """
+    Reads the raw header of a filename or a file-like object.
+    """
+    if hasattr(item, "read") and hasattr(item.read, "__call__"):
+        header = item.read(SAC_HEADER_SIZE)
+    else:
+        with open(item, "rb") as fh:
+            header = fh.read(SAC_HEADER_SIZE)
+    if len(header) != SAC_HEADER_SIZE:
+        msg = "%s is too short to be a SAC file." % item
+        raise ValueError(msg)
+    return header
+
+
+def read_sac_headers(filenames_or_bufs):
+    """
+    Reads the headers of a single or many SAC files of any byte order.
+
+    Returns a structured array in native byte order with one record per file
+    and the fields stla, stlo, stel, stdp, nvhdr, kstnm, khole, kcmpnm and
+    knetwk.
+    """
+    if isinstance(filenames_or_bufs, basestring) or \
+            hasattr(filenames_or_bufs, "read"):
+        filenames_or_bufs = [filenames_or_bufs]
+    items = list(filenames_or_bufs)
+    if not items:
+        return np.empty(0, dtype=_LITTLE_ENDIAN.newbyteorder("="))
+    buf = b"".join(_read_header(_i) for _i in items)
+    little = np.frombuffer(buf, dtype=_LITTLE_ENDIAN)
+    big = np.frombuffer(buf, dtype=_BIG_ENDIAN)
+    is_big = little["nvhdr"] != 6
+    invalid = is_big & (big["nvhdr"] != 6)
+    if invalid.any():
+        msg = "%s is not a SAC file." % items[np.nonzero(invalid)[0][0]]
+        raise ValueError(msg)
+
+    headers = np.empty(len(items), dtype=_LITTLE_ENDIAN.newbyteorder("="))
+    for name in headers.dtype.names:
+        headers[name] = np.where(is_big, big[name], little[name])
+    return headers
+
+
+def _to_string(value):
+    """
+    Converts a SAC string header to a str the same way ObsPy does.
+    """
+    if value.ljust(8) == STRING_NULL:
+        return ""
+    return value.split(b"\x00", 1)[0].strip()
+
+
+def extract_coordinates_from_SAC(filenames_or_bufs, id_filter=None):
+    """
+    Returns a list of station dictionaries, one for each of the given SAC
+    files. Files without coordinates are skipped with a warning.
+
+    :type id_filter: function
+    :param id_filter: Optional function taking a station id and returning
+        False for stations that are to be skipped.
+    """
+    headers = read_sac_headers(filenames_or_bufs)
+    has_coordinates = (headers["stla"] != FLOAT_NULL) & \
+        (headers["stlo"] != FLOAT_NULL) & (headers["stel"] != FLOAT_NULL)
+    stations = []
+    for header, valid in zip(headers, has_coordinates):
+        network = _to_string(header["knetwk"])
+        station = _to_string(header["kstnm"])
+        if id_filter is not None and \
+                not id_filter("%s.%s" % (network, station)):
+            continue
+        if not valid:
+            warnings.warn("No coordinates for channel '%s.%s.%s.%s'." % (
+                network, station, _to_string(header["khole"]),
+                _to_string(header["kcmpnm"])))
+            continue
+        stat = {
+            "id": "%s.%s" % (network, station),
+            "latitude": float(header["stla"]),
+            "longitude": float(header["stlo"]),
+            "elevation_in_m": float(header["stel"])}
+        # Local depth may be neclected.
+        if header["stdp"] != FLOAT_NULL:
+            stat["local_depth_in_m"] = float(header["stdp"])
+        stations.append(stat)
+    return stations
@@ -0,0 +1,206 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Helper functions extracting the station dictionaries needed for the
+wfs_input_generator from dataless SEED and XSEED files.
+
+Only the station identifier (050) and the first channel identifier (052)
+blockette of every station are decoded. Everything else, most notably all
+response blockettes, is skipped without being parsed. Stations rejected by
+an optional id filter are skipped right after their station identifier
+blockette.
+
+:copyright:
+    Lion Krischer (krischer@geophysik.uni-muenchen.de), 2013
+:license:
+    GNU General Public License, Version 3
+    (http://www.gnu.org/copyleft/gpl.html)
+"""
+from lxml import etree
+
+
+def _open(filename_or_buf):
+    if hasattr(filename_or_buf, "read") and \
+            hasattr(filename_or_buf.read, "__call__"):
+        return filename_or_buf, False
+    return open(filename_or_buf, "rb"), True
+
+
+def _parse_050(blockette):
+    """
+    Returns the network and station code of a station identifier blockette.
+    """
+    station_code = blockette[7:12].strip()
+    # Skip the site name, the network identifier code, the word orders and
+    # the effective dates. The network code follows the update flag.
+    rest = blockette[47:].split(b"~", 1)[1][9:]
+    rest = rest.split(b"~", 2)[2]
+    network_code = rest[1:3].strip()
+    return network_code or None, station_code or None
+
+
+def _parse_052(blockette):
+    """
+    Returns the latitude, longitude, elevation and local depth of a channel
+    identifier blockette.
+    """
+    # Skip the optional comment and the unit lookup codes.
+    rest = blockette[19:].split(b"~", 1)[1][6:]
+    return (float(rest[0:10]), float(rest[10:21]), float(rest[21:28]),
+            float(rest[28:33]))
+
+
+def _accept(codes, id_filter):
+    """
+    Returns the codes or None if the station is to be skipped.
+    """
+    if id_filter is None or None in codes or \
+            id_filter("%s.%s" % codes):
+        return codes
+    return None
+
+
+def _station(filename_or_buf, codes, coordinates):
+    network_code, station_code = codes
+    if None in (network_code, station_code):
+        msg = "Could not parse %s" % filename_or_buf
+        raise ValueError(msg)
+    latitude, longitude, elevation, local_depth = coordinates
+    return {
+        "id": "%s.%s" % (network_code, station_code),
+        "latitude": latitude,
+        "longitude": longitude,
+        "elevation_in_m": elevation,
+        "local_depth_in_m": local_depth}
+
+
+def iter_coordinates_from_SEED(filename_or_buf, id_filter=None):
+    """
+    Generator yielding one station dictionary after another from a binary
+    dataless SEED volume.
+
+    Only station control records are looked at. Every station starts a new
+    logical record so all records following the first channel identifier
+    blockette of a station are skipped until the next station starts.
+
+    :type id_filter: function
+    :param id_filter: Optional function taking a station id and returning
+        False for stations that are to be skipped.
+    """
+    fh, close = _open(filename_or_buf)
+    try:
+        # The logical record length is stored as a power of two in the
+        # volume identifier blockette at the very start of the volume.
+        head = fh.read(21)
+        try:
+            record_length = 2 ** int(head[19:21])
+        except ValueError:
+            msg = "Could not parse %s" % filename_or_buf
+            raise ValueError(msg)
+        fh.read(record_length - 21)
+
+        # The codes of the current station while its first channel
+        # identifier blockette has not yet been found.
+        codes = None
+        # Undecoded data of the current station.
+        buf = b""
+        while True:
+            record = fh.read(record_length)
+            if len(record) < 8:
+                break
+            if record[6:7] != b"S":
+                continue
+            data = record[8:]
+            if record[7:8] != b"*":
+                if data[:3] == b"050":
+                    if codes is not None:
+                        msg = "Could not parse %s" % filename_or_buf
+                        raise ValueError(msg)
+                    codes = (None, None)
+                    buf = b""
+                elif codes is None:
+                    continue
+            elif codes is None:
+                continue
+            buf += data
+
+            # Decode all complete blockettes.
+            position = 0
+            while codes is not None:
+                blockette_type = buf[position:position + 3]
+                if not blockette_type.strip(b" \x00"):
+                    # Padding at the end of the record.
+                    position = len(buf)
+                    break
+                try:
+                    length = int(buf[position + 3:position + 7])
+                except ValueError:
+                    # The header itself continues in the next record.
+                    break
+                if position + length > len(buf):
+                    break
+                blockette = buf[position:position + length]
+                position += length
+                if blockette_type == b"050":
+                    codes = _accept(_parse_050(blockette), id_filter)
+                elif blockette_type == b"052":
+                    yield _station(filename_or_buf, codes,
+                                   _parse_052(blockette))
+                    codes = None
+            buf = buf[position:] if codes is not None else b""
+
+        if codes is not None:
+            msg = "Could not parse %s" % filename_or_buf
+            raise ValueError(msg)
+    finally:
+        if close:
+            fh.close()
+
+
+def iter_coordinates_from_XSEED(filename_or_buf, id_filter=None):
+    """
+    Generator yielding one station dictionary after another from an XSEED
+    file. The document is parsed incrementally and all blockettes are
+    discarded right away. id_filter is the same as for
+    :func:`iter_coordinates_from_SEED`.
+    """
+    codes = None
+    for _, element in etree.iterparse(filename_or_buf, events=("end",)):
+        blockette_type = element.get("blockette")
+        if blockette_type is None:
+            continue
+        if blockette_type == "050":
+            if codes is not None:
+                msg = "Could not parse %s" % filename_or_buf
+                raise ValueError(msg)
+            codes = _accept(tuple(
+                str(element.findtext(_i) or "").strip() or None
+                for _i in ("network_code", "station_call_letters")),
+                id_filter)
+        elif blockette_type == "052" and codes is not None:
+            yield _station(filename_or_buf, codes, tuple(
+                float(element.findtext(_i)) for _i in (
+                    "latitude", "longitude", "elevation", "local_depth")))
+            codes = None
+        element.clear()
+        while element.getprevious() is not None:
+            del element.getparent()[0]
+    if codes is not None:
+        msg = "Could not parse %s" % filename_or_buf
+        raise ValueError(msg)
+
+
+def extract_coordinates_from_SEED(filename_or_buf, id_filter=None):
+    """
+    Returns a list of station dictionaries, one for each station in the
+    dataless SEED volume.
+    """
+    return list(iter_coordinates_from_SEED(filename_or_buf, id_filter))
+
+
+def extract_coordinates_from_XSEED(filename_or_buf, id_filter=None):
+    """
+    Returns a list of station dictionaries, one for each station in the
+    XSEED file.
+    """
+    return list(iter_coordinates_from_XSEED(filename_or_buf, id_filter))
@@ -0,0 +1,206 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Spatial index for points on a sphere, e.g. stations on the Earth.
+
+All points are stored as unit vectors in a KD-tree. The great circle distance
+between two points grows monotonically with the length of the chord between
+them so radius and nearest neighbour queries on the sphere are simple
+euclidean queries on the tree, free of any problems at the poles or the
+dateline.
+
+Points are appended to an unindexed tail which is searched by brute force
+and only merged into the tree once it has grown to a fraction of the tree's
+size. Adding points and querying in turn is thus cheap as well.
+
+:copyright:
+    Lion Krischer (krischer@geophysik.uni-muenchen.de), 2013
+:license:
+    GNU General Public License, Version 3
+    (http://www.gnu.org/copyleft/gpl.html)
+"""
+import numpy as np
+from scipy.spatial import cKDTree
+
+from wfs_input_generator.rotations import lat_lon_radius_to_xyz
+
+# The tail is merged into the tree once it is larger than this and a quarter
+# of the tree.
+MIN_TAIL_SIZE = 256
+
+# Tolerance in radian for points right on the border of a query.
+_EPSILON = 1E-12
+
+# Number of grid points along each side of a box to find a cap around it.
+_BOX_GRID_SIZE = 10
+
+
+def unit_vectors(latitude, longitude):
+    """
+    Returns an array of shape (N, 3) with the unit vectors of the given
+    latitudes and longitudes in degree.
+    """
+    latitude = np.atleast_1d(np.asarray(latitude, dtype=np.float64))
+    longitude = np.atleast_1d(np.asarray(longitude, dtype=np.float64))
+    if not len(latitude):
+        return np.empty((0, 3), dtype=np.float64)
+    return np.ascontiguousarray(
+        lat_lon_radius_to_xyz(latitude, longitude, 1.0).T)
+
+
+def _chord_length(angle):
+    """
+    Length of the chord of a great circle arc with the given angle in degree.
+    """
+    angle = np.deg2rad(np.clip(angle, 0.0, 180.0))
+    return 2.0 * np.sin(angle / 2.0)
+
+
+def _angle(chord_length):
+    """
+    Inverse of :func:`_chord_length`.
+    """
+    return np.rad2deg(2.0 * np.arcsin(np.clip(chord_length / 2.0, 0.0, 1.0)))
+
+
+def bounding_cap(latitude, longitude):
+    """
+    Returns the latitude, longitude and radius in degree of a spherical cap
+    containing all given points, e.g. the border of a domain. Not
+    necessarily the smallest one. The cap is the whole sphere if the points
+    are spread all around it.
+    """
+    xyz = unit_vectors(latitude, longitude)
+    center = xyz.sum(axis=0)
+    norm = np.linalg.norm(center)
+    if norm < 1E-6:
+        return 0.0, 0.0, 180.0
+    center /= norm
+    radius = np.rad2deg(np.arccos(np.clip(xyz.dot(center), -1.0, 1.0)).max())
+    center_latitude = np.rad2deg(np.arcsin(np.clip(center[2], -1.0, 1.0)))
+    center_longitude = np.rad2deg(np.arctan2(center[1], center[0]))
+    return float(center_latitude), float(center_longitude), float(radius)
+
+
+class SphericalIndex(object):
+    """
+    Index of points on a sphere answering radius, nearest neighbour and
+    box queries in O(log N).
+
+    Points are referred to by the order in which they were added.
+    """
+    def __init__(self):
+        self.clear()
+
+    def clear(self):
+        self._xyz = np.empty((0, 3), dtype=np.float64)
+        self._size = 0
+        self._tree = None
+        # Number of points in the tree. All others are in the tail.
+        self._indexed = 0
+
+    def __len__(self):
+        return self._size
+
+    def extend(self, latitude, longitude):
+        """
+        Add points given as equal length arrays of latitudes and longitudes.
+        """
+        xyz = unit_vectors(latitude, longitude)
+        count = len(xyz)
+        if self._size + count > len(self._xyz):
+            capacity = max(self._size + count, 2 * len(self._xyz), 16)
+            new = np.empty((capacity, 3), dtype=np.float64)
+            new[:self._size] = self._xyz[:self._size]
+            self._xyz = new
+        self._xyz[self._size:self._size + count] = xyz
+        self._size += count
+
+    def _prepare(self):
+        """
+        Merges the tail into the tree if it got too large.
+        """
+        tail = self._size - self._indexed
+        if tail > max(MIN_TAIL_SIZE, self._indexed // 4):
+            self._tree = cKDTree(self._xyz[:self._size].copy())
+            self._indexed = self._size
+
+    def query_radius(self, latitude, longitude, radius):
+        """
+        Returns the sorted indices of all points at most radius degree away
+        from the given point.
+        """
+        self._prepare()
+        center = unit_vectors(latitude, longitude)[0]
+        chord = _chord_length(radius) + _EPSILON
+        if self._tree is not None:
+            indices = self._tree.query_ball_point(center, chord)
+        else:
+            indices = []
+        tail = self._xyz[self._indexed:self._size]
+        distances = np.sqrt(((tail - center) ** 2).sum(axis=1))
+        indices = np.concatenate([
+            np.asarray(indices, dtype=np.intp),
+            np.nonzero(distances <= chord)[0].astype(np.intp) +
+            self._indexed])
+        indices.sort()
+        # The tree search is only exact up to rounding. Decide on angles.
+        angles = np.arccos(np.clip(self._xyz[indices].dot(center), -1.0, 1.0))
+        return indices[angles <= np.deg2rad(radius) + _EPSILON]
+
+    def query_nearest(self, latitude, longitude, k=1):
+        """
+        Returns the indices of the k points closest to the given point and
+        their distances in degree, both sorted by distance.
+        """
+        self._prepare()
+        center = unit_vectors(latitude, longitude)[0]
+        k = min(k, self._size)
+        indices = np.empty(0, dtype=np.intp)
+        distances = np.empty(0, dtype=np.float64)
+        if self._tree is not None and k:
+            distances, indices = self._tree.query(center, k=min(
+                k, self._indexed))
+            indices = np.atleast_1d(indices).astype(np.intp)
+            distances = np.atleast_1d(distances)
+        tail = self._xyz[self._indexed:self._size]
+        indices = np.concatenate([
+            indices, np.arange(self._indexed, self._size, dtype=np.intp)])
+        distances = np.concatenate([
+            distances, np.sqrt(((tail - center) ** 2).sum(axis=1))])
+        order = np.lexsort((indices, distances))[:k]
+        return indices[order], _angle(distances[order])
+
+    def query_box(self, min_latitude, max_latitude, min_longitude,
+                  max_longitude, latitude, longitude):
+        """
+        Returns the sorted indices of all points within a latitude/longitude
+        box. The latitude and longitude arrays of all points are needed for
+        the final exact test. Boxes may cross the dateline, e.g. with a
+        minimum longitude of 170 and a maximum longitude of -170.
+
+        Only the points in a cap around the box are looked at.
+        """
+        max_longitude_unwrapped = max_longitude
+        if max_longitude_unwrapped < min_longitude:
+            max_longitude_unwrapped += 360.0
+        # A cap around a grid over the box, widened by the size of a grid
+        # cell so that nothing between the grid points is missed.
+        grid_latitude, grid_longitude = np.meshgrid(
+            np.linspace(min_latitude, max_latitude, _BOX_GRID_SIZE),
+            np.linspace(min_longitude, max_longitude_unwrapped,
+                        _BOX_GRID_SIZE))
+        center_latitude, center_longitude, radius = bounding_cap(
+            grid_latitude.ravel(), grid_longitude.ravel())
+        radius += np.hypot(max_latitude - min_latitude,
+                           max_longitude_unwrapped - min_longitude) / \
+            (_BOX_GRID_SIZE - 1)
+        indices = self.query_radius(center_latitude, center_longitude,
+                                    radius)
+
+        latitude = np.asarray(latitude, dtype=np.float64)[indices]
+        longitude = np.asarray(longitude, dtype=np.float64)[indices]
+        mask = (latitude >= min_latitude) & (latitude <= max_latitude)
+        offset = (longitude - min_longitude) % 360.0
+        mask &= offset <= (max_longitude_unwrapped - min_longitude)
+        return indices[mask]
@@ -0,0 +1,238 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Station filters evaluated as NumPy boolean masks over a
+:class:`~wfs_input_generator.stores.StationTable`.
+
+Filters select by id, by geography or by elevation and burial depth and can
+be combined with ``&`` and ``|``:
+
+>>> f = IdPatterns(["BW.*", "TA.A*"]) & Cap(48.0, 11.0, 10.0)
+>>> f = f | ElevationRange(minimum=1000.0)
+
+Geographic filters use the spatial index of the table and only look at the
+stations in a cap around the selected region.
+
+:copyright:
+    Lion Krischer (krischer@geophysik.uni-muenchen.de), 2013
+:license:
+    GNU General Public License, Version 3
+    (http://www.gnu.org/copyleft/gpl.html)
+"""
+import numpy as np
+
+from wfs_input_generator.spatial_index import bounding_cap, unit_vectors
+from wfs_input_generator.station_patterns import StationPatterns
+
+
+def _indices_to_mask(indices, size):
+    mask = np.zeros(size, dtype=bool)
+    mask[indices] = True
+    return mask
+
+
+class StationFilter(object):
+    """
+    Base class of all station filters.
+    """
+    def mask(self, table):
+        """
+        Boolean array, True for all rows of the table that are selected.
+        """
+        raise NotImplementedError
+
+    def id_filter(self):
+        """
+        Returns a picklable function taking a station id which returns False
+        for stations that can never be selected or None if nothing can be
+        told from the id alone.
+        """
+        return None
+
+    def __and__(self, other):
+        return And(self, other)
+
+    def __or__(self, other):
+        return Or(self, other)
+
+
+class And(StationFilter):
+    """
+    Stations selected by all filters.
+    """
+    def __init__(self, *filters):
+        self.filters = filters
+
+    def mask(self, table):
+        mask = np.ones(len(table), dtype=bool)
+        for station_filter in self.filters:
+            mask &= station_filter.mask(table)
+        return mask
+
+    def id_filter(self):
+        # Every one of the id filters is a necessary condition.
+        for station_filter in self.filters:
+            id_filter = station_filter.id_filter()
+            if id_filter is not None:
+                return id_filter
+        return None
+
+
+class Or(StationFilter):
+    """
+    Stations selected by any of the filters.
+    """
+    def __init__(self, *filters):
+        self.filters = filters
+
+    def mask(self, table):
+        mask = np.zeros(len(table), dtype=bool)
+        for station_filter in self.filters:
+            mask |= station_filter.mask(table)
+        return mask
+
+    def id_filter(self):
+        id_filters = [_i.id_filter() for _i in self.filters]
+        if not id_filters or None in id_filters:
+            return None
+        return _AnyIdFilter(id_filters)
+
+
+class _AnyIdFilter(object):
+    def __init__(self, id_filters):
+        self.id_filters = id_filters
+
+    def __call__(self, station_id):
+        return any(_i(station_id) for _i in self.id_filters)
+
+
+class IdPatterns(StationFilter):
+    """
+    Stations with an id matching any of the UNIX style wildcard patterns.
+    """
+    def __init__(self, patterns):
+        self.patterns = StationPatterns(patterns)
+
+    def mask(self, table):
+        return self.patterns.mask(table)
+
+    def id_filter(self):
+        return self.patterns
+
+
+class Box(StationFilter):
+    """
+    Stations within a latitude/longitude box. Boxes crossing the dateline
+    have a minimum longitude larger than the maximum longitude.
+    """
+    def __init__(self, min_latitude, max_latitude, min_longitude,
+                 max_longitude):
+        self.min_latitude = float(min_latitude)
+        self.max_latitude = float(max_latitude)
+        self.min_longitude = float(min_longitude)
+        self.max_longitude = float(max_longitude)
+
+    def mask(self, table):
+        return _indices_to_mask(table.spatial_index.query_box(
+            self.min_latitude, self.max_latitude, self.min_longitude,
+            self.max_longitude, table.latitude, table.longitude), len(table))
+
+
+class Cap(StationFilter):
+    """
+    Stations at most radius degree away from a point.
+    """
+    def __init__(self, latitude, longitude, radius):
+        self.latitude = float(latitude)
+        self.longitude = float(longitude)
+        self.radius = float(radius)
+
+    def mask(self, table):
+        return _indices_to_mask(table.spatial_index.query_radius(
+            self.latitude, self.longitude, self.radius), len(table))
+
+
+class Polygon(StationFilter):
+    """
+    Stations within a polygon on the sphere. Its edges are great circle
+    arcs between consecutive points and the last point connects back to the
+    first one. The polygon has to fit into a hemisphere.
+    """
+    def __init__(self, latitudes, longitudes):
+        latitudes = np.asarray(latitudes, dtype=np.float64)
+        longitudes = np.asarray(longitudes, dtype=np.float64)
+        if latitudes.shape != longitudes.shape or latitudes.ndim != 1 or \
+                len(latitudes) < 3:
+            msg = "A polygon needs at least three points."
+            raise ValueError(msg)
+        self.latitudes = latitudes
+        self.longitudes = longitudes
+        self.cap = bounding_cap(latitudes, longitudes)
+        if self.cap[2] >= 90.0:
+            msg = "The polygon does not fit into a hemisphere."
+            raise ValueError(msg)
+
+        # Great circles are straight lines in a gnomonic projection so the
+        # test is done in the plane tangent to the center of the cap.
+        center = unit_vectors(self.cap[0], self.cap[1])[0]
+        axis = np.array([0.0, 0.0, 1.0]) if abs(center[2]) < 0.9 else \
+            np.array([1.0, 0.0, 0.0])
+        east = np.cross(axis, center)
+        east /= np.linalg.norm(east)
+        self._basis = (center, east, np.cross(center, east))
+        self._x, self._y = self._project(unit_vectors(latitudes, longitudes))
+
+    def _project(self, xyz):
+        center, east, north = self._basis
+        distance = xyz.dot(center)
+        return xyz.dot(east) / distance, xyz.dot(north) / distance
+
+    def mask(self, table):
+        indices = table.spatial_index.query_radius(*self.cap)
+        x, y = self._project(unit_vectors(table.latitude[indices],
+                                          table.longitude[indices]))
+        # Even-odd rule, one edge at a time for all points.
+        inside = np.zeros(len(indices), dtype=bool)
+        x_1, y_1 = self._x, self._y
+        x_2, y_2 = np.roll(x_1, -1), np.roll(y_1, -1)
+        for edge in range(len(x_1)):
+            if y_1[edge] == y_2[edge]:
+                continue
+            crosses = (y_1[edge] > y) != (y_2[edge] > y)
+            intersection = x_1[edge] + (y - y_1[edge]) * \
+                (x_2[edge] - x_1[edge]) / (y_2[edge] - y_1[edge])
+            inside ^= crosses & (x < intersection)
+        return _indices_to_mask(indices[inside], len(table))
+
+
+class _Range(StationFilter):
+    column = None
+
+    def __init__(self, minimum=None, maximum=None):
+        self.minimum = minimum
+        self.maximum = maximum
+
+    def mask(self, table):
+        values = getattr(table, self.column)
+        mask = np.ones(len(values), dtype=bool)
+        if self.minimum is not None:
+            mask &= values >= self.minimum
+        if self.maximum is not None:
+            mask &= values <= self.maximum
+        return mask
+
+
+class ElevationRange(_Range):
+    """
+    Stations with an elevation in meters within the given bounds. Either
+    bound may be None.
+    """
+    column = "elevation_in_m"
+
+
+class DepthRange(_Range):
+    """
+    Stations buried between the given depths in meters beneath the surface.
+    Either bound may be None.
+    """
+    column = "local_depth_in_m"
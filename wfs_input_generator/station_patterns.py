@@ -0,0 +1,108 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Compiled UNIX style wildcard patterns for station ids.
+
+Patterns are sorted by how they can be answered most cheaply:
+
+* Literal ids, e.g. ``"BW.FURT"``, are looked up in the station table.
+* Whole networks, e.g. ``"BW.*"``, are answered from the network index of
+  the table.
+* Patterns with a literal network code, e.g. ``"TA.A*"``, are combined into
+  one regular expression per network which is only matched against the
+  station codes of that network.
+* All others are combined into a single regular expression.
+
+:copyright:
+    Lion Krischer (krischer@geophysik.uni-muenchen.de), 2013
+:license:
+    GNU General Public License, Version 3
+    (http://www.gnu.org/copyleft/gpl.html)
+"""
+import collections
+import fnmatch
+import re
+
+import numpy as np
+
+_MAGIC = re.compile(r"[*?[]")
+
+
+def _has_magic(pattern):
+    return _MAGIC.search(pattern) is not None
+
+
+def _compile(patterns):
+    """
+    A single regular expression fully matching any of the patterns.
+    """
+    return re.compile("|".join("(?:%s)" % fnmatch.translate(_i)
+                               for _i in patterns))
+
+
+class StationPatterns(object):
+    """
+    Picklable function returning True for station ids matching any of the
+    given patterns, the same as ``fnmatch.fnmatchcase()``.
+
+    :type patterns: list of str
+    :param patterns: UNIX style wildcard patterns.
+    """
+    def __init__(self, patterns):
+        self.patterns = tuple(patterns)
+        self.literals = set()
+        self.networks = set()
+        by_network = collections.defaultdict(list)
+        others = []
+        for pattern in self.patterns:
+            network_code, sep, station_code = pattern.partition(".")
+            if not _has_magic(pattern):
+                self.literals.add(pattern)
+            elif sep and not _has_magic(network_code):
+                if station_code == "*":
+                    self.networks.add(network_code)
+                else:
+                    by_network[network_code].append(station_code)
+            else:
+                others.append(pattern)
+        # Station code patterns of networks that are not selected as a whole.
+        self.by_network = dict(
+            (network_code, _compile(station_patterns))
+            for network_code, station_patterns in by_network.items()
+            if network_code not in self.networks)
+        self.others = _compile(others) if others else None
+
+    def __call__(self, station_id):
+        if station_id in self.literals:
+            return True
+        network_code, sep, station_code = station_id.partition(".")
+        if sep:
+            if network_code in self.networks:
+                return True
+            regex = self.by_network.get(network_code)
+            if regex is not None and regex.match(station_code):
+                return True
+        return self.others is not None and \
+            self.others.match(station_id) is not None
+
+    def mask(self, table):
+        """
+        Boolean array, True for the rows of a
+        :class:`~wfs_input_generator.stores.StationTable` with a matching id.
+        """
+        mask = table.network_mask(self.networks)
+        mask[table.row_numbers(self.literals)] = True
+
+        if self.by_network:
+            station_codes = table.station_codes
+            for network_code, regex in self.by_network.items():
+                for row in np.nonzero(table.network_mask([network_code]))[0]:
+                    if not mask[row] and regex.match(station_codes[row]):
+                        mask[row] = True
+
+        if self.others is not None:
+            ids = table.ids
+            for row in np.nonzero(~mask)[0]:
+                if self.others.match(ids[row]):
+                    mask[row] = True
+        return mask
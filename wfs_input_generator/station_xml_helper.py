@@ -13,56 +13,119 @@ from a StationXML file.
 from lxml import etree
 
 
-def extract_coordinates_from_StationXML(file_or_file_object):
-    root = etree.parse(file_or_file_object).getroot()
-    namespace = root.nsmap[None]
+def extract_coordinates_from_StationXML(file_or_file_object,
+                                        id_filter=None):
+    """
+    Returns a list of station dictionaries, one for each station in the
+    StationXML file.
+    """
+    return list(iter_coordinates_from_StationXML(file_or_file_object,
+                                                 id_filter))
+
+
+def iter_coordinates_from_StationXML(file_or_file_object, id_filter=None):
+    """
+    Generator yielding one station dictionary after another.
+
+    The document is parsed incrementally and every station element is
+    discarded once its coordinates have been extracted, thus at most a single
+    station subtree is kept in memory, no matter the size of the file.
+
+    :type id_filter: function
+    :param id_filter: Optional function taking a station id and returning
+        False for stations that are to be skipped. It is called as soon as
+        the start tag of a station has been read and all elements within
+        rejected stations are discarded right after they have been parsed.
+    """
+    tags = None
+    network_code = None
+    # True while within a station rejected by the id filter.
+    rejected = False
+    context = etree.iterparse(file_or_file_object, events=("start", "end"))
+    for event, element in context:
+        # The namespace of the root element is used for all tags.
+        if tags is None:
+            namespace = etree.QName(element).namespace
+            tags = dict((_i, "{%s}%s" % (namespace, _i)) for _i in (
+                "Network", "Station", "Response"))
+
+        if event == "start":
+            if element.tag == tags["Network"]:
+                network_code = element.get("code")
+            elif element.tag == tags["Station"]:
+                rejected = id_filter is not None and not id_filter(
+                    "%s.%s" % (network_code, element.get("code")))
+            continue
+
+        if rejected:
+            _free(element)
+            if element.tag == tags["Station"]:
+                rejected = False
+        elif element.tag == tags["Response"]:
+            # Responses are potentially large and never needed.
+            element.clear()
+        elif element.tag == tags["Station"]:
+            station = _extract_station(element, network_code, namespace)
+            _free(element)
+            yield station
+        elif element.tag == tags["Network"]:
+            _free(element)
+    del context
 
+
+def _free(element):
+    """
+    Frees an element and all its preceding siblings.
+    """
+    element.clear()
+    while element.getprevious() is not None:
+        del element.getparent()[0]
+
+
+def _extract_station(station, network_code, namespace):
+    """
+    Extracts the station dictionary from a single station element.
+    """
     def _ns(tagname):
         return "{%s}%s" % (namespace, tagname)
 
-    all_stations = []
-
-    for network in root.findall(_ns("Network")):
-        network_code = network.get("code")
-        for station in network.findall(_ns("Station")):
-            station_code = station.get("code")
-            station_id = "%s.%s" % (network_code, station_code)
-            station_latitude = _tag2obj(station, _ns("Latitude"), float)
-            station_longitude = _tag2obj(station, _ns("Longitude"), float)
-            station_elevation = _tag2obj(station, _ns("Elevation"), float)
-            # Loop over all channels that might or might not be available. If
-            # all channels have the same coordinates, use those. Otherwise use
-            # the station coordinates.
-            # Potential issues: The local depth is only stored at the channel
-            # level and might thus not end up in the final dictionary.
-            channel_coordinates = set()
-            for channel in station.findall(_ns("Channel")):
-                # Use a hashable dictionary to be able to use a set.
-                coords = HashableDict(
-                    latitude=_tag2obj(channel, _ns("Latitude"), float),
-                    longitude=_tag2obj(channel, _ns("Longitude"), float),
-                    elevation_in_m=_tag2obj(channel, _ns("Elevation"), float),
-                    local_depth_in_m=_tag2obj(channel, _ns("Depth"), float))
-                channel_coordinates.add(coords)
-
-            # Check if it contains exactly one valid element.
-            try:
-                this_channel = channel_coordinates.pop()
-                if len(channel_coordinates) != 0 or \
-                        this_channel["latitude"] is None or \
-                        this_channel["longitude"] is None or \
-                        this_channel["elevation_in_m"] is None or \
-                        this_channel["local_depth_in_m"] is None:
-                    raise
-                valid_channel = this_channel
-            except:
-                valid_channel = {
-                    "latitude": station_latitude,
-                    "longitude": station_longitude,
-                    "elevation_in_m": station_elevation}
-            valid_channel["id"] = station_id
-            all_stations.append(valid_channel)
-    return all_stations
+    station_code = station.get("code")
+    station_id = "%s.%s" % (network_code, station_code)
+    station_latitude = _tag2obj(station, _ns("Latitude"), float)
+    station_longitude = _tag2obj(station, _ns("Longitude"), float)
+    station_elevation = _tag2obj(station, _ns("Elevation"), float)
+    # Loop over all channels that might or might not be available. If
+    # all channels have the same coordinates, use those. Otherwise use
+    # the station coordinates.
+    # Potential issues: The local depth is only stored at the channel
+    # level and might thus not end up in the final dictionary.
+    channel_coordinates = set()
+    for channel in station.findall(_ns("Channel")):
+        # Use a hashable dictionary to be able to use a set.
+        coords = HashableDict(
+            latitude=_tag2obj(channel, _ns("Latitude"), float),
+            longitude=_tag2obj(channel, _ns("Longitude"), float),
+            elevation_in_m=_tag2obj(channel, _ns("Elevation"), float),
+            local_depth_in_m=_tag2obj(channel, _ns("Depth"), float))
+        channel_coordinates.add(coords)
+
+    # Check if it contains exactly one valid element.
+    try:
+        this_channel = channel_coordinates.pop()
+        if len(channel_coordinates) != 0 or \
+                this_channel["latitude"] is None or \
+                this_channel["longitude"] is None or \
+                this_channel["elevation_in_m"] is None or \
+                this_channel["local_depth_in_m"] is None:
+            raise
+        valid_channel = this_channel
+    except:
+        valid_channel = {
+            "latitude": station_latitude,
+            "longitude": station_longitude,
+            "elevation_in_m": station_elevation}
+    valid_channel["id"] = station_id
+    return valid_channel
 
 
 class HashableDict(dict):
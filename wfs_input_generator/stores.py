@@ -0,0 +1,844 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Hash indexed, columnar containers for the stations and events of the input
+file generator.
+
+Adding, deduplicating and counting items is O(1) per item.
+
+:copyright:
+    Lion Krischer (krischer@geophysik.uni-muenchen.de), 2013
+:license:
+    GNU General Public License, Version 3
+    (http://www.gnu.org/copyleft/gpl.html)
+"""
+import collections
+import fnmatch
+
+import numpy as np
+import obspy
+
+from wfs_input_generator.spatial_index import SphericalIndex, unit_vectors
+
+EARTH_RADIUS_IN_KM = 6371.0
+
+
+# Possible ways to deal with a station id that is added more than once with
+# differing coordinates.
+KEEP_FIRST = "keep_first"
+KEEP_LAST = "keep_last"
+RAISE = "error"
+CONFLICT_POLICIES = (KEEP_FIRST, KEEP_LAST, RAISE)
+
+
+class StationTable(object):
+    """
+    Columnar container for the stations keyed by their id.
+
+    The coordinates are stored in float64 columns, the network and station
+    codes as interned strings. Iterating over the table or calling
+    :meth:`values` yields the classic station dictionaries.
+
+    :type on_conflict: str
+    :param on_conflict: What to do if a station id is already part of the
+        table but with different coordinates. ``"keep_first"`` ignores the
+        new station, ``"keep_last"`` replaces the existing one and
+        ``"error"`` raises a ``ValueError``. Exact duplicates are always
+        silently skipped.
+    """
+    COORDINATE_COLUMNS = ("latitude", "longitude", "elevation_in_m",
+                          "local_depth_in_m")
+
+    def __init__(self, on_conflict=KEEP_LAST):
+        self.on_conflict = on_conflict
+        self.clear()
+
+    @classmethod
+    def from_stations(cls, stations, on_conflict=KEEP_LAST):
+        """
+        Create a table from any iterable of station dictionaries. Tables are
+        returned unchanged.
+        """
+        if isinstance(stations, cls):
+            return stations
+        table = cls(on_conflict=on_conflict)
+        table.extend(stations)
+        return table
+
+    @property
+    def on_conflict(self):
+        return self.__on_conflict
+
+    @on_conflict.setter
+    def on_conflict(self, value):
+        if value not in CONFLICT_POLICIES:
+            msg = "on_conflict must be one of %s." % ", ".join(
+                CONFLICT_POLICIES)
+            raise ValueError(msg)
+        self.__on_conflict = value
+
+    def clear(self):
+        self._bump_version()
+        self._size = 0
+        self._coordinates = np.empty((0, 4), dtype=np.float64)
+        # Index into self._network_codes, -1 for ids without a network part.
+        self._network_index = np.empty(0, dtype=np.int32)
+        self._network_codes = []
+        self._network_lookup = {}
+        self._station_codes = []
+        self._rows = {}
+        self._spatial_index = SphericalIndex()
+
+    def _bump_version(self):
+        self._version = getattr(self, "_version", 0) + 1
+
+    @property
+    def version(self):
+        """
+        Changes whenever stations are added or changed.
+        """
+        return self._version
+
+    def _reserve(self, count):
+        """
+        Make sure there is space for count more rows. Grows geometrically.
+        """
+        required = self._size + count
+        capacity = len(self._coordinates)
+        if required <= capacity:
+            return
+        capacity = max(required, 2 * capacity, 16)
+        coordinates = np.empty((capacity, 4), dtype=np.float64)
+        coordinates[:self._size] = self._coordinates[:self._size]
+        self._coordinates = coordinates
+        network_index = np.empty(capacity, dtype=np.int32)
+        network_index[:self._size] = self._network_index[:self._size]
+        self._network_index = network_index
+
+    def _get_network_index(self, network_code):
+        if network_code is None:
+            return -1
+        try:
+            return self._network_lookup[network_code]
+        except KeyError:
+            index = len(self._network_codes)
+            self._network_codes.append(intern(network_code))
+            self._network_lookup[network_code] = index
+            return index
+
+    def _add_row(self, station_id, coordinates):
+        row = self._rows.get(station_id)
+        if row is not None:
+            if self.on_conflict == KEEP_FIRST or \
+                    tuple(self._coordinates[row]) == coordinates:
+                return
+            if self.on_conflict == RAISE:
+                msg = ("Station '%s' has already been added with different "
+                       "coordinates.") % station_id
+                raise ValueError(msg)
+            self._coordinates[row] = coordinates
+            self._bump_version()
+            # The index cannot move single points.
+            if row < len(self._spatial_index):
+                self._spatial_index.clear()
+            return
+
+        network_code, station_code = split_station_id(station_id)
+        self._reserve(1)
+        row = self._size
+        self._coordinates[row] = coordinates
+        self._network_index[row] = self._get_network_index(network_code)
+        self._station_codes.append(intern(station_code))
+        self._rows[station_id] = row
+        self._size += 1
+        self._bump_version()
+
+    def add(self, station):
+        """
+        Add a single station dictionary. A missing local depth is assumed to
+        be zero.
+        """
+        self._add_row(str(station["id"]), (
+            float(station["latitude"]),
+            float(station["longitude"]),
+            float(station["elevation_in_m"]),
+            float(station.get("local_depth_in_m", 0.0))))
+
+    def extend(self, stations):
+        if isinstance(stations, StationTable):
+            self.add_columns(stations.ids, stations.latitude,
+                             stations.longitude, stations.elevation_in_m,
+                             stations.local_depth_in_m)
+            return
+        for station in stations:
+            self.add(station)
+
+    def add_columns(self, ids, latitude, longitude, elevation_in_m,
+                    local_depth_in_m=None):
+        """
+        Add many stations at once from equal length columns.
+        """
+        ids = [str(_i) for _i in ids]
+        columns = [np.asarray(latitude, dtype=np.float64),
+                   np.asarray(longitude, dtype=np.float64),
+                   np.asarray(elevation_in_m, dtype=np.float64)]
+        if local_depth_in_m is None:
+            columns.append(np.zeros(len(ids), dtype=np.float64))
+        else:
+            columns.append(np.asarray(local_depth_in_m, dtype=np.float64))
+        for column in columns:
+            if column.shape != (len(ids),):
+                msg = "All columns must have the same length as the ids."
+                raise ValueError(msg)
+        coordinates = np.column_stack(columns) if ids else \
+            np.empty((0, 4), dtype=np.float64)
+
+        # Slow path if any id has to be resolved against an existing one.
+        if len(set(ids)) != len(ids) or \
+                any(_i in self._rows for _i in ids):
+            for station_id, coords in zip(ids, coordinates):
+                self._add_row(station_id, tuple(coords))
+            return
+
+        count = len(ids)
+        self._reserve(count)
+        start = self._size
+        self._coordinates[start:start + count] = coordinates
+        for row, station_id in enumerate(ids, start):
+            network_code, station_code = split_station_id(station_id)
+            self._network_index[row] = \
+                self._get_network_index(network_code)
+            self._station_codes.append(intern(station_code))
+            self._rows[station_id] = row
+        self._size += count
+        self._bump_version()
+
+    @property
+    def latitude(self):
+        return self._coordinates[:self._size, 0]
+
+    @property
+    def longitude(self):
+        return self._coordinates[:self._size, 1]
+
+    @property
+    def elevation_in_m(self):
+        return self._coordinates[:self._size, 2]
+
+    @property
+    def local_depth_in_m(self):
+        return self._coordinates[:self._size, 3]
+
+    @property
+    def spatial_index(self):
+        """
+        :class:`~wfs_input_generator.spatial_index.SphericalIndex` of all
+        rows. Rows added since the last access are indexed on access.
+        """
+        start = len(self._spatial_index)
+        self._spatial_index.extend(self.latitude[start:],
+                                   self.longitude[start:])
+        return self._spatial_index
+
+    def within_radius(self, latitude, longitude, radius):
+        """
+        Return a new table with all stations at most radius degree away from
+        the given point.
+        """
+        return self.take(self.spatial_index.query_radius(
+            latitude, longitude, radius))
+
+    def nearest(self, latitude, longitude, k=1):
+        """
+        Return a new table with the k stations closest to the given point,
+        sorted by their distance.
+        """
+        return self.take(self.spatial_index.query_nearest(
+            latitude, longitude, k)[0])
+
+    def within_box(self, min_latitude, max_latitude, min_longitude,
+                   max_longitude):
+        """
+        Return a new table with all stations within a latitude/longitude
+        box. Boxes crossing the dateline have a minimum longitude larger
+        than the maximum longitude.
+        """
+        return self.take(self.spatial_index.query_box(
+            min_latitude, max_latitude, min_longitude, max_longitude,
+            self.latitude, self.longitude))
+
+    @property
+    def network_codes(self):
+        """
+        Per row network codes. Empty for ids without a network part.
+        """
+        codes = np.array(self._network_codes + [""], dtype=object)
+        return list(codes[self._network_index[:self._size]])
+
+    @property
+    def station_codes(self):
+        return list(self._station_codes)
+
+    def seed_codes(self):
+        """
+        Lists of the network and of the station codes written to the input
+        files of the solvers. These are the first two dot separated parts of
+        each id, the same as ``station_id.split(".")[:2]``, so further parts
+        like location codes are ignored. Raises a ValueError for ids without
+        a network part.
+        """
+        missing = np.nonzero(self._network_index[:self._size] == -1)[0]
+        if len(missing):
+            msg = "Station id '%s' has no network code." % \
+                self._station_codes[missing[0]]
+            raise ValueError(msg)
+        return self.network_codes, [_i.split(".")[0] for _i in
+                                    self._station_codes]
+
+    def network_mask(self, network_codes):
+        """
+        Boolean array, True for all rows of any of the given networks.
+        """
+        indices = [self._network_lookup[_i] for _i in network_codes
+                   if _i in self._network_lookup]
+        return np.in1d(self._network_index[:self._size], indices)
+
+    def row_numbers(self, station_ids):
+        """
+        Sorted row numbers of all given ids that are part of the table.
+        """
+        return sorted(self._rows[_i] for _i in station_ids
+                      if _i in self._rows)
+
+    @property
+    def ids(self):
+        codes = self._network_codes
+        return [self._station_codes[_i] if net == -1 else
+                "%s.%s" % (codes[net], self._station_codes[_i])
+                for _i, net in enumerate(self._network_index[:self._size])]
+
+    def row(self, index):
+        """
+        The station dictionary of a single row.
+        """
+        if not -self._size <= index < self._size:
+            raise IndexError("Row index out of range.")
+        index %= self._size
+        net = self._network_index[index]
+        station_id = self._station_codes[index] if net == -1 else \
+            "%s.%s" % (self._network_codes[net], self._station_codes[index])
+        lat, lng, ele, depth = self._coordinates[index].tolist()
+        return {"id": station_id, "latitude": lat, "longitude": lng,
+                "elevation_in_m": ele, "local_depth_in_m": depth}
+
+    def values(self):
+        """
+        List of station dictionaries, the classic representation.
+        """
+        return [self.row(_i) for _i in range(self._size)]
+
+    def take(self, indices):
+        """
+        Return a new table with the given rows, either as integer indices or
+        as a boolean mask.
+        """
+        indices = np.asarray(indices)
+        if indices.dtype == np.bool_:
+            indices = np.nonzero(indices)[0]
+        indices = indices.astype(np.intp)
+        ids = self.ids
+        coordinates = self._coordinates[:self._size][indices]
+        table = StationTable(on_conflict=self.on_conflict)
+        table.add_columns([ids[_i] for _i in indices], *coordinates.T)
+        return table
+
+    def sorted_by_id(self):
+        """
+        Return a new table sorted by station id.
+        """
+        ids = self.ids
+        return self.take(sorted(range(self._size), key=ids.__getitem__))
+
+    def __contains__(self, station_id):
+        return station_id in self._rows
+
+    def __getitem__(self, key):
+        """
+        Station dictionaries by position like a list, a slice returns a list
+        of them, or a single one by station id.
+        """
+        if isinstance(key, slice):
+            return [self.row(_i) for _i in range(*key.indices(self._size))]
+        if isinstance(key, (int, long, np.integer)):
+            return self.row(key)
+        return self.row(self._rows[key])
+
+    def __iter__(self):
+        for index in range(self._size):
+            yield self.row(index)
+
+    def __len__(self):
+        return self._size
+
+
+def split_station_id(station_id):
+    """
+    Split a station id into its network and station code. The network code is
+    None if the id has no network part.
+
+    >>> split_station_id("BW.FURT")
+    ('BW', 'FURT')
+    >>> split_station_id("FURT")
+    (None, 'FURT')
+    """
+    network_code, sep, station_code = station_id.partition(".")
+    if not sep:
+        return None, station_id
+    return network_code, station_code
+
+
+# Float columns of the events. The origin time is stored separately in ns.
+EVENT_FLOAT_COLUMNS = ["latitude", "longitude", "depth_in_km", "m_rr", "m_tt",
+                       "m_pp", "m_rt", "m_rp", "m_tp"]
+TENSOR_COMPONENTS = EVENT_FLOAT_COLUMNS[3:]
+
+
+def event_columns(events):
+    """
+    Dictionary with the columns of an :class:`EventStore` or a list of event
+    dictionaries: Arrays for all EVENT_FLOAT_COLUMNS and the origin times in
+    ns (``"origin_time_ns"``) and lists of the ``"descriptions"`` and the
+    ``"event_ids"``, None if not given.
+    """
+    if isinstance(events, EventStore):
+        return events.columns()
+    values = np.array([[_i[_j] for _j in EVENT_FLOAT_COLUMNS]
+                       for _i in events], dtype=np.float64).reshape(
+        len(events), len(EVENT_FLOAT_COLUMNS))
+    columns = dict(zip(EVENT_FLOAT_COLUMNS, values.T))
+    columns["origin_time_ns"] = np.array(
+        [_i["origin_time"]._ns for _i in events], dtype=np.int64)
+    columns["descriptions"] = [_i.get("description") for _i in events]
+    columns["event_ids"] = [_i.get("_event_id") for _i in events]
+    return columns
+
+
+def scalar_moments(m_rr, m_tt, m_pp, m_rt, m_rp, m_tp):
+    """
+    Scalar moments of moment tensors. Works on scalars and arrays.
+    """
+    return np.sqrt(
+        np.square(m_rr) + np.square(m_tt) + np.square(m_pp) +
+        2.0 * (np.square(m_rt) + np.square(m_rp) + np.square(m_tp))) / \
+        np.sqrt(2.0)
+
+
+def moment_magnitudes(m_rr, m_tt, m_pp, m_rt, m_rp, m_tp):
+    """
+    Moment magnitudes of moment tensors in Nm. Works on scalars and arrays.
+
+    >>> print("%.2f" % moment_magnitudes(1E19, -1E19, 0, 0, 0, 0))
+    6.60
+    """
+    with np.errstate(divide="ignore"):
+        return 2.0 / 3.0 * (np.log10(scalar_moments(
+            m_rr, m_tt, m_pp, m_rt, m_rp, m_tp)) - 9.1)
+
+
+class EventIndex(object):
+    """
+    Lookup structures over an :class:`EventStore` or a list of event
+    dictionaries: A hash map of the lowercase event ids and sorted origin
+    time, magnitude and depth columns. All queries return positions.
+    """
+    def __init__(self, events):
+        self._size = len(events)
+        columns = event_columns(events)
+        self._ids = {}
+        for position, event_id in enumerate(columns["event_ids"]):
+            if event_id is not None:
+                self._ids.setdefault(event_id.lower(), []).append(position)
+
+        columns = {
+            "origin_time": columns["origin_time_ns"],
+            "magnitude": moment_magnitudes(*[
+                columns[_i] for _i in TENSOR_COMPONENTS]),
+            "depth_in_km": columns["depth_in_km"]}
+        # Column name => (positions sorted by the values, sorted values)
+        self._sorted = {}
+        for name, column in columns.items():
+            order = np.argsort(column, kind="mergesort")
+            self._sorted[name] = (order, column[order])
+
+    def __len__(self):
+        return self._size
+
+    def by_ids(self, event_ids):
+        """
+        Sorted positions of all events with any of the ids, ignoring the
+        case.
+        """
+        positions = set()
+        for event_id in event_ids:
+            positions.update(self._ids.get(event_id.lower(), ()))
+        return np.array(sorted(positions), dtype=np.intp)
+
+    def in_range(self, name, minimum=None, maximum=None):
+        """
+        Sorted positions of all events with a value of the column
+        ``"origin_time"`` (in ns), ``"magnitude"`` or ``"depth_in_km"``
+        within the bounds. Either bound may be None.
+        """
+        order, values = self._sorted[name]
+        start = 0 if minimum is None else \
+            np.searchsorted(values, minimum, side="left")
+        end = len(values) if maximum is None else \
+            np.searchsorted(values, maximum, side="right")
+        return np.sort(order[start:end])
+
+    def select(self, event_ids=None, starttime=None, endtime=None,
+               min_magnitude=None, max_magnitude=None, min_depth_in_km=None,
+               max_depth_in_km=None):
+        """
+        Sorted positions of all events fulfilling all given criteria. Times
+        are UTCDateTime objects.
+        """
+        selections = []
+        if event_ids is not None:
+            selections.append(self.by_ids(event_ids))
+        criteria = [
+            ("origin_time",
+             None if starttime is None else starttime._ns,
+             None if endtime is None else endtime._ns),
+            ("magnitude", min_magnitude, max_magnitude),
+            ("depth_in_km", min_depth_in_km, max_depth_in_km)]
+        for name, minimum, maximum in criteria:
+            if minimum is not None or maximum is not None:
+                selections.append(self.in_range(name, minimum, maximum))
+        if not selections:
+            return np.arange(self._size, dtype=np.intp)
+        # Intersect starting with the smallest selection.
+        selections.sort(key=len)
+        positions = selections[0]
+        for selection in selections[1:]:
+            positions = np.intersect1d(positions, selection,
+                                       assume_unique=True)
+        return positions
+
+
+# Default tolerances within which two events are the same earthquake, e.g.
+# reported by different agencies.
+DUPLICATE_TOLERANCES = {
+    "max_time_difference_in_s": 10.0,
+    "max_distance_in_km": 50.0,
+    "max_depth_difference_in_km": 30.0}
+
+
+def duplicate_event_groups(events, max_time_difference_in_s=10.0,
+                           max_distance_in_km=50.0,
+                           max_depth_difference_in_km=30.0):
+    """
+    Groups events closer than all tolerances in origin time, epicentral
+    distance and depth. Returns an array with the group of each event,
+    numbered by the first event of each group. Groups are transitive: Two
+    events are in the same group if they are connected by a chain of close
+    events.
+
+    The events are sorted by origin time and swept with a growing lag: All
+    pairs of events k positions apart are compared at once until no pair is
+    within the time tolerance anymore. This is O(N log N) unless many events
+    happen within the time tolerance.
+
+    >>> ev = dict.fromkeys(EVENT_FLOAT_COLUMNS, 0.0)
+    >>> ev.update(depth_in_km=10.0, origin_time=obspy.UTCDateTime(2012, 1, 1))
+    >>> duplicate_event_groups([ev, dict(ev, latitude=10.0),
+    ...                         dict(ev, origin_time=ev["origin_time"] + 1)])
+    array([0, 1, 0])
+    """
+    count = len(events)
+    groups = np.arange(count, dtype=np.intp)
+    if count < 2:
+        return groups
+    columns = event_columns(events)
+    order = np.argsort(columns["origin_time_ns"], kind="mergesort")
+    ns = columns["origin_time_ns"][order]
+    xyz = unit_vectors(columns["latitude"][order],
+                       columns["longitude"][order])
+    depth = columns["depth_in_km"][order]
+    max_ns = int(round(max_time_difference_in_s * 1E9))
+    # Compared on the cosine of the angle to avoid the arccos.
+    min_cosine = np.cos(min(max_distance_in_km / EARTH_RADIUS_IN_KM, np.pi))
+
+    # Union-find over the positions in the sorted arrays.
+    parents = np.arange(count, dtype=np.intp)
+
+    def _root(position):
+        while parents[position] != position:
+            parents[position] = parents[parents[position]]
+            position = parents[position]
+        return position
+
+    for lag in range(1, count):
+        within = np.nonzero(ns[lag:] - ns[:-lag] <= max_ns)[0]
+        if not len(within):
+            break
+        other = within + lag
+        close = (np.einsum("ij,ij->i", xyz[within], xyz[other]) >=
+                 min_cosine) & \
+            (np.abs(depth[within] - depth[other]) <=
+             max_depth_difference_in_km)
+        for first, second in zip(within[close].tolist(),
+                                 other[close].tolist()):
+            first, second = _root(first), _root(second)
+            if first != second:
+                parents[max(first, second)] = min(first, second)
+
+    # Number each group by its first event in the original order.
+    roots = np.array([_root(_i) for _i in range(count)], dtype=np.intp)
+    first = np.full(count, count, dtype=np.intp)
+    np.minimum.at(first, roots, order)
+    groups[order] = first[roots]
+    return groups
+
+
+def unique_event_positions(events, preference=None, **tolerances):
+    """
+    Sorted positions of the events kept by :func:`remove_duplicate_events`.
+    """
+    groups = duplicate_event_groups(events, **tolerances)
+    preference = list(preference or [])
+    event_ids = event_columns(events)["event_ids"] if preference else None
+
+    def _rank(position):
+        event_id = event_ids[position] if preference else None
+        if event_id is not None:
+            for rank, pattern in enumerate(preference):
+                if fnmatch.fnmatchcase(event_id, pattern):
+                    return rank
+        return len(preference)
+
+    members = collections.defaultdict(list)
+    for position in np.nonzero(groups != np.arange(len(events)))[0]:
+        members[groups[position]].append(position)
+    keep = np.ones(len(events), dtype=bool)
+    for group, positions in members.items():
+        positions = [group] + positions
+        best = min(positions, key=lambda x: (_rank(x), x))
+        keep[positions] = False
+        keep[best] = True
+    return np.nonzero(keep)[0]
+
+
+def remove_duplicate_events(events, preference=None, **tolerances):
+    """
+    Returns the events without duplicates as found by
+    :func:`duplicate_event_groups` with the given tolerances. Of each group
+    of duplicates the event preferred by the preference is kept, otherwise
+    the first one. The order of the events is kept.
+
+    :type events: list of dict or :class:`EventStore`
+    :param events: The events. A new store is returned for stores.
+    :type preference: list of str
+    :param preference: UNIX style wildcard patterns of event ids, most
+        preferred first, e.g. ``["smi:local/ndk/*", "*usgs*"]``. Event ids
+        usually tell the agency. Events without or with a non-matching id
+        come last.
+    """
+    positions = unique_event_positions(events, preference, **tolerances)
+    if isinstance(events, EventStore):
+        return events.take(positions)
+    return [events[_i] for _i in positions.tolist()]
+
+
+class EventStore(object):
+    """
+    Columnar container for the events in insertion order which skips exact
+    duplicates.
+
+    Coordinates and moment tensor components are stored in float64 columns,
+    origin times as int64 nanoseconds. Iterating over the store or calling
+    :meth:`values` yields the classic event dictionaries with the keys of
+    the columns, ``"description"`` and, if given, ``"_event_id"``. Other
+    keys are not kept.
+    """
+    def __init__(self):
+        self._values = np.empty((0, len(EVENT_FLOAT_COLUMNS)),
+                                dtype=np.float64)
+        self._ns = np.empty(0, dtype=np.int64)
+        self._descriptions = []
+        self._event_ids = []
+        # Tuple of all values of an event => row
+        self._rows = {}
+        self._keys = []
+        self._size = 0
+        self._version = 0
+        self._index = None
+
+    @classmethod
+    def from_events(cls, events):
+        store = cls()
+        store.extend(events)
+        return store
+
+    @property
+    def version(self):
+        """
+        Changes whenever events are added or removed.
+        """
+        return self._version
+
+    @property
+    def index(self):
+        """
+        :class:`EventIndex` over the events, built again after any change.
+        """
+        if self._index is None or self._index[0] != self._version:
+            self._index = (self._version, EventIndex(self))
+        return self._index[1]
+
+    def _reserve(self, count):
+        if self._size + count <= len(self._ns):
+            return
+        capacity = max(self._size + count, 2 * len(self._ns), 16)
+        values = np.empty((capacity, len(EVENT_FLOAT_COLUMNS)),
+                          dtype=np.float64)
+        values[:self._size] = self._values[:self._size]
+        ns = np.empty(capacity, dtype=np.int64)
+        ns[:self._size] = self._ns[:self._size]
+        self._values, self._ns = values, ns
+
+    def add(self, event):
+        self.extend([event])
+
+    def extend(self, events):
+        """
+        Adds a list of event dictionaries. All columns are converted at once.
+        """
+        if not isinstance(events, list):
+            events = list(events)
+        columns = event_columns(events)
+        values = np.column_stack([columns[_i] for _i in EVENT_FLOAT_COLUMNS])
+        ns = columns["origin_time_ns"]
+        # Events are equal if all columns are equal.
+        keys = [tuple(_i) for _i in zip(
+            ns.tolist(), columns["descriptions"], columns["event_ids"],
+            *values.T.tolist())]
+        new = []
+        for position, key in enumerate(keys):
+            if key not in self._rows:
+                self._rows[key] = self._size + len(new)
+                self._keys.append(key)
+                new.append(position)
+        if not new:
+            return
+
+        self._reserve(len(new))
+        end = self._size + len(new)
+        self._values[self._size:end] = values[new]
+        self._ns[self._size:end] = ns[new]
+        self._descriptions.extend(columns["descriptions"][_i] for _i in new)
+        self._event_ids.extend(columns["event_ids"][_i] for _i in new)
+        self._size = end
+        self._version += 1
+
+    def clear(self):
+        version = self._version
+        self.__init__()
+        self._version = version + 1
+
+    def columns(self):
+        """
+        See :func:`event_columns`. The arrays are views and must not be
+        changed.
+        """
+        columns = dict(zip(EVENT_FLOAT_COLUMNS,
+                           self._values[:self._size].T))
+        columns["origin_time_ns"] = self._ns[:self._size]
+        columns["descriptions"] = self._descriptions
+        columns["event_ids"] = self._event_ids
+        return columns
+
+    @property
+    def latitude(self):
+        return self._values[:self._size, 0]
+
+    @property
+    def longitude(self):
+        return self._values[:self._size, 1]
+
+    @property
+    def depth_in_km(self):
+        return self._values[:self._size, 2]
+
+    @property
+    def tensor(self):
+        """
+        Array of shape (N, 6) with the moment tensor components in Nm in the
+        order of TENSOR_COMPONENTS.
+        """
+        return self._values[:self._size, 3:]
+
+    @property
+    def origin_time_ns(self):
+        return self._ns[:self._size]
+
+    @property
+    def event_ids(self):
+        return list(self._event_ids)
+
+    def scalar_moments(self):
+        """
+        Scalar moments of all events in Nm.
+        """
+        return scalar_moments(*self.tensor.T)
+
+    def moment_magnitudes(self):
+        """
+        Moment magnitudes of all events.
+        """
+        return moment_magnitudes(*self.tensor.T)
+
+    def take(self, indices):
+        """
+        Return a new store with the events at the given positions or a
+        boolean mask in the given order.
+        """
+        indices = np.asarray(indices)
+        if indices.dtype == bool:
+            indices = np.nonzero(indices)[0]
+        indices = indices.astype(np.intp).tolist()
+        store = EventStore()
+        store._keys = [self._keys[_i] for _i in indices]
+        store._rows = dict((key, row) for row, key in enumerate(store._keys))
+        if len(store._rows) != len(indices):
+            msg = "Every event can only be taken once."
+            raise ValueError(msg)
+        store._values = self._values[:self._size][indices]
+        store._ns = self._ns[:self._size][indices]
+        store._descriptions = [self._descriptions[_i] for _i in indices]
+        store._event_ids = [self._event_ids[_i] for _i in indices]
+        store._size = len(indices)
+        store._version = 1
+        return store
+
+    def row(self, index):
+        """
+        The event dictionary of a row.
+        """
+        values = self._values[index].tolist()
+        event = dict(zip(EVENT_FLOAT_COLUMNS, values))
+        event["origin_time"] = obspy.UTCDateTime(ns=int(self._ns[index]))
+        event["description"] = self._descriptions[index]
+        if self._event_ids[index] is not None:
+            event["_event_id"] = self._event_ids[index]
+        return event
+
+    def values(self):
+        return [self.row(_i) for _i in range(self._size)]
+
+    def __iter__(self):
+        for index in range(self._size):
+            yield self.row(index)
+
+    def __len__(self):
+        return self._size
@@ -0,0 +1,267 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Column-wise reading and validation of tabular station lists and of long
+lists of station and event dictionaries.
+
+Stations can be given as CSV files, NumPy npz files or dictionaries of equal
+length arrays. All checks run on whole columns at once, no dictionary is
+created per station.
+
+:copyright:
+    Lion Krischer (krischer@geophysik.uni-muenchen.de), 2013
+:license:
+    GNU General Public License, Version 3
+    (http://www.gnu.org/copyleft/gpl.html)
+"""
+import csv
+import io
+
+import numpy as np
+import obspy
+
+# Accepted column names. The first one of each is the canonical name.
+STATION_COLUMN_ALIASES = {
+    "id": ("id", "station_id"),
+    "latitude": ("latitude", "lat"),
+    "longitude": ("longitude", "lon", "lng"),
+    "elevation_in_m": ("elevation_in_m", "elevation", "ele", "elev"),
+    "local_depth_in_m": ("local_depth_in_m", "local_depth", "depth")}
+
+# Keys every station and event dictionary needs.
+STATION_KEYS = ["latitude", "longitude", "elevation_in_m", "id"]
+EVENT_KEYS = ["latitude", "longitude", "depth_in_km", "origin_time", "m_rr",
+              "m_tt", "m_pp", "m_rt", "m_rp", "m_tp"]
+
+# Valid ranges of the coordinates.
+COORDINATE_RANGES = {
+    "latitude": (-90.0, 90.0),
+    "longitude": (-180.0, 180.0)}
+
+
+def _is_npz(head):
+    return head[:4] == b"PK\x03\x04"
+
+
+def _read_csv(fh):
+    reader = csv.reader(fh)
+    try:
+        header = [_i.strip() for _i in next(reader)]
+    except StopIteration:
+        msg = "The CSV file is empty."
+        raise ValueError(msg)
+    rows = [_i for _i in reader if _i]
+    if any(len(_i) != len(header) for _i in rows):
+        msg = "All rows of the CSV file need %i columns." % len(header)
+        raise ValueError(msg)
+    columns = zip(*rows) if rows else [()] * len(header)
+    return dict((name, np.array(column, dtype=np.bytes_))
+                for name, column in zip(header, columns))
+
+
+def read_table(source):
+    """
+    Returns a dictionary of column arrays from a CSV file, a npz file or a
+    dictionary of array-likes. Files can be filenames or file-like objects.
+    """
+    if isinstance(source, dict):
+        return dict((name, np.asarray(value))
+                    for name, value in source.items())
+
+    if hasattr(source, "read") and hasattr(source.read, "__call__"):
+        data = source.read()
+    else:
+        with open(source, "rb") as fh:
+            data = fh.read()
+    if _is_npz(data):
+        with np.load(io.BytesIO(data)) as npz:
+            return dict((name, npz[name]) for name in npz.files)
+    return _read_csv(io.BytesIO(data))
+
+
+def _string_column(column):
+    if column.dtype.kind == "U":
+        return [str(_i) for _i in column.tolist()]
+    if column.dtype.kind == "S":
+        return [_i.strip() for _i in column.tolist()]
+    return [str(_i).strip() for _i in column.tolist()]
+
+
+def _float_column(name, column):
+    try:
+        if column.dtype.kind in "SU":
+            column = np.char.strip(column)
+        return np.asarray(column, dtype=np.float64)
+    except (TypeError, ValueError):
+        msg = "Column '%s' contains values that are not numbers." % name
+        raise ValueError(msg)
+
+
+def validate_station_columns(columns):
+    """
+    Checks a dictionary of station columns and returns a tuple of the list
+    of ids and the latitude, longitude, elevation and local depth arrays.
+
+    Column names may be any of the aliases in STATION_COLUMN_ALIASES. The id
+    can alternatively be given as separate network and station columns. The
+    local depth is optional and zero if not given. Raises a ValueError for
+    missing or unequal length columns, for NaNs and for coordinates out of
+    range.
+    """
+    found = {}
+    for name, aliases in STATION_COLUMN_ALIASES.items():
+        for alias in aliases:
+            if alias in columns:
+                found[name] = np.asarray(columns[alias])
+                break
+    if "id" not in found and "network" in columns and "station" in columns:
+        found["id"] = np.array(
+            ["%s.%s" % _i for _i in zip(
+                _string_column(np.asarray(columns["network"])),
+                _string_column(np.asarray(columns["station"])))])
+
+    missing = [_i for _i in ("id", "latitude", "longitude", "elevation_in_m")
+               if _i not in found]
+    if missing:
+        msg = "Station tables need the columns: %s." % ", ".join(missing)
+        raise ValueError(msg)
+    if any(_i.ndim != 1 for _i in found.values()) or \
+            len(set(len(_i) for _i in found.values())) != 1:
+        msg = "All station columns need to be one-dimensional and of the " \
+            "same length."
+        raise ValueError(msg)
+
+    ids = _string_column(found["id"])
+    if not all(ids):
+        msg = "Column 'id' contains empty values."
+        raise ValueError(msg)
+    values = [_float_column(_i, found[_i]) for _i in (
+        "latitude", "longitude", "elevation_in_m")]
+    if "local_depth_in_m" in found:
+        values.append(_float_column("local_depth_in_m",
+                                    found["local_depth_in_m"]))
+    else:
+        values.append(np.zeros(len(ids), dtype=np.float64))
+
+    for name, column in zip(("latitude", "longitude", "elevation_in_m",
+                             "local_depth_in_m"), values):
+        invalid = ~np.isfinite(column)
+        if invalid.any():
+            msg = "Column '%s' contains NaN or infinite values (e.g. for " \
+                "station '%s')." % (name, ids[np.nonzero(invalid)[0][0]])
+            raise ValueError(msg)
+        if name not in COORDINATE_RANGES:
+            continue
+        low, high = COORDINATE_RANGES[name]
+        invalid = (column < low) | (column > high)
+        if invalid.any():
+            msg = "Column '%s' contains values outside of [%g, %g] (e.g. " \
+                "for station '%s')." % (name, low, high,
+                                        ids[np.nonzero(invalid)[0][0]])
+            raise ValueError(msg)
+
+    return tuple([ids] + values)
+
+
+def _positions(indices, offset):
+    positions = [str(_i + offset) for _i in indices[:10]]
+    if len(indices) > 10:
+        positions.append("...")
+    return ", ".join(positions)
+
+
+def _check_keys(dicts, keys, msg, offset):
+    """
+    Raises a ValueError with msg listing the positions of all dictionaries
+    lacking any of the keys.
+    """
+    invalid = [_i for _i, item in enumerate(dicts)
+               if any(_j not in item for _j in keys)]
+    if invalid:
+        msg += " Invalid dictionaries at the positions: %s." % _positions(
+            invalid, offset)
+        raise ValueError(msg)
+
+
+def _to_floats(values):
+    """
+    Converts a list of values with float() in one go. Returns the array and
+    the indices of all values that could not be converted.
+    """
+    # NumPy silently converts None to NaN.
+    if not any(_i is None for _i in values):
+        column = np.empty(len(values), dtype=object)
+        column[:] = values
+        try:
+            return column.astype(np.float64), []
+        except (TypeError, ValueError):
+            pass
+    result = np.zeros(len(values), dtype=np.float64)
+    invalid = []
+    for index, value in enumerate(values):
+        try:
+            result[index] = float(value)
+        except (TypeError, ValueError):
+            invalid.append(index)
+    return result, invalid
+
+
+def _float_columns(dicts, keys, offset):
+    columns = []
+    for key in keys:
+        column, invalid = _to_floats([_i[key] for _i in dicts])
+        if invalid:
+            msg = ("Could not convert '%s' to a float for the dictionaries "
+                   "at the positions: %s." % (
+                       key, _positions(invalid, offset)))
+            raise ValueError(msg)
+        columns.append(column)
+    return columns
+
+
+def station_columns_from_dicts(dicts, offset=0):
+    """
+    Checks and converts a list of station dictionaries column by column.
+
+    Accepts and rejects exactly the same dictionaries as checking them one
+    by one, but reports all invalid ones at once. Positions in error
+    messages are shifted by offset.
+
+    Returns a tuple of the list of ids and the latitude, longitude,
+    elevation and local depth arrays. Missing or invalid local depths are
+    zero.
+    """
+    _check_keys(dicts, STATION_KEYS, (
+        "Each station dictionary needs to at least have 'latitude', "
+        "'longitude', 'elevation_in_m', and 'id' keys."), offset)
+    ids = [str(_i["id"]) for _i in dicts]
+    latitude, longitude, elevation = _float_columns(
+        dicts, ["latitude", "longitude", "elevation_in_m"], offset)
+    local_depth, _ = _to_floats([_i.get("local_depth_in_m") for _i in dicts])
+    return ids, latitude, longitude, elevation, local_depth
+
+
+def events_from_dicts(dicts, offset=0):
+    """
+    Checks and converts a list of event dictionaries column by column and
+    returns new dictionaries with only the known keys.
+
+    Accepts and rejects exactly the same dictionaries as checking them one
+    by one, but reports all invalid ones at once. Positions in error
+    messages are shifted by offset.
+    """
+    _check_keys(dicts, EVENT_KEYS, (
+        "Each station events needs to at least have {keys} keys.").format(
+        keys=", ".join(EVENT_KEYS)), offset)
+    float_keys = [_i for _i in EVENT_KEYS if _i != "origin_time"]
+    columns = [_i.tolist() for _i in
+               _float_columns(dicts, float_keys, offset)]
+    # UTCDateTime objects are effectively immutable and creating them is
+    # expensive so existing ones are reused.
+    columns.append([
+        _i["origin_time"] if isinstance(_i["origin_time"], obspy.UTCDateTime)
+        else obspy.UTCDateTime(_i["origin_time"]) for _i in dicts])
+    columns.append([str(_i["description"]) if _i.get("description")
+                    is not None else None for _i in dicts])
+    keys = float_keys + ["origin_time", "description"]
+    return [dict(zip(keys, _i)) for _i in zip(*columns)]
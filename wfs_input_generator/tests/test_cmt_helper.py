@@ -0,0 +1,145 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Tests the NDK and CMTSOLUTION readers and the CMTSOLUTION writer.
+
+:copyright:
+    Lion Krischer (krischer@geophysik.uni-muenchen.de), 2013
+:license:
+    GNU General Public License, Version 3
+    (http://www.gnu.org/copyleft/gpl.html)
+"""
+from wfs_input_generator import cmt_helper
+from wfs_input_generator.cmt_helper import extract_events_from_CMTSOLUTION, \
+    extract_events_from_NDK, iter_events_from_NDK, render_CMTSOLUTIONs
+from wfs_input_generator.input_file_generator import _events_from_catalog
+from wfs_input_generator.stores import EventStore
+
+import inspect
+import io
+import obspy
+import os
+import pytest
+
+# Most generic way to get the actual data directory.
+DATA = os.path.join(os.path.dirname(os.path.abspath(inspect.getfile(
+    inspect.currentframe()))), "data")
+
+
+def test_same_events_as_obspy():
+    """
+    Both readers return the same events as converting the ObsPy catalogs.
+    """
+    for filename, reader in (
+            ("multiple_events.ndk", extract_events_from_NDK),
+            ("CMTSOLUTION", extract_events_from_CMTSOLUTION)):
+        filename = os.path.join(DATA, filename)
+        events = reader(filename)
+        assert events == _events_from_catalog(obspy.read_events(filename))
+        with open(filename, "rb") as fh:
+            assert reader(fh) == events
+
+
+def test_ndk_values():
+    event = extract_events_from_NDK(os.path.join(
+        DATA, "multiple_events.ndk"))[1]
+    assert event == {
+        "_event_id": "smi:local/ndk/C201303011253A/event",
+        "description": "KURIL ISLANDS, C201303011253A",
+        "latitude": 50.7,
+        "longitude": 157.75,
+        "depth_in_km": 44.4,
+        # Reference time plus the centroid time.
+        "origin_time": obspy.UTCDateTime(2013, 3, 1, 12, 53, 58, 600000),
+        # Converted from dyne * cm to N * m.
+        "m_rr": 4.02e+18,
+        "m_tt": -9.4e+17,
+        "m_pp": -3.08e+18,
+        "m_rt": 9.46e+17,
+        "m_rp": 1.64e+18,
+        "m_tp": -1.86e+18}
+
+
+def test_files_are_streamed_in_blocks():
+    with open(os.path.join(DATA, "multiple_events.ndk"), "rb") as fh:
+        data = fh.read()
+    block_size = cmt_helper.BLOCK_SIZE
+    try:
+        cmt_helper.BLOCK_SIZE = 4
+        events = iter_events_from_NDK(io.BytesIO(data))
+        assert next(events)["_event_id"] == \
+            "smi:local/ndk/C201303010329A/event"
+        assert len(list(events)) == 5
+    finally:
+        cmt_helper.BLOCK_SIZE = block_size
+
+
+def test_id_filter():
+    events = extract_events_from_CMTSOLUTION(
+        os.path.join(DATA, "CMTSOLUTION"),
+        id_filter=lambda x: "201501010947A" not in x)
+    assert [_i["_event_id"] for _i in events] == [
+        "smi:local/cmtsolution/201501010942A/event",
+        "smi:local/cmtsolution/201501011007A/event"]
+
+
+def test_invalid_files_raise():
+    with open(os.path.join(DATA, "multiple_events.ndk"), "rb") as fh:
+        data = fh.read()
+    # Incomplete records.
+    with pytest.raises(ValueError):
+        extract_events_from_NDK(io.BytesIO(data.rsplit(b"\n", 3)[0]))
+    with pytest.raises(ValueError):
+        extract_events_from_NDK(io.BytesIO(
+            data.replace(b"2013/03/01 03:29", b"2013/13/01 03:29")))
+
+    with open(os.path.join(DATA, "CMTSOLUTION"), "rb") as fh:
+        data = fh.read()
+    with pytest.raises(ValueError):
+        extract_events_from_CMTSOLUTION(io.BytesIO(
+            data.replace(b"time shift", b"time offset", 1)))
+    with pytest.raises(ValueError):
+        extract_events_from_CMTSOLUTION(io.BytesIO(
+            data.replace(b"29.4000", b"deep", 1)))
+    # Years that cannot be represented raise instead of overflowing.
+    for year in (b"0012", b"9999"):
+        with pytest.raises(ValueError) as err:
+            extract_events_from_CMTSOLUTION(io.BytesIO(
+                data.replace(b"PDEW2015", b"PDEW" + year, 1)))
+        assert "Invalid year" in str(err.value)
+
+
+def test_CMTSOLUTION_header_lines():
+    """
+    The catalog may be separated from the year or fused with it.
+    """
+    with open(os.path.join(DATA, "CMTSOLUTION"), "rb") as fh:
+        data = fh.read()
+    reference = extract_events_from_CMTSOLUTION(io.BytesIO(data))
+    for header in (b"PDE 2015", b"PDEW 2015", b"  PDE  2015", b"2015"):
+        assert extract_events_from_CMTSOLUTION(io.BytesIO(data.replace(
+            b" PDEW2015", header, 1))) == reference
+
+
+def test_render_CMTSOLUTIONs():
+    """
+    All events are rendered at once and can be read again.
+    """
+    events = extract_events_from_NDK(os.path.join(DATA, "multiple_events.ndk"))
+    files = render_CMTSOLUTIONs(events)
+    assert len(files) == len(events)
+    assert files == render_CMTSOLUTIONs(EventStore.from_events(events))
+    assert files[0].splitlines()[0] == (
+        "PDE 2013 3 1 3 29 48.70 21.86000 144.22000 152.10000 5.4 5.4 "
+        "2013-03-01T03:29:48.700000Z_5.4")
+
+    # Read all of them again from a single file.
+    read = extract_events_from_CMTSOLUTION(io.BytesIO(
+        "\n".join(files).encode()))
+    assert len(read) == len(events)
+    for event, other in zip(events, read):
+        assert abs(other["origin_time"] - event["origin_time"]) < 0.005
+        for key in ("latitude", "longitude", "depth_in_km"):
+            assert abs(other[key] - event[key]) < 1E-5
+        for key in ("m_rr", "m_tt", "m_pp", "m_rt", "m_rp", "m_tp"):
+            assert abs(other[key] - event[key]) <= 1E-5 * abs(event[key])
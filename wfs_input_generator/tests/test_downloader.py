@@ -0,0 +1,161 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Tests for the concurrent downloader against a local HTTP server.
+
+:copyright:
+    Lion Krischer (krischer@geophysik.uni-muenchen.de), 2013
+:license:
+    GNU General Public License, Version 3
+    (http://www.gnu.org/copyleft/gpl.html)
+"""
+from wfs_input_generator.downloader import download_urls
+from wfs_input_generator.http_cache import HTTPCache
+
+import BaseHTTPServer
+import collections
+import SocketServer
+import threading
+import time
+
+import pytest
+
+
+class _Handler(BaseHTTPServer.BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def setup(self):
+        BaseHTTPServer.BaseHTTPRequestHandler.setup(self)
+        self.server.stats["connections"] += 1
+
+    def log_message(self, *args):
+        pass
+
+    def _respond(self, status, body=b"", headers=None):
+        self.send_response(status)
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        stats = self.server.stats
+        stats[self.path] += 1
+        if self.path.startswith("/data/"):
+            self._respond(200, b"content " + self.path[6:].encode())
+        elif self.path == "/flaky":
+            # Fails the first two times.
+            if stats[self.path] <= 2:
+                self._respond(503)
+            else:
+                self._respond(200, b"finally")
+        elif self.path == "/redirect":
+            self._respond(302, headers={"Location": "/data/moved"})
+        elif self.path == "/etag":
+            if self.headers.get("If-None-Match") == '"v1"':
+                self._respond(304)
+            else:
+                self._respond(200, b"tagged", headers={"ETag": '"v1"'})
+        elif self.path == "/slow":
+            time.sleep(0.5)
+            self._respond(200, b"slow")
+        else:
+            self._respond(404)
+
+
+class _Server(SocketServer.ThreadingMixIn, BaseHTTPServer.HTTPServer):
+    daemon_threads = True
+
+
+@pytest.fixture
+def http_server():
+    server = _Server(("127.0.0.1", 0), _Handler)
+    server.stats = collections.defaultdict(int)
+    thread = threading.Thread(target=server.serve_forever)
+    thread.daemon = True
+    thread.start()
+    try:
+        yield server, "http://127.0.0.1:%i" % server.server_address[1]
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def test_downloading_urls_concurrently(http_server):
+    """
+    Results are returned in order, every URL is only fetched once and the
+    connections are kept alive.
+    """
+    server, base = http_server
+    urls = ["%s/data/%i" % (base, _i) for _i in range(20)]
+    urls.append(urls[0])
+
+    data = download_urls(urls, max_connections=4)
+    assert data == [b"content %i" % _i for _i in range(20)] + [b"content 0"]
+    assert server.stats["/data/0"] == 1
+    # At most one connection per thread.
+    assert server.stats["connections"] <= 4
+
+
+def test_download_redirects_and_retries(http_server):
+    """
+    Redirects are followed and server errors are retried.
+    """
+    server, base = http_server
+    data = download_urls([base + "/redirect", base + "/flaky"],
+                         backoff=0.01)
+    assert data == [b"content moved", b"finally"]
+    assert server.stats["/flaky"] == 3
+
+
+def test_download_errors(http_server):
+    """
+    All failures are reported together. Client errors are not retried but
+    timeouts are.
+    """
+    server, base = http_server
+    with pytest.raises(ValueError) as err:
+        download_urls([base + "/data/1", base + "/missing", base + "/slow"],
+                      timeout=0.1, retries=1, backoff=0.01)
+    msg = str(err.value)
+    assert msg.startswith("Could not download 2 URL(s):")
+    assert base + "/missing: ValueError: HTTP Error 404" in msg
+    assert base + "/slow: " in msg
+    assert server.stats["/missing"] == 1
+    assert server.stats["/slow"] == 2
+
+
+def test_download_with_cache(http_server, tmpdir):
+    """
+    Fresh entries need no request, stale ones are revalidated and offline
+    mode never touches the network.
+    """
+    server, base = http_server
+    urls = [base + "/etag", base + "/data/1"]
+    cache = HTTPCache(str(tmpdir))
+
+    assert download_urls(urls, cache=cache) == [b"tagged", b"content 1"]
+    assert server.stats["/etag"] == 1
+    assert server.stats["/data/1"] == 1
+
+    # Fresh: no requests at all.
+    assert download_urls(urls, cache=cache) == [b"tagged", b"content 1"]
+    assert server.stats["/etag"] == 1
+    assert server.stats["/data/1"] == 1
+
+    # Stale: conditional request if possible, otherwise downloaded again.
+    cache.ttl_in_s = 0.0
+    assert download_urls(urls, cache=cache) == [b"tagged", b"content 1"]
+    assert server.stats["/etag"] == 2
+    assert server.stats["/data/1"] == 2
+
+    # Offline: Only served from the cache.
+    offline = HTTPCache(str(tmpdir), ttl_in_s=0.0, offline=True)
+    assert download_urls(urls, cache=offline) == [b"tagged", b"content 1"]
+    with pytest.raises(ValueError) as err:
+        download_urls([base + "/data/2"], cache=offline)
+    assert "Not in the cache and the cache is offline" in str(err.value)
+    assert server.stats["/etag"] == 2
+    assert server.stats["/data/1"] == 2
+    assert server.stats["/data/2"] == 0
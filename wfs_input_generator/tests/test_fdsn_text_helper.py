@@ -0,0 +1,101 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Tests for the FDSN station text format reader.
+
+:copyright:
+    Lion Krischer (krischer@geophysik.uni-muenchen.de), 2013
+:license:
+    GNU General Public License, Version 3
+    (http://www.gnu.org/copyleft/gpl.html)
+"""
+from wfs_input_generator.fdsn_text_helper import read_FDSN_text
+
+import io
+import pytest
+
+STATION_LEVEL = b"""#Network | Station | Latitude | Longitude | Elevation | \
+SiteName | StartTime | EndTime
+IU|ANMO|34.9459|-106.4572|1850.0|Albuquerque, New Mexico, USA|\
+2002-11-19T21:07:00|
+IU|COLA|64.873599|-147.8616|200.0|College Outpost, Alaska, USA|\
+1996-09-21T00:00:00|
+"""
+
+CHANNEL_LEVEL = b"""#Network | Station | Location | Channel | Latitude | \
+Longitude | Elevation | Depth | Azimuth | Dip | SensorDescription | Scale | \
+ScaleFreq | ScaleUnits | SampleRate | StartTime | EndTime
+IU|ANMO|00|BHZ|34.945981|-106.457133|1671.0|145.0|0.0|-90.0|\
+Geotech KS-54000|3.2e9|0.02|M/S|20.0|2008-06-30T20:00:00|
+IU|ANMO|10|BHZ|34.945913|-106.457122|1767.2|48.8|0.0|-90.0|\
+Guralp CMG3-T|1.3e9|0.02|M/S|40.0|2008-06-30T20:00:00|
+
+IU|COLA|00|BHZ|64.873599|-147.8616|84.0||0.0|-90.0|\
+Geotech KS-54000|3.2e9|0.02|M/S|20.0|1996-09-21T00:00:00|
+"""
+
+
+def test_station_level():
+    assert list(read_FDSN_text(io.BytesIO(STATION_LEVEL))) == [
+        {"id": "IU.ANMO", "latitude": 34.9459, "longitude": -106.4572,
+         "elevation_in_m": 1850.0, "local_depth_in_m": 0.0},
+        {"id": "IU.COLA", "latitude": 64.873599, "longitude": -147.8616,
+         "elevation_in_m": 200.0, "local_depth_in_m": 0.0}]
+
+
+def test_channel_level():
+    """
+    The first channel of the latest epoch of each station is used. Missing
+    depths are zero.
+    """
+    assert list(read_FDSN_text(io.BytesIO(CHANNEL_LEVEL))) == [
+        {"id": "IU.ANMO", "latitude": 34.945981, "longitude": -106.457133,
+         "elevation_in_m": 1671.0, "local_depth_in_m": 145.0},
+        {"id": "IU.COLA", "latitude": 64.873599, "longitude": -147.8616,
+         "elevation_in_m": 84.0, "local_depth_in_m": 0.0}]
+
+
+def test_latest_epoch_is_used():
+    """
+    Stations with several epochs are added once with the coordinates of the
+    latest epoch, open epochs are the latest.
+    """
+    data = STATION_LEVEL + (
+        b"IU|ANMO|34.0|-106.0|1800.0|Old site|1989-08-29T00:00:00|"
+        b"2002-11-19T21:07:00\n"
+        b"XX|ABC|66.0|-149.0|100.0|Old site|1990-01-01T00:00:00|"
+        b"1996-09-21T00:00:00\n"
+        b"XX|ABC|65.0|-148.0|150.0|New site|1996-09-21T00:00:00|"
+        b"2010-01-01T00:00:00\n")
+    stations = list(read_FDSN_text(io.BytesIO(data)))
+    assert [_i["id"] for _i in stations] == ["IU.ANMO", "IU.COLA", "XX.ABC"]
+    assert stations[0]["latitude"] == 34.9459
+    assert stations[2]["latitude"] == 65.0
+
+    data = CHANNEL_LEVEL.replace(
+        b"IU|ANMO|00|BHZ|34.945981",
+        b"IU|ANMO|00|BHZ|34.0|-106.0|1600.0|0.0|0.0|-90.0|Old|3.2e9|0.02|"
+        b"M/S|20.0|2000-01-01T00:00:00|2008-06-30T20:00:00\n"
+        b"IU|ANMO|00|BHZ|34.945981")
+    assert list(read_FDSN_text(io.BytesIO(data))) == \
+        list(read_FDSN_text(io.BytesIO(CHANNEL_LEVEL)))
+
+
+def test_invalid_files_raise():
+    with pytest.raises(ValueError):
+        read_FDSN_text(io.BytesIO(b"#Network | Description | StartTime | "
+                                  b"EndTime | TotalStations\n"))
+    with pytest.raises(ValueError):
+        read_FDSN_text(io.BytesIO(STATION_LEVEL + b"IU|ANMO|1.0\n"))
+    with pytest.raises(ValueError):
+        read_FDSN_text(io.BytesIO(STATION_LEVEL.replace(b"1850.0", b"")))
+    assert len(read_FDSN_text(io.BytesIO(STATION_LEVEL.splitlines()[0]))) \
+        == 0
+
+
+def test_id_filter():
+    stations = read_FDSN_text(io.BytesIO(CHANNEL_LEVEL),
+                              id_filter=lambda x: x == "IU.COLA")
+    assert [_i["id"] for _i in stations] == ["IU.COLA"]
+    assert len(read_FDSN_text(io.BytesIO(STATION_LEVEL),
+                              id_filter=lambda x: False)) == 0
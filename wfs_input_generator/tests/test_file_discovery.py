@@ -0,0 +1,51 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Tests for the lazy directory and glob expansion.
+
+:copyright:
+    Lion Krischer (krischer@geophysik.uni-muenchen.de), 2013
+:license:
+    GNU General Public License, Version 3
+    (http://www.gnu.org/copyleft/gpl.html)
+"""
+from wfs_input_generator.file_discovery import is_path_pattern, iter_files
+
+import os
+import types
+
+
+def _tree(tmpdir):
+    for path in ("x.xml", "a/y.xml", "a/b/z.xml", "a/.hidden.xml",
+                 ".h/h.xml", "c/w.txt"):
+        tmpdir.join(path).ensure()
+    return str(tmpdir)
+
+
+def test_directories_and_patterns(tmpdir):
+    root = _tree(tmpdir)
+
+    def files(pattern):
+        return [os.path.relpath(_i, root)
+                for _i in iter_files(os.path.join(root, pattern))]
+
+    assert isinstance(iter_files(root), types.GeneratorType)
+    assert files("") == ["x.xml", "a/y.xml", "a/b/z.xml", "c/w.txt"]
+    assert files("**") == files("")
+    assert files("**/*.xml") == ["x.xml", "a/y.xml", "a/b/z.xml"]
+    assert files("a/**/*.xml") == ["a/y.xml", "a/b/z.xml"]
+    assert files("*.xml") == ["x.xml"]
+    assert files("*/*.xml") == ["a/y.xml"]
+    assert files("[ab]/?.xml") == ["a/y.xml"]
+    assert files("[!a]/*") == ["c/w.txt"]
+    assert files(".h/*") == [".h/h.xml"]
+    assert files("a/.*") == ["a/.hidden.xml"]
+
+
+def test_is_path_pattern(tmpdir):
+    root = _tree(tmpdir)
+    assert is_path_pattern(root)
+    assert is_path_pattern(os.path.join(root, "*.xml"))
+    assert not is_path_pattern(os.path.join(root, "x.xml"))
+    assert not is_path_pattern(os.path.join(root, "missing.xml"))
+    assert not is_path_pattern({"id": "BW.FURT"})
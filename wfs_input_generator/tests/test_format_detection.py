@@ -0,0 +1,103 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Tests for the format detection.
+
+:copyright:
+    Lion Krischer (krischer@geophysik.uni-muenchen.de), 2013
+:license:
+    GNU General Public License, Version 3
+    (http://www.gnu.org/copyleft/gpl.html)
+"""
+from wfs_input_generator import format_detection
+from wfs_input_generator.format_detection import detect_format, sniff_format
+
+import inspect
+import io
+import os
+
+import numpy as np
+from obspy.io.sac import SACTrace
+from obspy.io.xseed import Parser
+
+# Most generic way to get the actual data directory.
+DATA = os.path.join(os.path.dirname(os.path.abspath(inspect.getfile(
+    inspect.currentframe()))), "data")
+
+
+def test_detecting_the_test_files():
+    """
+    All station and event files of the test suite should be recognized.
+    """
+    expected = {
+        "dataless.seed.BW_FURT": "seed",
+        "dataless.seed.BW_RJOB": "seed",
+        "event1.xml": "quakeml",
+        "event2.xml": "quakeml",
+        "quakeml_multiple_origins.xml": "quakeml",
+        "example.sac": "sac",
+        "example_without_coordinates.sac": "sac",
+        "example_without_local_depth.sac": "sac",
+        "station.xml": "stationxml",
+        "multiple_events.ndk": "ndk",
+        "CMTSOLUTION": "cmtsolution",
+        os.path.join("specfem_globe", "Par_file"): None}
+    for filename, file_format in expected.items():
+        assert detect_format(os.path.join(DATA, filename)) == file_format
+
+
+def test_detecting_formats_of_file_like_objects():
+    """
+    The position of file-like objects must not change.
+    """
+    with open(os.path.join(DATA, "dataless.seed.BW_FURT"), "rb") as fh:
+        data = fh.read()
+    buf = io.BytesIO(b"xx" + data)
+    buf.seek(2, 0)
+    assert detect_format(buf) == "seed"
+    assert buf.tell() == 2
+
+    xseed = io.BytesIO(Parser(data).get_xseed())
+    assert detect_format(xseed) == "xseed"
+
+    assert detect_format(io.BytesIO(b'  \n[{"id": "BW.FURT"}]')) == "json"
+    assert detect_format(io.BytesIO(
+        b"#Network | Station | Latitude | Longitude | Elevation")) == \
+        "fdsn_text"
+    assert detect_format(io.BytesIO(b"")) is None
+
+
+def test_sac_files_looking_like_json():
+    """
+    The sampling interval is the first value of a SAC header. For 1/77 Hz it
+    starts with a brace in little endian byte order.
+    """
+    trace = SACTrace(delta=1.0 / 77.0, data=np.zeros(10, dtype=np.float32),
+                     knetwk="BW", kstnm="FURT", stla=48.16, stlo=11.28)
+    buf = io.BytesIO()
+    trace.write(buf, byteorder="little")
+    buf.seek(0, 0)
+    assert buf.getvalue()[:1] == b"{"
+    assert detect_format(buf) == "sac"
+    assert not format_detection.is_json(buf.getvalue())
+
+
+def test_registering_a_new_sniffer():
+    """
+    New formats can be registered and are tried in order.
+    """
+    try:
+        format_detection.register_sniffer(
+            "custom", lambda head: head.startswith(b"CUSTOM"))
+        assert sniff_format(b"CUSTOM FORMAT") == "custom"
+        # JSON is tried earlier.
+        format_detection.register_sniffer(
+            "custom", lambda head: head.startswith(b"{"))
+        assert sniff_format(b"{}") == "json"
+        format_detection.register_sniffer(
+            "custom", lambda head: head.startswith(b"{"), first=True)
+        assert sniff_format(b"{}") == "custom"
+        assert list(format_detection._SNIFFERS.keys())[0] == "custom"
+    finally:
+        format_detection._SNIFFERS.pop("custom", None)
+    assert sniff_format(b"{}") == "json"
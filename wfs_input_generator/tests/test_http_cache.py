@@ -0,0 +1,65 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Tests for the on-disk HTTP cache.
+
+:copyright:
+    Lion Krischer (krischer@geophysik.uni-muenchen.de), 2013
+:license:
+    GNU General Public License, Version 3
+    (http://www.gnu.org/copyleft/gpl.html)
+"""
+from wfs_input_generator.http_cache import HTTPCache
+
+import time
+
+
+def test_storing_and_retrieving(tmpdir):
+    """
+    Entries survive a new cache object.
+    """
+    cache = HTTPCache(str(tmpdir.join("cache")))
+    assert cache.get("http://a.org/1") is None
+    cache.store("http://a.org/1", b"first", etag='"abc"',
+                last_modified="Mon, 07 Oct 2013 10:00:00 GMT")
+    assert "http://a.org/1" in cache
+
+    entry = HTTPCache(str(tmpdir.join("cache"))).get("http://a.org/1")
+    assert entry.data == b"first"
+    assert entry.validators == {
+        "If-None-Match": '"abc"',
+        "If-Modified-Since": "Mon, 07 Oct 2013 10:00:00 GMT"}
+    assert cache.is_fresh(entry)
+    cache.ttl_in_s = 0.0
+    assert not cache.is_fresh(entry)
+    assert cache.is_fresh(cache.revalidated(entry)) is False
+    cache.ttl_in_s = 10.0
+    assert cache.is_fresh(cache.revalidated(entry))
+
+
+def test_least_recently_used_eviction(tmpdir):
+    """
+    The least recently used entries are removed once the size limit is
+    exceeded.
+    """
+    cache = HTTPCache(str(tmpdir), max_size_in_bytes=25)
+    cache.store("http://a.org/1", b"1" * 10)
+    time.sleep(0.01)
+    cache.store("http://a.org/2", b"2" * 10)
+    time.sleep(0.01)
+    # Accessing the first one makes the second one the oldest.
+    cache.get("http://a.org/1")
+    time.sleep(0.01)
+    cache.store("http://a.org/3", b"3" * 10)
+
+    assert "http://a.org/1" in cache
+    assert "http://a.org/2" not in cache
+    assert "http://a.org/3" in cache
+    assert cache.size_in_bytes == 20
+    assert cache.get("http://a.org/2") is None
+
+    cache.invalidate("http://a.org/1")
+    assert cache.get("http://a.org/1") is None
+    cache.clear()
+    assert cache.size_in_bytes == 0
+    assert tmpdir.listdir() == []
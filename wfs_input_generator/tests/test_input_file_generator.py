@@ -10,6 +10,7 @@ Test suite for the waveform solver input file generator.
     (http://www.gnu.org/copyleft/gpl.html)
 """
 from wfs_input_generator import InputFileGenerator
+from wfs_input_generator import input_file_generator
 
 import io
 import inspect
@@ -18,6 +19,8 @@ import mock
 import obspy
 import os
 import pytest
+import shutil
+import tempfile
 
 # Most generic way to get the actual data directory.
 DATA = os.path.join(os.path.dirname(os.path.abspath(inspect.getfile(
@@ -310,15 +313,13 @@ def test_adding_stations_as_URLs():
 
     gen = InputFileGenerator()
 
-    # Mock the URL
-    with mock.patch("urllib2.urlopen") as patch:
-        class Dummy(object):
-            def read(self):
-                return data
-        patch.return_value = Dummy()
+    # Mock the download.
+    with mock.patch("wfs_input_generator.input_file_generator"
+                    ".download_urls") as patch:
+        patch.return_value = [data]
         gen.add_stations("http://some_url.com")
 
-    patch.assert_called_once_with("http://some_url.com")
+    patch.assert_called_once_with(["http://some_url.com"], cache=None)
     assert sorted(stations) == sorted(gen._stations)
 
 
@@ -587,15 +588,13 @@ def test_adding_events_as_URL():
 
     gen = InputFileGenerator()
 
-    # Mock the URL
-    with mock.patch("urllib2.urlopen") as patch:
-        class Dummy(object):
-            def read(self):
-                return data
-        patch.return_value = Dummy()
+    # Mock the download.
+    with mock.patch("wfs_input_generator.input_file_generator"
+                    ".download_urls") as patch:
+        patch.return_value = [data]
         gen.add_events("http://some_url.com")
 
-    patch.assert_called_once_with("http://some_url.com")
+    patch.assert_called_once_with(["http://some_url.com"], cache=None)
     assert [event] == gen._events
 
 
@@ -1157,6 +1156,65 @@ def test_station_filter_JSON():
     assert gen.station_filter == filters
 
 
+def test_event_filter_criteria():
+    """
+    Event filters can also select by origin time, magnitude and depth.
+    """
+    gen = InputFileGenerator()
+    gen.add_events([os.path.join(DATA, "event1.xml"),
+                    os.path.join(DATA, "event2.xml")])
+    bavaria, guatemala = sorted(gen._events, key=lambda x: x["origin_time"])
+
+    gen.event_filter = {"starttime": "2012-06-01"}
+    assert gen._filtered_events == [guatemala]
+    gen.event_filter = {"endtime": obspy.UTCDateTime(2012, 6, 1)}
+    assert gen._filtered_events == [bavaria]
+    gen.event_filter = {"min_depth_in_km": 20.0, "max_magnitude": 10.0}
+    assert gen._filtered_events == [guatemala]
+    gen.event_filter = {"event_ids": [bavaria["_event_id"].upper()],
+                        "min_magnitude": 1.0}
+    assert gen._filtered_events == [bavaria]
+    gen.event_filter = json.dumps({"min_magnitude": 1.0,
+                                   "max_depth_in_km": 20.0})
+    assert gen._filtered_events == [bavaria]
+
+    # Changes in place are noticed.
+    gen.event_filter["max_depth_in_km"] = 100.0
+    assert len(gen._filtered_events) == 2
+
+    with pytest.raises(ValueError):
+        gen.event_filter = {"min_mag": 5.0}
+
+
+def test_event_deduplication():
+    """
+    Optionally the same earthquake from different catalogs is only used once.
+    """
+    gen = InputFileGenerator()
+    gen.add_events(os.path.join(DATA, "multiple_events.ndk"))
+    ndk = gen._events[1]
+    other = dict(ndk, origin_time=ndk["origin_time"] - 2.0,
+                 latitude=ndk["latitude"] + 0.1, m_rr=ndk["m_rr"] * 1.1)
+    del other["_event_id"]
+    gen.add_events(other)
+    assert len(gen._filtered_events) == 7
+
+    gen.event_deduplication = True
+    assert len(gen._filtered_events) == 6
+    assert ndk in gen._filtered_events
+    assert other not in gen._filtered_events
+
+    gen.event_deduplication = '{"preference": "smi:local/cmtsolution/*"}'
+    assert ndk in gen._filtered_events
+    gen.event_deduplication["max_time_difference_in_s"] = 1.0
+    assert len(gen._filtered_events) == 7
+
+    gen.event_deduplication = None
+    assert len(gen._filtered_events) == 7
+    with pytest.raises(ValueError):
+        gen.event_deduplication = {"max_time": 1.0}
+
+
 def test_event_filter_removed_everything_without_an_id():
     """
     An applied event filter will remove all events without an id.
@@ -1223,3 +1281,489 @@ def test_parsing_correct_origin_for_focal_mechanisms():
         'm_tp': 1.65e+17,
         'm_tt': -8.23e+16,
         'origin_time': obspy.UTCDateTime(2013, 6, 9, 14, 22, 15, 600000)}]
+
+
+def test_station_conflict_policy():
+    """
+    Tests the handling of a station id that is added again with different
+    coordinates.
+    """
+    station_1 = {"id": "BW.FURT", "latitude": 48.162899,
+                 "longitude": 11.2752, "elevation_in_m": 565.0,
+                 "local_depth_in_m": 0.0}
+    station_2 = dict(station_1, latitude=48.0)
+
+    # Default is to keep the last one, also across calls.
+    gen = InputFileGenerator()
+    gen.add_stations(station_1)
+    gen.add_stations(station_2)
+    assert gen._stations == [station_2]
+
+    gen = InputFileGenerator(station_conflict="keep_first")
+    gen.add_stations([station_1, station_2])
+    assert gen._stations == [station_1]
+
+    gen = InputFileGenerator(station_conflict="error")
+    gen.add_stations(station_1)
+    # Adding the exact same station again is fine.
+    gen.add_stations(station_1)
+    with pytest.raises(ValueError):
+        gen.add_stations(station_2)
+    assert gen._stations == [station_1]
+
+    with pytest.raises(ValueError):
+        gen.station_conflict = "something"
+
+
+def test_adding_a_station_table():
+    """
+    Station tables can be added directly.
+    """
+    from wfs_input_generator.stores import StationTable
+
+    station = {"id": "BW.FURT", "latitude": 48.162899,
+               "longitude": 11.2752, "elevation_in_m": 565.0,
+               "local_depth_in_m": 0.0}
+    table = StationTable.from_stations([station])
+
+    gen = InputFileGenerator()
+    gen.add_stations(table)
+    assert gen._stations == [station]
+    # The generator keeps its own table.
+    assert gen._station_table is not table
+
+
+def test_adding_stations_parses_each_file_once():
+    """
+    SEED files are only parsed a single time.
+    """
+    from wfs_input_generator.input_file_generator import STATION_READERS
+    from wfs_input_generator.seed_helper import extract_coordinates_from_SEED
+
+    seed_file = os.path.join(DATA, "dataless.seed.BW_FURT")
+    gen = InputFileGenerator()
+    patch = mock.Mock(wraps=extract_coordinates_from_SEED)
+    with mock.patch.dict(STATION_READERS, {"seed": patch}):
+        gen.add_stations(seed_file)
+    assert patch.call_count == 1
+    assert [_i["id"] for _i in gen._stations] == ["BW.FURT"]
+
+
+def test_adding_stations_as_XSEED_and_JSON_files(tmpdir):
+    """
+    XSEED and JSON files are detected by their content.
+    """
+    from obspy.io.xseed import Parser
+
+    station = {"id": "BW.FURT",
+               "latitude": 48.162899,
+               "longitude": 11.2752,
+               "elevation_in_m": 565.0,
+               "local_depth_in_m": 0.0}
+
+    xseed_file = str(tmpdir.join("furt.xml"))
+    Parser(os.path.join(DATA, "dataless.seed.BW_FURT")).write_xseed(
+        xseed_file)
+    json_file = str(tmpdir.join("stations.json"))
+    with open(json_file, "wt") as fh:
+        json.dump([dict(station, id="BW.FURT2")], fh)
+
+    gen = InputFileGenerator()
+    gen.add_stations([xseed_file, json_file])
+    assert gen._stations == [station, dict(station, id="BW.FURT2")]
+
+
+def test_parsing_files_in_parallel():
+    """
+    Parallel parsing results in the same stations and events in the same
+    order as the serial one.
+    """
+    station_files = [os.path.join(DATA, "dataless.seed.BW_RJOB"),
+                     os.path.join(DATA, "station.xml"),
+                     os.path.join(DATA, "dataless.seed.BW_FURT"),
+                     os.path.join(DATA, "example.sac")]
+    event_files = [os.path.join(DATA, "event2.xml"),
+                   os.path.join(DATA, "event1.xml")]
+
+    serial = InputFileGenerator()
+    serial.add_stations(station_files)
+    serial.add_events(event_files)
+
+    parallel = InputFileGenerator()
+    parallel.add_stations(station_files, workers=3)
+    parallel.add_events(event_files, workers=2)
+
+    assert parallel._stations == serial._stations
+    assert parallel._events == serial._events
+
+
+def test_parsing_files_in_parallel_reports_all_errors():
+    """
+    All files that cannot be parsed are reported at once and nothing is
+    added.
+    """
+    station_files = [os.path.join(DATA, "dataless.seed.BW_RJOB"),
+                     os.path.join(DATA, "specfem_globe", "Par_file"),
+                     "some_nonesense"]
+    gen = InputFileGenerator()
+    with pytest.raises(ValueError) as err:
+        gen.add_stations(station_files, workers=2)
+    msg = str(err.value)
+    assert "Could not read 2 file(s)" in msg
+    assert "Par_file" in msg
+    assert "some_nonesense: IOError" in msg
+    assert gen._stations == []
+
+    with pytest.raises(ValueError) as err:
+        gen.add_events([os.path.join(DATA, "event1.xml"), "some_nonesense"],
+                       workers=2)
+    assert "Could not read 1 file(s)" in str(err.value)
+    assert gen._events == []
+
+
+def test_parse_cache():
+    """
+    Cached files are not parsed again and result in the same stations and
+    events.
+    """
+    from wfs_input_generator.parse_cache import ParseCache
+
+    station_files = [os.path.join(DATA, "dataless.seed.BW_RJOB"),
+                     os.path.join(DATA, "station.xml")]
+    event_file = os.path.join(DATA, "event1.xml")
+    reference = InputFileGenerator()
+    reference.add_stations(station_files)
+    reference.add_events(event_file)
+
+    directory = tempfile.mkdtemp()
+    try:
+        cache_file = os.path.join(directory, "parsed.bin")
+        gen = InputFileGenerator(parse_cache=ParseCache(cache_file))
+        gen.add_stations(station_files)
+        gen.add_events(event_file)
+        assert len(gen.parse_cache) == 3
+
+        for workers in (None, 2):
+            gen = InputFileGenerator(parse_cache=ParseCache(cache_file))
+            events_patch = mock.MagicMock()
+            with mock.patch("wfs_input_generator.input_file_generator."
+                            "_read_station_file") as stations_patch, \
+                    mock.patch.dict(input_file_generator.EVENT_READERS,
+                                    {"quakeml": events_patch}):
+                gen.add_stations(station_files, workers=workers)
+                gen.add_events(event_file, workers=workers)
+            assert stations_patch.call_count == 0
+            assert events_patch.call_count == 0
+            assert gen._stations == reference._stations
+            assert gen._events == reference._events
+    finally:
+        shutil.rmtree(directory)
+
+
+def test_adding_directories_and_glob_patterns(tmpdir):
+    """
+    Directories and glob patterns are expanded to all files of the right
+    kind.
+    """
+    for name, target in (("dataless.seed.BW_FURT", "a/furt.seed"),
+                         ("station.xml", "a/b/station.xml"),
+                         ("event1.xml", "a/b/event1.xml"),
+                         ("event2.xml", "c/event2.xml"),
+                         ("Par_file", "c/Par_file")):
+        tmpdir.join(target).dirpath().ensure(dir=True)
+        source = os.path.join(DATA, "specfem_globe", name) \
+            if name == "Par_file" else os.path.join(DATA, name)
+        shutil.copy(source, str(tmpdir.join(target)))
+
+    reference = InputFileGenerator()
+    reference.add_stations([str(tmpdir.join("a", "furt.seed")),
+                            str(tmpdir.join("a", "b", "station.xml"))])
+    reference.add_events([str(tmpdir.join("a", "b", "event1.xml")),
+                          str(tmpdir.join("c", "event2.xml"))])
+
+    gen = InputFileGenerator()
+    gen.add_stations(str(tmpdir))
+    gen.add_events(str(tmpdir.join("**", "*")))
+    assert gen._stations == reference._stations
+    assert gen._events == reference._events
+
+    gen = InputFileGenerator()
+    gen.add_stations(str(tmpdir.join("a", "*", "*.xml")))
+    assert gen._stations == [_i for _i in reference._stations
+                             if _i["id"] != "BW.FURT"]
+
+    # Every file is only sniffed once, also if parsed in other processes.
+    for workers in (None, 2):
+        gen = InputFileGenerator()
+        with mock.patch("wfs_input_generator.input_file_generator."
+                        "detect_format",
+                        side_effect=input_file_generator.detect_format) as p:
+            gen.add_stations(str(tmpdir), workers=workers)
+            gen.add_events(str(tmpdir), workers=workers)
+        assert p.call_count == 2 * 5
+        assert gen._stations == reference._stations
+        assert gen._events == reference._events
+
+
+def test_adding_stations_as_FDSN_text(tmpdir):
+    """
+    FDSN station text files are read directly into the station table.
+    """
+    filename = str(tmpdir.join("stations.txt"))
+    with open(filename, "wb") as fh:
+        fh.write(b"#Network|Station|Latitude|Longitude|Elevation|SiteName|"
+                 b"StartTime|EndTime\n"
+                 b"BW|FURT|48.162899|11.2752|565.0|Fuerstenfeldbruck|"
+                 b"2001-01-01T00:00:00|\n")
+
+    gen = InputFileGenerator()
+    gen.add_stations([{"id": "BW.RJOB", "latitude": 47.737167,
+                       "longitude": 12.795714, "elevation_in_m": 860.0},
+                      filename])
+    assert gen._stations == [
+        {"id": "BW.RJOB", "latitude": 47.737167, "longitude": 12.795714,
+         "elevation_in_m": 860.0, "local_depth_in_m": 0.0},
+        {"id": "BW.FURT", "latitude": 48.162899, "longitude": 11.2752,
+         "elevation_in_m": 565.0, "local_depth_in_m": 0.0}]
+
+
+def test_adding_stations_from_a_table():
+    """
+    Tables are validated and added column-wise.
+    """
+    gen = InputFileGenerator()
+    gen.add_stations({"id": "BW.RJOB", "latitude": 47.737167,
+                      "longitude": 12.795714, "elevation_in_m": 860.0})
+    gen.add_stations_from_table(io.BytesIO(
+        b"id,lat,lon,ele,depth\n"
+        b"BW.FURT,48.162899,11.2752,565.0,10.0\n"))
+    assert gen._stations == [
+        {"id": "BW.RJOB", "latitude": 47.737167, "longitude": 12.795714,
+         "elevation_in_m": 860.0, "local_depth_in_m": 0.0},
+        {"id": "BW.FURT", "latitude": 48.162899, "longitude": 11.2752,
+         "elevation_in_m": 565.0, "local_depth_in_m": 10.0}]
+
+    with pytest.raises(ValueError):
+        gen.add_stations_from_table({"id": ["BW.A"], "lat": [100.0],
+                                     "lon": [0.0], "ele": [0.0]})
+    assert len(gen._stations) == 2
+
+
+def test_adding_events_as_JSON_files(tmpdir):
+    """
+    JSON event files are decoded incrementally, also when found in a
+    directory.
+    """
+    event = {
+        "latitude": 45.0,
+        "longitude": 12.1,
+        "depth_in_km": 13.0,
+        "origin_time": "2012-04-12T07:15:48.500000Z",
+        "description": None,
+        "m_rr": -2.11e+18,
+        "m_tt": -4.22e+19,
+        "m_pp": 4.43e+19,
+        "m_rt": -9.35e+18,
+        "m_rp": -8.38e+18,
+        "m_tp": -6.44e+18}
+    with open(str(tmpdir.join("events.json")), "wt") as fh:
+        json.dump([event, dict(event, latitude=46.0)], fh)
+    with open(str(tmpdir.join("invalid.json")), "wt") as fh:
+        fh.write("[%s, 1]" % json.dumps(event))
+
+    gen = InputFileGenerator()
+    gen.add_events(str(tmpdir.join("e*.json")))
+    with pytest.raises(ValueError):
+        gen.add_events(str(tmpdir.join("invalid.json")))
+    with pytest.raises(ValueError):
+        gen.add_stations(str(tmpdir.join("invalid.json")))
+
+    event["origin_time"] = obspy.UTCDateTime(event["origin_time"])
+    assert gen._events == [event, dict(event, latitude=46.0)]
+
+
+def test_adding_NDK_and_CMTSOLUTION_files(tmpdir):
+    """
+    NDK and CMTSOLUTION files are read directly, also from directories and
+    with an event filter.
+    """
+    for filename in ("multiple_events.ndk", "CMTSOLUTION"):
+        shutil.copy(os.path.join(DATA, filename), str(tmpdir))
+    gen = InputFileGenerator()
+    gen.add_events(str(tmpdir))
+    assert len(gen._events) == 9
+    event = [_i for _i in gen._events if _i["_event_id"] ==
+             "smi:local/cmtsolution/201501010942A/event"][0]
+    assert event["m_rr"] == 2.03e16
+    assert event["depth_in_km"] == 29.4
+
+    gen = InputFileGenerator(lazy=True)
+    gen.add_events(os.path.join(DATA, "multiple_events.ndk"))
+    gen.event_filter = ["smi:local/ndk/C201303011253A/event"]
+    assert [_i["description"] for _i in gen._filtered_events] == \
+        ["KURIL ISLANDS, C201303011253A"]
+
+
+def test_errors_of_detected_event_files_are_raised(tmpdir):
+    """
+    Files in a detected format raise the error of their reader, only files
+    nothing can read result in a generic error.
+    """
+    cat = obspy.read_events(os.path.join(DATA, "event1.xml"))
+    cat[0].focal_mechanisms = []
+    quakeml_file = str(tmpdir.join("event.xml"))
+    cat.write(quakeml_file, format="quakeml")
+    ndk_file = str(tmpdir.join("events.ndk"))
+    with open(os.path.join(DATA, "multiple_events.ndk"), "rb") as fh:
+        data = fh.read()
+    with open(ndk_file, "wb") as fh:
+        fh.write(data.replace(b"2013/03/01 03:29", b"2013/13/01 03:29"))
+
+    for workers in (None, 2):
+        gen = InputFileGenerator()
+        with pytest.raises(ValueError) as err:
+            gen.add_events(quakeml_file, workers=workers)
+        assert "Each event needs to have a focal mechanism." in \
+            str(err.value)
+        with pytest.raises(ValueError) as err:
+            gen.add_events(ndk_file, workers=workers)
+        assert "Invalid date or time" in str(err.value)
+        assert gen._events == []
+
+    with pytest.raises(ValueError) as err:
+        InputFileGenerator().add_events(os.path.join(
+            DATA, "specfem_globe", "Par_file"))
+    assert "Could not read" in str(err.value)
+
+
+def test_lazy_mode_parses_only_filtered_sources():
+    """
+    In lazy mode nothing is parsed before it is needed and the filters are
+    applied while parsing.
+    """
+    from wfs_input_generator import seed_helper
+
+    seed_files = [os.path.join(DATA, "dataless.seed.BW_FURT"),
+                  os.path.join(DATA, "dataless.seed.BW_RJOB")]
+    event_files = [os.path.join(DATA, "event1.xml"),
+                   os.path.join(DATA, "event2.xml")]
+    gen = InputFileGenerator(lazy=True)
+    gen.add_stations(seed_files)
+    gen.add_events(iter(event_files))
+    assert len(gen._station_table) == 0
+    assert len(gen._event_store) == 0
+
+    gen.station_filter = ["BW.F*"]
+    gen.event_filter = ["SMI:LOCAL/EVENT/2013-01-07T13:58:41.209477"]
+    patch = mock.Mock(wraps=seed_helper._parse_052)
+    with mock.patch.object(seed_helper, "_parse_052", patch):
+        assert [_i["id"] for _i in gen._filtered_stations] == ["BW.FURT"]
+        # Already parsed with this filter.
+        assert [_i["id"] for _i in gen._stations] == ["BW.FURT"]
+    assert patch.call_count == 1
+    assert [_i["_event_id"] for _i in gen._filtered_events] == [
+        "smi:local/Event/2013-01-07T13:58:41.209477"]
+
+    # Changing the filters parses everything again.
+    gen.station_filter = None
+    gen.event_filter = None
+    assert [_i["id"] for _i in gen._stations] == ["BW.FURT", "BW.RJOB"]
+    assert len(gen._events) == 2
+
+    # The result is the same as without lazy mode.
+    eager = InputFileGenerator()
+    eager.add_stations(seed_files)
+    eager.add_events(event_files)
+    assert gen._stations == eager._stations
+    assert gen._events == eager._events
+
+
+def test_adding_from_generators_in_chunks():
+    """
+    Generators are consumed one chunk at a time and every chunk is added
+    before the next one is taken.
+    """
+    gen = InputFileGenerator()
+    pending = []
+
+    def stations():
+        for index in range(25):
+            # Nothing but the current chunk is waiting to be added.
+            pending.append(index - len(gen._station_table))
+            yield {"id": "XX.S%i" % index, "latitude": 1.0,
+                   "longitude": 2.0, "elevation_in_m": 3.0}
+        # Broken items only affect the chunk they are in.
+        yield {"id": "XX.BROKEN"}
+
+    with pytest.raises(ValueError):
+        gen.add_stations(stations(), chunk_size=10)
+    assert max(pending) < 10
+    assert len(gen._station_table) == 20
+
+    events = [{
+        "latitude": 45.0,
+        "longitude": 12.1,
+        "depth_in_km": 13.0,
+        "origin_time": obspy.UTCDateTime(2012, 1, 1) + _i,
+        "m_rr": -2.11e+18,
+        "m_tt": -4.22e+19,
+        "m_pp": 4.43e+19,
+        "m_rt": -9.35e+18,
+        "m_rp": -8.38e+18,
+        "m_tp": -6.44e+18} for _i in range(5)]
+    gen.add_events(iter(events), chunk_size=2)
+    assert len(gen._events) == 5
+
+
+def test_filtered_stations_are_cached():
+    """
+    The filtered stations are only computed again if the stations or the
+    filter change.
+    """
+    from wfs_input_generator.stores import StationTable
+
+    gen = InputFileGenerator()
+    gen.add_stations([
+        {"id": "BW.FURT", "latitude": 1.0, "longitude": 2.0,
+         "elevation_in_m": 3.0},
+        {"id": "TA.A04A", "latitude": 1.0, "longitude": 2.0,
+         "elevation_in_m": 3.0}])
+    gen.station_filter = ["BW.*"]
+
+    take = mock.Mock(wraps=StationTable.take)
+    with mock.patch.object(StationTable, "take",
+                           lambda *args: take(*args)):
+        assert [_i["id"] for _i in gen._filtered_stations] == ["BW.FURT"]
+        assert [_i["id"] for _i in gen._filtered_stations] == ["BW.FURT"]
+        assert take.call_count == 1
+
+        gen.add_stations({"id": "BW.RJOB", "latitude": 1.0,
+                          "longitude": 2.0, "elevation_in_m": 3.0})
+        assert [_i["id"] for _i in gen._filtered_stations] == [
+            "BW.FURT", "BW.RJOB"]
+        assert take.call_count == 2
+
+        # Changing the filter in place is noticed as well.
+        gen.station_filter.append("TA.A*")
+        assert len(gen._filtered_stations) == 3
+        assert take.call_count == 3
+
+
+def test_geographic_station_filters():
+    from wfs_input_generator.station_filters import Cap, IdPatterns
+
+    gen = InputFileGenerator()
+    gen.add_stations([
+        {"id": "BW.FURT", "latitude": 48.162899, "longitude": 11.2752,
+         "elevation_in_m": 565.0},
+        {"id": "BW.RJOB", "latitude": 47.737167, "longitude": 12.795714,
+         "elevation_in_m": 860.0},
+        {"id": "IU.ANMO", "latitude": 34.9459, "longitude": -106.4572,
+         "elevation_in_m": 1850.0}])
+    gen.station_filter = Cap(48.0, 11.0, 5.0)
+    assert [_i["id"] for _i in gen._filtered_stations] == [
+        "BW.FURT", "BW.RJOB"]
+    gen.station_filter = Cap(48.0, 11.0, 5.0) & IdPatterns(["*.R*"]) | \
+        IdPatterns(["IU.*"])
+    assert [_i["id"] for _i in gen._filtered_stations] == [
+        "BW.RJOB", "IU.ANMO"]
@@ -0,0 +1,60 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Tests for the incremental JSON decoding.
+
+:copyright:
+    Lion Krischer (krischer@geophysik.uni-muenchen.de), 2013
+:license:
+    GNU General Public License, Version 3
+    (http://www.gnu.org/copyleft/gpl.html)
+"""
+from wfs_input_generator.json_stream import iter_json_elements
+
+import io
+import json
+import pytest
+
+
+DOCUMENT = [
+    {"id": "BW.FURT", "latitude": 48.162899, "longitude": 11.2752,
+     "elevation_in_m": 565.0, "local_depth_in_m": 10.0,
+     "description": u"München [a, b]"},
+    2.5e-10, -17, "a string with \"quotes\" and ] brackets", None, True,
+    [1, [2, {"3": []}]]]
+
+
+def test_array_elements_with_any_read_size():
+    """
+    Elements and numbers cut off at the end of a block must not matter.
+    """
+    data = json.dumps(DOCUMENT, indent=4).encode("utf-8")
+    for read_size in (1, 2, 3, 7, 64, 1024 * 1024):
+        assert list(iter_json_elements(io.BytesIO(data), read_size)) == \
+            DOCUMENT
+
+
+def test_byte_order_mark_and_whitespace():
+    data = b"\xef\xbb\xbf \n [ 1 , 2 ]\n\n"
+    assert list(iter_json_elements(io.BytesIO(data), 2)) == [1, 2]
+    assert list(iter_json_elements(io.BytesIO(b"[ ]"))) == []
+
+
+def test_single_value():
+    data = b'{"id": "BW.FURT"}'
+    assert list(iter_json_elements(io.BytesIO(data), 3)) == [
+        {"id": "BW.FURT"}]
+
+
+def test_filename(tmpdir):
+    filename = str(tmpdir.join("stations.json"))
+    with open(filename, "wb") as fh:
+        fh.write(json.dumps(DOCUMENT).encode("utf-8"))
+    assert list(iter_json_elements(filename)) == DOCUMENT
+
+
+def test_invalid_documents():
+    for data in (b"", b"[", b"[1, 2", b"[1,]", b"[1 2]", b"[1] 2",
+                 b"[2.5e", b"{", b"[{]"):
+        with pytest.raises(ValueError):
+            list(iter_json_elements(io.BytesIO(data), 2))
@@ -0,0 +1,50 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Tests for the parallel parsing helpers.
+
+:copyright:
+    Lion Krischer (krischer@geophysik.uni-muenchen.de), 2013
+:license:
+    GNU General Public License, Version 3
+    (http://www.gnu.org/copyleft/gpl.html)
+"""
+from wfs_input_generator.parallel import parallel_map, raise_on_errors
+
+import pytest
+
+
+def _square_root(value):
+    if value < 0:
+        raise ValueError("Negative value %i." % value)
+    return [value ** 0.5]
+
+
+def test_parallel_map_keeps_order_and_reports_errors():
+    """
+    Results are in the order of the input, errors are reported per item.
+    """
+    items = [16, 9, -1, 4, -2, 1, 0]
+    for workers in (1, 3):
+        results = parallel_map(_square_root, items, workers=workers)
+        assert [_i[0] for _i in results] == items
+        assert [_i[1] for _i in results] == \
+            [[4.0], [3.0], None, [2.0], None, [1.0], [0.0]]
+        errors = [_i[2] for _i in results]
+        assert errors[2].startswith("ValueError: Negative value -1.")
+        assert errors[4].startswith("ValueError: Negative value -2.")
+        assert errors.count(None) == 5
+
+
+def test_raise_on_errors():
+    """
+    All failed items end up in a single exception.
+    """
+    raise_on_errors(parallel_map(_square_root, [1, 4], workers=2))
+
+    with pytest.raises(ValueError) as err:
+        raise_on_errors(parallel_map(_square_root, [1, -5, -7], workers=2))
+    msg = str(err.value)
+    assert msg.startswith("Could not read 2 file(s):")
+    assert "-5: ValueError: Negative value -5." in msg
+    assert "-7: ValueError: Negative value -7." in msg
@@ -0,0 +1,118 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Tests for the persistent cache of parsed files.
+
+:copyright:
+    Lion Krischer (krischer@geophysik.uni-muenchen.de), 2013
+:license:
+    GNU General Public License, Version 3
+    (http://www.gnu.org/copyleft/gpl.html)
+"""
+from wfs_input_generator.parse_cache import ParseCache
+from wfs_input_generator.stores import StationTable
+
+import numpy as np
+import os
+
+
+def _write(filename, content):
+    with open(filename, "wb") as fh:
+        fh.write(content)
+
+
+def test_storing_and_retrieving(tmpdir):
+    """
+    Records survive a new cache object and are keyed by file and kind.
+    """
+    filename = str(tmpdir.join("stations.txt"))
+    _write(filename, b"abc")
+    cache_file = str(tmpdir.join("cache", "parsed.bin"))
+    records = [{"id": "BW.FURT", "latitude": 1.0}]
+
+    cache = ParseCache(cache_file)
+    assert cache.get(filename, "stations") is None
+    cache.put(filename, "stations", records)
+    assert cache.get(filename, "stations") == records
+    assert cache.get(filename, "events") is None
+    cache.save()
+
+    cache = ParseCache(cache_file)
+    assert len(cache) == 1
+    assert cache.get(filename, "stations") == records
+
+
+def test_station_tables_are_kept(tmpdir):
+    """
+    Station tables are cached as tables and not as dictionaries.
+    """
+    filename = str(tmpdir.join("stations.txt"))
+    _write(filename, b"abc")
+    cache_file = str(tmpdir.join("parsed.bin"))
+    table = StationTable.from_stations([
+        {"id": "BW.FURT", "latitude": 48.16, "longitude": 11.28,
+         "elevation_in_m": 565.0, "local_depth_in_m": 0.0}])
+
+    cache = ParseCache(cache_file)
+    cache.put(filename, "stations", table)
+    assert cache.get(filename, "stations") is table
+    cache.save()
+
+    cached = ParseCache(cache_file).get(filename, "stations")
+    assert isinstance(cached, StationTable)
+    assert list(cached) == list(table)
+    np.testing.assert_equal(cached.latitude, table.latitude)
+
+
+def test_changed_files_are_not_used(tmpdir):
+    """
+    A changed size or modification time invalidates an entry. So does a
+    changed content if hashes are used.
+    """
+    filename = str(tmpdir.join("stations.txt"))
+    _write(filename, b"abc")
+    cache = ParseCache(str(tmpdir.join("parsed.bin")))
+    cache.put(filename, "stations", [{"id": "A.B"}])
+    _write(filename, b"abcd")
+    assert cache.get(filename, "stations") is None
+    assert len(cache) == 0
+
+    hashing_cache = ParseCache(str(tmpdir.join("hashed.bin")),
+                               use_content_hash=True)
+    hashing_cache.put(filename, "stations", [{"id": "A.B"}])
+    stat = os.stat(filename)
+    _write(filename, b"xbcd")
+    os.utime(filename, (stat.st_atime, stat.st_mtime))
+    assert cache.get(filename, "stations") is None
+    assert hashing_cache.get(filename, "stations") is None
+
+
+def test_invalidation_and_eviction(tmpdir):
+    """
+    Single files or everything can be removed and only the most recently
+    used files are kept.
+    """
+    filenames = [str(tmpdir.join("%i.txt" % _i)) for _i in range(3)]
+    for filename in filenames:
+        _write(filename, b"abc")
+
+    cache = ParseCache(str(tmpdir.join("parsed.bin")), max_entries=2)
+    cache.put(filenames[0], "stations", [])
+    cache.put(filenames[1], "stations", [])
+    # Makes the second one the least recently used.
+    assert cache.get(filenames[0], "stations") == []
+    cache.put(filenames[2], "stations", [])
+    assert len(cache) == 2
+    assert cache.get(filenames[1], "stations") is None
+
+    cache.invalidate(filenames[0])
+    assert cache.get(filenames[0], "stations") is None
+    assert cache.get(filenames[2], "stations") == []
+    cache.invalidate()
+    assert len(cache) == 0
+
+
+def test_corrupt_cache_files_are_ignored(tmpdir):
+    cache_file = str(tmpdir.join("parsed.bin"))
+    _write(cache_file, b"garbage")
+    assert len(ParseCache(cache_file)) == 0
@@ -0,0 +1,147 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Tests the streaming QuakeML helper function.
+
+:copyright:
+    Lion Krischer (krischer@geophysik.uni-muenchen.de), 2013
+:license:
+    GNU General Public License, Version 3
+    (http://www.gnu.org/copyleft/gpl.html)
+"""
+from wfs_input_generator.input_file_generator import _events_from_catalog
+from wfs_input_generator.quakeml_helper import extract_events_from_QuakeML, \
+    iter_events_from_QuakeML
+
+import inspect
+import io
+import obspy
+import os
+import pytest
+import types
+import warnings
+
+# Most generic way to get the actual data directory.
+DATA = os.path.join(os.path.dirname(os.path.abspath(inspect.getfile(
+    inspect.currentframe()))), "data")
+
+EVENT = b"""<?xml version='1.0' encoding='utf-8'?>
+<q:quakeml xmlns:q="http://quakeml.org/xmlns/quakeml/1.2"
+           xmlns="http://quakeml.org/xmlns/bed/1.2">
+  <eventParameters publicID="smi:local/catalog">
+    <event publicID="smi:local/event/%(name)s">
+      <preferredOriginID>smi:local/origin/%(name)s/b</preferredOriginID>
+      <preferredFocalMechanismID>smi:fm/%(name)s/b</preferredFocalMechanismID>
+      <pick publicID="smi:local/pick/%(name)s">
+        <time><value>2012-01-01T00:00:00</value></time>
+      </pick>
+      <origin publicID="smi:local/origin/%(name)s/a">
+        <time><value>2012-01-01T00:00:00</value></time>
+        <latitude><value>1.0</value></latitude>
+        <longitude><value>2.0</value></longitude>
+        <depth><value>3000.0</value></depth>
+      </origin>
+      <origin publicID="smi:local/origin/%(name)s/b">
+        <time><value>2012-01-01T00:00:01</value></time>
+        <latitude><value>4.0</value></latitude>
+        <longitude><value>5.0</value></longitude>
+        <depth><value>6000.0</value></depth>
+      </origin>
+      <focalMechanism publicID="smi:fm/%(name)s/a">
+        <momentTensor>
+          <derivedOriginID>smi:local/origin/%(name)s/a</derivedOriginID>
+          <tensor>
+            <Mrr><value>1.0</value></Mrr><Mtt><value>1.0</value></Mtt>
+            <Mpp><value>1.0</value></Mpp><Mrt><value>1.0</value></Mrt>
+            <Mrp><value>1.0</value></Mrp><Mtp><value>1.0</value></Mtp>
+          </tensor>
+        </momentTensor>
+      </focalMechanism>
+      <focalMechanism publicID="smi:fm/%(name)s/b">
+        <momentTensor>
+          <tensor>
+            <Mrr><value>1E18</value></Mrr><Mtt><value>2E18</value></Mtt>
+            <Mpp><value>3E18</value></Mpp><Mrt><value>4E18</value></Mrt>
+            <Mrp><value>5E18</value></Mrp><Mtp><value>6E18</value></Mtp>
+          </tensor>
+        </momentTensor>
+      </focalMechanism>
+    </event>
+  </eventParameters>
+</q:quakeml>"""
+
+
+def _catalog(*names):
+    """
+    A QuakeML document with one event per name.
+    """
+    documents = [EVENT % {"name": _i} for _i in names]
+    head = documents[0].partition(b"<event ")[0]
+    events = [b"<event " + _i.partition(b"<event ")[2].rpartition(
+        b"</event>")[0] + b"</event>" for _i in documents]
+    return head + b"\n".join(events) + b"</eventParameters></q:quakeml>"
+
+
+def test_same_events_as_obspy():
+    """
+    The streamed events are identical to the ones converted from ObsPy.
+    """
+    for filename in ("event1.xml", "event2.xml",
+                     "quakeml_multiple_origins.xml"):
+        filename = os.path.join(DATA, filename)
+        with warnings.catch_warnings(record=True):
+            warnings.simplefilter("always")
+            assert extract_events_from_QuakeML(filename) == \
+                _events_from_catalog(obspy.read_events(filename))
+
+
+def test_preferred_ids_are_resolved_within_each_event():
+    """
+    The preferred focal mechanism and origin are used if there is no derived
+    origin.
+    """
+    data = _catalog("x", "y")
+    events = extract_events_from_QuakeML(io.BytesIO(data))
+    assert [_i["_event_id"] for _i in events] == \
+        ["smi:local/event/x", "smi:local/event/y"]
+    assert events[0]["latitude"] == 4.0
+    assert events[0]["depth_in_km"] == 6.0
+    assert events[0]["origin_time"] == obspy.UTCDateTime(2012, 1, 1, 0, 0, 1)
+    assert events[0]["m_tp"] == 6E18
+    assert events[0]["description"] is None
+    assert events == _events_from_catalog(obspy.read_events(io.BytesIO(data)))
+
+    # The derived origin of the moment tensor wins.
+    data = data.replace(b"<preferredFocalMechanismID>smi:fm/x/b",
+                        b"<preferredFocalMechanismID>smi:fm/x/a")
+    event = extract_events_from_QuakeML(io.BytesIO(data))[0]
+    assert event["latitude"] == 1.0
+    assert event["m_tp"] == 1.0
+
+
+def test_events_are_yielded_one_at_a_time():
+    events = iter_events_from_QuakeML(io.BytesIO(_catalog("x", "y", "z")))
+    assert isinstance(events, types.GeneratorType)
+    assert next(events)["_event_id"] == "smi:local/event/x"
+    assert len(list(events)) == 2
+
+
+def test_id_filter():
+    events = extract_events_from_QuakeML(
+        io.BytesIO(_catalog("x", "y", "z")),
+        id_filter=lambda x: not x.endswith("/y"))
+    assert [_i["_event_id"] for _i in events] == \
+        ["smi:local/event/x", "smi:local/event/z"]
+
+
+def test_invalid_events_raise():
+    data = _catalog("x")
+    with pytest.raises(ValueError):
+        extract_events_from_QuakeML(io.BytesIO(
+            data.replace(b"<Mrr><value>1E18</value></Mrr>", b"")))
+    with pytest.raises(ValueError):
+        extract_events_from_QuakeML(io.BytesIO(
+            data.replace(b"<latitude><value>4.0</value></latitude>", b"")))
+    with pytest.raises(ValueError):
+        extract_events_from_QuakeML(io.BytesIO(
+            data.replace(b"<value>4.0</value>", b"<value>north</value>")))
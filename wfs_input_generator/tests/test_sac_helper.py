@@ -0,0 +1,106 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Tests for the SAC header reader.
+
+:copyright:
+    Lion Krischer (krischer@geophysik.uni-muenchen.de), 2013
+:license:
+    GNU General Public License, Version 3
+    (http://www.gnu.org/copyleft/gpl.html)
+"""
+from wfs_input_generator import sac_helper
+from wfs_input_generator.sac_helper import extract_coordinates_from_SAC, \
+    read_sac_headers
+
+import inspect
+import io
+import obspy
+import os
+import pytest
+import warnings
+
+DATA = os.path.join(os.path.dirname(os.path.abspath(inspect.getfile(
+    inspect.currentframe()))), "data")
+
+
+def _obspy_stations(filename_or_buf):
+    """
+    Reference implementation reading the full file with ObsPy.
+    """
+    stations = []
+    for tr in obspy.read(filename_or_buf, format="SAC"):
+        sac = tr.stats.sac
+        if "stla" not in sac or "stlo" not in sac or "stel" not in sac:
+            continue
+        stat = {"id": "%s.%s" % (tr.stats.network, tr.stats.station),
+                "latitude": float(sac.stla),
+                "longitude": float(sac.stlo),
+                "elevation_in_m": float(sac.stel)}
+        if "stdp" in sac:
+            stat["local_depth_in_m"] = float(sac.stdp)
+        stations.append(stat)
+    return stations
+
+
+def test_same_result_as_obspy():
+    """
+    Files with and without coordinates and local depth result in the same
+    dictionaries as reading them with ObsPy.
+    """
+    filenames = [os.path.join(DATA, _i) for _i in (
+        "example.sac", "example_without_coordinates.sac",
+        "example_without_local_depth.sac")]
+    # Python 2 does not repeat warnings already shown by an earlier test.
+    getattr(sac_helper, "__warningregistry__", {}).clear()
+    with warnings.catch_warnings(record=True) as w:
+        warnings.simplefilter("always")
+        stations = extract_coordinates_from_SAC(filenames)
+    assert len(w) == 1
+    assert str(w[0].message) == \
+        "No coordinates for channel 'IU.ANMO.00.BHZ'."
+    assert stations == _obspy_stations(filenames[0]) + \
+        _obspy_stations(filenames[2])
+
+
+def test_both_byte_orders():
+    """
+    Little and big endian files can be mixed in a single batch.
+    """
+    filename = os.path.join(DATA, "example.sac")
+    tr = obspy.read(filename)[0]
+    big_endian = io.BytesIO()
+    tr.write(big_endian, format="SAC", byteorder=">")
+    big_endian.seek(0, 0)
+
+    headers = read_sac_headers([filename, big_endian])
+    assert headers["nvhdr"].tolist() == [6, 6]
+    assert [_i.strip() for _i in headers["kstnm"]] == [b"ANMO", b"ANMO"]
+    assert headers["stla"][0] == headers["stla"][1]
+
+    big_endian.seek(0, 0)
+    assert extract_coordinates_from_SAC([big_endian]) == \
+        _obspy_stations(filename)
+
+
+def test_invalid_files_raise():
+    with pytest.raises(ValueError) as err:
+        read_sac_headers([io.BytesIO(b"\x00" * 10)])
+    assert "too short" in str(err.value)
+    with pytest.raises(ValueError) as err:
+        read_sac_headers([io.BytesIO(b"\x00" * 632)])
+    assert "not a SAC file" in str(err.value)
+    assert len(read_sac_headers([])) == 0
+
+
+def test_id_filter():
+    """
+    Files of rejected stations are skipped without any further checks.
+    """
+    filename = os.path.join(DATA, "example_without_coordinates.sac")
+    sac_helper.__warningregistry__ = {}
+    with warnings.catch_warnings(record=True) as w:
+        warnings.simplefilter("always")
+        assert extract_coordinates_from_SAC(
+            filename, id_filter=lambda x: False) == []
+    assert len(w) == 0
@@ -0,0 +1,110 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Tests for the SEED and XSEED blockette scanners.
+
+:copyright:
+    Lion Krischer (krischer@geophysik.uni-muenchen.de), 2013
+:license:
+    GNU General Public License, Version 3
+    (http://www.gnu.org/copyleft/gpl.html)
+"""
+from wfs_input_generator.seed_helper import extract_coordinates_from_SEED, \
+    extract_coordinates_from_XSEED
+
+import inspect
+import io
+from obspy.io.xseed import Parser
+import os
+import pytest
+
+DATA = os.path.join(os.path.dirname(os.path.abspath(inspect.getfile(
+    inspect.currentframe()))), "data")
+
+
+def _parser_stations(filename):
+    """
+    Reference implementation using the full ObsPy parser.
+    """
+    stations = []
+    for station in Parser(filename).stations:
+        b_050 = [_i for _i in station if _i.id == 50][0]
+        b_052 = [_i for _i in station if _i.id == 52][0]
+        stations.append({
+            "id": "%s.%s" % (b_050.network_code, b_050.station_call_letters),
+            "latitude": b_052.latitude,
+            "longitude": b_052.longitude,
+            "elevation_in_m": b_052.elevation,
+            "local_depth_in_m": b_052.local_depth})
+    return stations
+
+
+def _blockette(blockette_type, content):
+    return blockette_type + b"%04i" % (len(content) + 7) + content
+
+
+def _volume(station_blockettes, record_length=256):
+    """
+    Builds a minimal SEED volume with very short logical records so the
+    station blockettes have to span multiple records.
+    """
+    volume = b"000001V " + _blockette(b"010", b"02.308")
+    volume = volume.ljust(record_length)
+    data = b"".join(station_blockettes)
+    size = record_length - 8
+    for index in range(0, len(data), size):
+        volume += (b"%06iS%s" % (index // size + 2,
+                                 b"*" if index else b" ") +
+                   data[index:index + size]).ljust(record_length)
+    return io.BytesIO(volume)
+
+
+def test_same_result_as_obspy_parser(tmpdir):
+    """
+    SEED and XSEED files result in the same stations as the ObsPy parser.
+    """
+    for name in ("dataless.seed.BW_FURT", "dataless.seed.BW_RJOB"):
+        filename = os.path.join(DATA, name)
+        expected = _parser_stations(filename)
+        assert extract_coordinates_from_SEED(filename) == expected
+        with open(filename, "rb") as fh:
+            assert extract_coordinates_from_SEED(fh) == expected
+
+        xseed_file = str(tmpdir.join(name + ".xml"))
+        Parser(filename).write_xseed(xseed_file)
+        assert extract_coordinates_from_XSEED(xseed_file) == expected
+
+
+def test_blockettes_spanning_records():
+    b_050 = _blockette(
+        b"050", b"ABCD +48.162899+011.275200+0565.00003000Site~00132101"
+        b"02001,001~~NXX")
+    b_052 = _blockette(
+        b"052", b"  EHZ0000002~003006+48.162899+011.275200+0565.0010.5000.0"
+        b"-90.00001122.0000E+020.0000E+000000CG~2001,001~~N")
+    filler = _blockette(b"053", b"x" * 236)
+    volume = _volume([b_050, filler, b_052, filler])
+    assert extract_coordinates_from_SEED(volume) == [{
+        "id": "XX.ABCD",
+        "latitude": 48.162899,
+        "longitude": 11.2752,
+        "elevation_in_m": 565.0,
+        "local_depth_in_m": 10.5}]
+
+    # Stations without a channel cannot be used.
+    with pytest.raises(ValueError):
+        extract_coordinates_from_SEED(_volume([b_050, filler]))
+
+
+def test_id_filter(tmpdir):
+    """
+    Stations rejected by the id filter are skipped.
+    """
+    filename = os.path.join(DATA, "dataless.seed.BW_FURT")
+    xseed_file = str(tmpdir.join("furt.xml"))
+    Parser(filename).write_xseed(xseed_file)
+    for function, item in ((extract_coordinates_from_SEED, filename),
+                           (extract_coordinates_from_XSEED, xseed_file)):
+        assert function(item, id_filter=lambda x: x != "BW.FURT") == []
+        assert function(item, id_filter=lambda x: x == "BW.FURT") == \
+            function(item)
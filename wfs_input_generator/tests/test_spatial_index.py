@@ -0,0 +1,88 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Tests for the spherical spatial index.
+
+:copyright:
+    Lion Krischer (krischer@geophysik.uni-muenchen.de), 2013
+:license:
+    GNU General Public License, Version 3
+    (http://www.gnu.org/copyleft/gpl.html)
+"""
+from wfs_input_generator.spatial_index import bounding_cap, SphericalIndex, \
+    unit_vectors
+
+import numpy as np
+
+
+def _random_points(count, seed=12345):
+    random = np.random.RandomState(seed)
+    latitude = np.rad2deg(np.arcsin(random.uniform(-1.0, 1.0, count)))
+    longitude = random.uniform(-180.0, 180.0, count)
+    return latitude, longitude
+
+
+def _distances(latitude, longitude, lat, lng):
+    """
+    Brute force great circle distances in degree.
+    """
+    return np.rad2deg(np.arccos(np.clip(
+        unit_vectors(latitude, longitude).dot(unit_vectors(lat, lng)[0]),
+        -1.0, 1.0)))
+
+
+def test_queries_match_brute_force():
+    """
+    Queries give the same result for any mix of indexed and unindexed
+    points.
+    """
+    latitude, longitude = _random_points(3000)
+    for chunk_size in (3000, 700, 100):
+        index = SphericalIndex()
+        for start in range(0, 3000, chunk_size):
+            index.extend(latitude[start:start + chunk_size],
+                         longitude[start:start + chunk_size])
+            count = len(index)
+            for lat, lng, radius in ((89.0, 10.0, 5.0), (0.0, 180.0, 20.0),
+                                     (-45.0, -90.0, 0.0), (10.0, 10.0, 180)):
+                distances = _distances(latitude[:count], longitude[:count],
+                                       lat, lng)
+                assert index.query_radius(lat, lng, radius).tolist() == \
+                    np.nonzero(distances <= radius)[0].tolist()
+
+                indices, nearest = index.query_nearest(lat, lng, k=5)
+                assert indices.tolist() == \
+                    np.argsort(distances, kind="mergesort")[:5].tolist()
+                np.testing.assert_allclose(nearest, distances[indices],
+                                           atol=1E-9)
+
+
+def test_query_box():
+    latitude, longitude = _random_points(2000)
+    index = SphericalIndex()
+    index.extend(latitude, longitude)
+    for box in ((10.0, 50.0, -20.0, 40.0), (-90.0, -60.0, -180.0, 180.0),
+                (-10.0, 10.0, 170.0, -170.0), (-80.0, 80.0, -179.0, 179.0)):
+        min_lat, max_lat, min_lng, max_lng = box
+        mask = (latitude >= min_lat) & (latitude <= max_lat)
+        if min_lng <= max_lng:
+            mask &= (longitude >= min_lng) & (longitude <= max_lng)
+        else:
+            mask &= (longitude >= min_lng) | (longitude <= max_lng)
+        assert index.query_box(min_lat, max_lat, min_lng, max_lng,
+                               latitude, longitude).tolist() == \
+            np.nonzero(mask)[0].tolist()
+
+
+def test_bounding_cap():
+    latitude, longitude = [0.0, 0.0, 10.0], [170.0, -170.0, 180.0]
+    lat, lng, radius = bounding_cap(latitude, longitude)
+    assert (_distances(latitude, longitude, lat, lng) <= radius + 1E-9).all()
+    assert radius < 15.0
+    assert bounding_cap([0.0, 0.0], [0.0, 180.0])[2] == 180.0
+
+
+def test_empty_index():
+    index = SphericalIndex()
+    assert index.query_radius(0.0, 0.0, 180.0).tolist() == []
+    assert index.query_nearest(0.0, 0.0, k=3)[0].tolist() == []
@@ -14,6 +14,7 @@ from wfs_input_generator import InputFileGenerator
 import inspect
 from obspy.core import UTCDateTime
 import os
+import pytest
 
 # Most generic way to get the actual data directory.
 DATA = os.path.join(os.path.dirname(os.path.abspath(inspect.getfile(
@@ -168,3 +169,32 @@ def test_cmt_file():
         "Mrt:         2e+22",
         "Mrp:         2.8e+23",
         "Mtp:         1.65e+24"]
+
+
+def test_station_codes():
+    """
+    Only the network and station codes of the ids are written. Ids without
+    a network code are rejected.
+    """
+    gen = InputFileGenerator()
+    gen.add_stations([
+        {"id": "KO.ADVT.00", "latitude": 41.0, "longitude": 33.1234,
+         "elevation_in_m": 10}])
+    gen.add_events(os.path.join(DATA, "quakeml_multiple_origins.xml"))
+    gen.config.NPROC_XI = 2
+    gen.config.NPROC_ETA = 2
+    gen.config.RECORD_LENGTH_IN_MINUTES = 10.0
+    gen.config.SIMULATION_TYPE = 1
+    gen.config.NCHUNKS = 6
+    gen.config.NEX_XI = 64
+    gen.config.NEX_ETA = 64
+    gen.config.MODEL = "1D_isotropic_prem"
+
+    input_files = gen.write(format="SPECFEM3D_GLOBE")
+    assert input_files["STATIONS"] == "ADVT KO 41.00000 33.12340 10.0 0.0"
+
+    gen.add_stations({"id": "ADVT", "latitude": 41.0, "longitude": 33.1234,
+                      "elevation_in_m": 10})
+    with pytest.raises(ValueError) as err:
+        gen.write(format="SPECFEM3D_GLOBE")
+    assert "'ADVT' has no network code" in str(err.value)
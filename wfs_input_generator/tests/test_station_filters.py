@@ -0,0 +1,97 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Tests for the station filters.
+
+:copyright:
+    Lion Krischer (krischer@geophysik.uni-muenchen.de), 2013
+:license:
+    GNU General Public License, Version 3
+    (http://www.gnu.org/copyleft/gpl.html)
+"""
+from wfs_input_generator.spatial_index import unit_vectors
+from wfs_input_generator.station_filters import Box, Cap, DepthRange, \
+    ElevationRange, IdPatterns, Polygon
+from wfs_input_generator.stores import StationTable
+
+import numpy as np
+import pytest
+
+
+def _table(count=5000, seed=12345):
+    random = np.random.RandomState(seed)
+    latitude = np.rad2deg(np.arcsin(random.uniform(-1.0, 1.0, count)))
+    longitude = random.uniform(-180.0, 180.0, count)
+    ids = ["N%i.S%i" % (_i % 7, _i) for _i in range(count)]
+    table = StationTable()
+    table.add_columns(ids, latitude, longitude,
+                      random.uniform(-100.0, 3000.0, count),
+                      random.uniform(0.0, 100.0, count))
+    return table
+
+
+def test_box_and_cap():
+    table = _table()
+    lat, lng = table.latitude, table.longitude
+    assert Box(10.0, 50.0, 170.0, -160.0).mask(table).tolist() == (
+        (lat >= 10.0) & (lat <= 50.0) &
+        ((lng >= 170.0) | (lng <= -160.0))).tolist()
+
+    distances = np.rad2deg(np.arccos(np.clip(unit_vectors(lat, lng).dot(
+        unit_vectors(48.0, 11.0)[0]), -1.0, 1.0)))
+    assert Cap(48.0, 11.0, 15.0).mask(table).tolist() == \
+        (distances <= 15.0).tolist()
+
+
+def test_polygon():
+    """
+    Convex polygons are compared to the side of every edge, which is
+    independent of the projection used by the filter.
+    """
+    table = _table()
+    latitudes = [10.0, 20.0, 60.0, 40.0]
+    longitudes = [170.0, -150.0, -170.0, 160.0]
+    vertices = unit_vectors(latitudes, longitudes)
+    points = unit_vectors(table.latitude, table.longitude)
+    expected = np.ones(len(table), dtype=bool)
+    for index in range(4):
+        normal = np.cross(vertices[index], vertices[(index + 1) % 4])
+        expected &= points.dot(normal) > 0
+    assert Polygon(latitudes, longitudes).mask(table).tolist() == \
+        expected.tolist()
+
+    # A concave one.
+    table = StationTable()
+    table.add_columns(["A.IN", "A.NOTCH", "A.OUT"], [1.0, 5.0, 20.0],
+                      [1.0, 5.0, 20.0], [0.0] * 3)
+    polygon = Polygon([0.0, 0.0, 10.0, 2.0, 10.0], [0.0, 10.0, 10.0, 5.0, 0.0])
+    assert polygon.mask(table).tolist() == [True, False, False]
+
+    with pytest.raises(ValueError):
+        Polygon([0.0, 1.0], [0.0, 1.0])
+    with pytest.raises(ValueError):
+        Polygon([0.0, 0.0, 0.0, 0.0], [0.0, 90.0, 180.0, -90.0])
+
+
+def test_ranges_and_combinations():
+    table = _table()
+    elevation = table.elevation_in_m
+    depth = table.local_depth_in_m
+    is_n1 = np.array([_i.startswith("N1.") for _i in table.ids])
+
+    assert ElevationRange(minimum=1000.0).mask(table).tolist() == \
+        (elevation >= 1000.0).tolist()
+    assert DepthRange(10.0, 20.0).mask(table).tolist() == \
+        ((depth >= 10.0) & (depth <= 20.0)).tolist()
+
+    combined = IdPatterns(["N1.*"]) & ElevationRange(maximum=0.0) | \
+        DepthRange(maximum=1.0)
+    assert combined.mask(table).tolist() == \
+        ((is_n1 & (elevation <= 0.0)) | (depth <= 1.0)).tolist()
+
+    # Only filters restricting the ids can be passed on to readers.
+    assert combined.id_filter() is None
+    id_filter = (IdPatterns(["N1.*"]) & Cap(0.0, 0.0, 10.0)).id_filter()
+    assert id_filter("N1.S1") and not id_filter("N2.S2")
+    id_filter = (IdPatterns(["N1.*"]) | IdPatterns(["N2.S2"])).id_filter()
+    assert id_filter("N2.S2") and not id_filter("N2.S9")
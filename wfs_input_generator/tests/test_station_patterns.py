@@ -0,0 +1,52 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Tests for the compiled station id patterns.
+
+:copyright:
+    Lion Krischer (krischer@geophysik.uni-muenchen.de), 2013
+:license:
+    GNU General Public License, Version 3
+    (http://www.gnu.org/copyleft/gpl.html)
+"""
+from wfs_input_generator.station_patterns import StationPatterns
+from wfs_input_generator.stores import StationTable
+
+import fnmatch
+import pickle
+
+IDS = ["BW.FURT", "BW.RJOB", "BW.A.B", "TA.A04A", "TA.Y12H", "TA.Y22H",
+       "TA.B04A", "IU.ANMO", "IU.COLA", "FURT", "GE.FURT", "XX."]
+
+PATTERNS = [
+    ["BW.FURT"],
+    ["BW.*"],
+    ["TA.A*", "TA.Y?H", "TA.Y??H"],
+    ["*.FURT"],
+    ["[BG]?.FURT", "IU.[!A]*"],
+    ["FURT", "XX.*", "TA.*", "TA.A*"],
+    ["*"],
+    ["NOPE.*", "NO.PE"]]
+
+
+def test_same_result_as_fnmatch():
+    table = StationTable()
+    table.add_columns(IDS, [1.0] * len(IDS), [2.0] * len(IDS),
+                      [3.0] * len(IDS))
+    for patterns in PATTERNS:
+        expected = [any(fnmatch.fnmatchcase(station_id, _i)
+                        for _i in patterns) for station_id in IDS]
+        compiled = StationPatterns(patterns)
+        assert [compiled(_i) for _i in IDS] == expected
+        assert compiled.mask(table).tolist() == expected
+        assert pickle.loads(pickle.dumps(compiled)).mask(table).tolist() == \
+            expected
+
+
+def test_pattern_classification():
+    compiled = StationPatterns(["BW.FURT", "BW.*", "TA.A*", "BW.R*", "*.A"])
+    assert compiled.literals == set(["BW.FURT"])
+    assert compiled.networks == set(["BW"])
+    # BW is selected as a whole anyway.
+    assert sorted(compiled.by_network) == ["TA"]
+    assert compiled.others is not None
@@ -10,11 +10,15 @@ Tests the StationXML helper function.
     (http://www.gnu.org/copyleft/lesser.html)
 """
 from wfs_input_generator.station_xml_helper \
-    import extract_coordinates_from_StationXML
+    import extract_coordinates_from_StationXML, \
+    iter_coordinates_from_StationXML
 
 import inspect
 import io
+from lxml import etree
 import os
+import pytest
+import types
 
 # Most generic way to get the actual data directory.
 DATA = os.path.join(os.path.dirname(os.path.abspath(inspect.getfile(
@@ -102,3 +106,62 @@ def test_dictionary_extraction_from_BytesIO():
          "longitude": 23.192,
          "elevation_in_m": 500.0}
         ])
+
+
+def test_streaming_extraction():
+    """
+    The generator yields the same stations as the list based function.
+    """
+    filename = os.path.join(DATA, "station.xml")
+    stations = iter_coordinates_from_StationXML(filename)
+    assert isinstance(stations, types.GeneratorType)
+    assert list(stations) == extract_coordinates_from_StationXML(filename)
+
+
+def test_streaming_extraction_is_incremental():
+    """
+    Stations are yielded as soon as they have been parsed. The truncated
+    document is only noticed once the generator reaches the end of it.
+    """
+    filename = os.path.join(DATA, "station.xml")
+    with open(filename, "rb") as fh:
+        data = fh.read()
+    # Cut the document after the first station.
+    data = data[:data.index(b"</Station>") + len(b"</Station>") + 100]
+
+    stations = iter_coordinates_from_StationXML(io.BytesIO(data))
+    assert next(stations)["id"] == "HT.HORT"
+    with pytest.raises(etree.XMLSyntaxError):
+        next(stations)
+
+
+def test_id_filter():
+    """
+    Stations rejected by the id filter are skipped.
+    """
+    filename = os.path.join(DATA, "station.xml")
+    stations = extract_coordinates_from_StationXML(
+        filename, id_filter=lambda x: x in ("HT.LIT", "HT.XOR"))
+    assert [_i["id"] for _i in stations] == ["HT.LIT", "HT.XOR"]
+
+
+def test_id_filter_is_applied_at_the_start_of_stations():
+    """
+    Stations are rejected as soon as their start tag has been read, before
+    any of their channels are parsed.
+    """
+    filename = os.path.join(DATA, "station.xml")
+    with open(filename, "rb") as fh:
+        data = fh.read()
+    # Cut the document within the channels of the first station.
+    data = data[:data.index(b"<Channel") + 100]
+
+    ids = []
+
+    def id_filter(station_id):
+        ids.append(station_id)
+        return False
+
+    with pytest.raises(etree.XMLSyntaxError):
+        extract_coordinates_from_StationXML(io.BytesIO(data), id_filter)
+    assert ids == ["HT.HORT"]
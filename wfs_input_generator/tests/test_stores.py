@@ -0,0 +1,288 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Tests for the station and event stores.
+
+:copyright:
+    Lion Krischer (krischer@geophysik.uni-muenchen.de), 2013
+:license:
+    GNU General Public License, Version 3
+    (http://www.gnu.org/copyleft/gpl.html)
+"""
+from wfs_input_generator.stores import EventIndex, EventStore, \
+    StationTable, duplicate_event_groups, event_columns, moment_magnitudes, \
+    remove_duplicate_events
+
+import numpy as np
+import obspy
+import pytest
+
+
+def _station(station_id, latitude):
+    return {"id": station_id, "latitude": latitude, "longitude": 2.0,
+            "elevation_in_m": 3.0, "local_depth_in_m": 0.0}
+
+
+def test_station_table_skips_exact_duplicates():
+    """
+    Exact duplicates are never an error.
+    """
+    for policy in ("keep_first", "keep_last", "error"):
+        store = StationTable(on_conflict=policy)
+        store.extend([_station("BW.FURT", 1.0), _station("BW.FURT", 1.0),
+                      _station("BW.RJOB", 1.0)])
+        assert len(store) == 2
+        assert "BW.FURT" in store
+        assert [_i["id"] for _i in store] == ["BW.FURT", "BW.RJOB"]
+
+
+def test_station_table_conflict_policies():
+    """
+    Tests the configurable resolution of repeated station ids.
+    """
+    store = StationTable(on_conflict="keep_first")
+    store.extend([_station("BW.FURT", 1.0), _station("BW.FURT", 2.0)])
+    assert store.values() == [_station("BW.FURT", 1.0)]
+
+    store = StationTable(on_conflict="keep_last")
+    store.extend([_station("BW.FURT", 1.0), _station("BW.FURT", 2.0)])
+    assert store.values() == [_station("BW.FURT", 2.0)]
+
+    store = StationTable(on_conflict="error")
+    store.add(_station("BW.FURT", 1.0))
+    with pytest.raises(ValueError):
+        store.add(_station("BW.FURT", 2.0))
+    assert store.values() == [_station("BW.FURT", 1.0)]
+
+    with pytest.raises(ValueError):
+        StationTable(on_conflict="something")
+
+
+def test_event_store_removes_duplicates():
+    """
+    Only exactly equal events are duplicates.
+    """
+    event = _event("smi:A", "2012-01-01", 1E18, 10.0)
+    other = dict(event, origin_time=obspy.UTCDateTime(2012, 1, 1, 0, 0, 1))
+
+    store = EventStore()
+    store.extend([event, dict(event), other, event])
+    assert len(store) == 2
+    assert store.values() == [event, other]
+    store.clear()
+    assert len(store) == 0
+
+
+def test_station_table_columns():
+    """
+    The coordinates and codes are available as columns.
+    """
+    table = StationTable()
+    table.add(_station("BW.FURT", 1.0))
+    table.add({"id": "RJOB", "latitude": 4.0, "longitude": 5.0,
+               "elevation_in_m": 6.0})
+    table.add_columns(["GR.FUR", "BW.ALTM"], [7.0, 8.0], [9.0, 10.0],
+                      [11.0, 12.0], [13.0, 14.0])
+
+    assert len(table) == 4
+    assert table.ids == ["BW.FURT", "RJOB", "GR.FUR", "BW.ALTM"]
+    assert table.network_codes == ["BW", "", "GR", "BW"]
+    assert table.station_codes == ["FURT", "RJOB", "FUR", "ALTM"]
+    assert table.latitude.dtype == np.float64
+    np.testing.assert_equal(table.latitude, [1.0, 4.0, 7.0, 8.0])
+    np.testing.assert_equal(table.local_depth_in_m, [0.0, 0.0, 13.0, 14.0])
+    assert table["RJOB"] == {"id": "RJOB", "latitude": 4.0,
+                             "longitude": 5.0, "elevation_in_m": 6.0,
+                             "local_depth_in_m": 0.0}
+
+    # The classic view.
+    assert table.values()[0] == _station("BW.FURT", 1.0)
+    assert list(table) == table.values()
+    # Positions and slices work like for the list of dictionaries.
+    assert table[0] == table.values()[0]
+    assert table[np.int64(-1)] == table.values()[-1]
+    assert table[1:] == table.values()[1:]
+    assert table[::-2] == table.values()[::-2]
+    with pytest.raises(IndexError):
+        table[4]
+    with pytest.raises(KeyError):
+        table["BW.RJOB"]
+
+    with pytest.raises(ValueError):
+        table.add_columns(["A.B"], [1.0, 2.0], [1.0], [1.0])
+
+
+def test_station_table_seed_codes():
+    """
+    The codes written by the backends are the first two parts of each id.
+    Ids without a network code are rejected.
+    """
+    table = StationTable()
+    table.add(_station("BW.FURT.00", 1.0))
+    table.add(_station("GR.FUR", 2.0))
+    assert table.ids == ["BW.FURT.00", "GR.FUR"]
+    assert table.seed_codes() == (["BW", "GR"], ["FURT", "FUR"])
+
+    table.add(_station("RJOB", 3.0))
+    with pytest.raises(ValueError) as err:
+        table.seed_codes()
+    assert "'RJOB' has no network code" in str(err.value)
+
+
+def test_station_table_take_and_sort():
+    """
+    Subsets and sorting always result in new tables.
+    """
+    table = StationTable.from_stations(
+        [_station("BW.RJOB", 1.0), _station("BW.FURT", 2.0),
+         _station("AA.THE", 3.0)])
+    assert StationTable.from_stations(table) is table
+
+    sorted_table = table.sorted_by_id()
+    assert sorted_table.ids == ["AA.THE", "BW.FURT", "BW.RJOB"]
+    np.testing.assert_equal(sorted_table.latitude, [3.0, 2.0, 1.0])
+    assert table.ids == ["BW.RJOB", "BW.FURT", "AA.THE"]
+
+    subset = table.take(np.array([True, False, True]))
+    assert subset.ids == ["BW.RJOB", "AA.THE"]
+    assert table.take([]).values() == []
+
+    # Merging tables applies the conflict policy.
+    other = StationTable.from_stations([_station("BW.FURT", 5.0)])
+    table.extend(other)
+    assert len(table) == 3
+    assert table["BW.FURT"]["latitude"] == 5.0
+
+
+def test_station_table_spatial_queries():
+    """
+    The spatial index follows additions and changed coordinates.
+    """
+    store = StationTable()
+    store.extend([_station("BW.A", 10.0), _station("BW.B", 20.0),
+                  _station("BW.C", -30.0)])
+    assert store.within_radius(15.0, 2.0, 5.0).ids == ["BW.A", "BW.B"]
+    assert store.nearest(-10.0, 2.0, k=2).ids == ["BW.C", "BW.A"]
+    assert store.within_box(-40.0, 15.0, 0.0, 5.0).ids == ["BW.A", "BW.C"]
+
+    store.add(_station("BW.D", 16.0))
+    store.add(_station("BW.A", 40.0))
+    assert store.within_radius(15.0, 2.0, 5.0).ids == ["BW.B", "BW.D"]
+    assert len(store.within_radius(15.0, 2.0, 0.5)) == 0
+
+
+def _event(event_id, origin_time, m_rr, depth_in_km):
+    return {"latitude": 1.0, "longitude": 2.0, "depth_in_km": depth_in_km,
+            "origin_time": obspy.UTCDateTime(origin_time), "m_rr": m_rr,
+            "m_tt": -m_rr, "m_pp": 0.0, "m_rt": 0.0, "m_rp": 0.0,
+            "m_tp": 0.0, "description": None, "_event_id": event_id}
+
+
+def test_event_index_queries():
+    """
+    Ids, origin time, magnitude and depth criteria are intersected.
+    """
+    events = [_event("smi:A", "2012-01-01", 1E18, 10.0),
+              _event("smi:B", "2012-06-01", 1E20, 50.0),
+              _event("smi:C", "2013-01-01", 1E19, 300.0)]
+    events.append(dict(events[0]))
+    del events[-1]["_event_id"]
+    index = EventIndex(events)
+    assert len(index) == 4
+
+    np.testing.assert_equal(index.by_ids(["SMI:a", "smi:C", "smi:X"]), [0, 2])
+    np.testing.assert_equal(index.select(), [0, 1, 2, 3])
+    np.testing.assert_equal(index.select(
+        starttime=obspy.UTCDateTime(2012, 6, 1)), [1, 2])
+    np.testing.assert_equal(index.select(
+        endtime=obspy.UTCDateTime(2012, 6, 1)), [0, 1, 3])
+    np.testing.assert_equal(index.select(min_magnitude=6.0), [1, 2])
+    np.testing.assert_equal(index.select(
+        min_magnitude=6.0, max_depth_in_km=100.0), [1])
+    np.testing.assert_equal(index.select(
+        event_ids=["smi:a", "smi:b"], max_magnitude=6.0), [0])
+    assert len(index.select(min_depth_in_km=1000.0)) == 0
+    assert len(EventIndex([]).select(min_magnitude=1.0)) == 0
+
+
+def test_event_store_index_follows_additions():
+    store = EventStore()
+    store.add(_event("smi:A", "2012-01-01", 1E18, 10.0))
+    index = store.index
+    assert store.index is index
+    store.add(_event("smi:B", "2012-06-01", 1E20, 50.0))
+    assert store.index is not index
+    np.testing.assert_equal(store.index.by_ids(["smi:b"]), [1])
+
+
+def test_event_store_columns():
+    """
+    Events are stored in columns and converted back to dictionaries.
+    """
+    events = [_event("smi:A", "2012-01-01", 1E18, 10.0),
+              _event("smi:B", "2012-06-01T00:00:00.123456789", 1E20, 50.0),
+              _event("smi:C", "2013-01-01", 1E19, 300.0)]
+    del events[2]["_event_id"]
+    store = EventStore.from_events(events)
+    np.testing.assert_equal(store.depth_in_km, [10.0, 50.0, 300.0])
+    assert store.tensor.shape == (3, 6)
+    np.testing.assert_equal(store.origin_time_ns,
+                            [_i["origin_time"].ns for _i in events])
+    assert store.event_ids == ["smi:A", "smi:B", None]
+    assert list(store) == events
+    np.testing.assert_allclose(store.scalar_moments(), [1E18, 1E20, 1E19])
+    np.testing.assert_allclose(store.moment_magnitudes(),
+                               moment_magnitudes(*store.tensor.T))
+
+    columns = event_columns(events)
+    for key, values in store.columns().items():
+        np.testing.assert_equal(columns[key], values)
+
+    subset = store.take([2, 0])
+    assert list(subset) == [events[2], events[0]]
+    assert len(store) == 3
+    with pytest.raises(ValueError):
+        store.take([0, 0])
+
+
+def test_moment_magnitudes():
+    """
+    Vectorized moment magnitudes of whole tensor columns.
+    """
+    magnitudes = moment_magnitudes(
+        np.array([1E19, 0.0]), np.array([-1E19, 0.0]), np.zeros(2),
+        np.zeros(2), np.zeros(2), np.array([0.0, 1E17]))
+    np.testing.assert_allclose(magnitudes, [6.6, 5.27], atol=0.01)
+
+
+def test_duplicate_event_groups():
+    """
+    Events close in time, epicentre and depth are grouped, also in chains.
+    """
+    base = _event("smi:A", "2012-01-01", 1E18, 10.0)
+    events = [
+        base,
+        # Close in time but too far away or too deep.
+        dict(base, latitude=3.0),
+        dict(base, depth_in_km=100.0),
+        # Same earthquake, different agency.
+        dict(base, origin_time=base["origin_time"] + 4.0, latitude=1.2,
+             _event_id="smi:B"),
+        # Only close to the previous one.
+        dict(base, origin_time=base["origin_time"] + 12.0,
+             _event_id="smi:C"),
+        dict(base, origin_time=base["origin_time"] + 30.0)]
+    np.testing.assert_equal(duplicate_event_groups(events),
+                            [0, 1, 2, 0, 0, 5])
+    np.testing.assert_equal(duplicate_event_groups(
+        events, max_time_difference_in_s=5.0), [0, 1, 2, 0, 4, 5])
+    np.testing.assert_equal(duplicate_event_groups(
+        events, max_distance_in_km=400.0, max_depth_difference_in_km=100.0),
+        [0, 0, 0, 0, 0, 5])
+    assert len(duplicate_event_groups([])) == 0
+
+    # The first one is kept unless another one is preferred.
+    assert remove_duplicate_events(events) == \
+        [events[0], events[1], events[2], events[5]]
+    assert remove_duplicate_events(events, preference=["smi:C", "smi:B"]) \
+        == [events[1], events[2], events[4], events[5]]
@@ -0,0 +1,136 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Tests for reading and validating tabular station lists.
+
+:copyright:
+    Lion Krischer (krischer@geophysik.uni-muenchen.de), 2013
+:license:
+    GNU General Public License, Version 3
+    (http://www.gnu.org/copyleft/gpl.html)
+"""
+from wfs_input_generator.input_file_generator import _event_from_dict, \
+    _station_from_dict
+from wfs_input_generator.tables import events_from_dicts, read_table, \
+    station_columns_from_dicts, validate_station_columns
+
+import io
+import numpy as np
+import obspy
+import pytest
+
+
+def _check(result, ids, latitude, longitude, elevation, depth):
+    assert result[0] == ids
+    for column, expected in zip(result[1:], (latitude, longitude, elevation,
+                                             depth)):
+        assert column.dtype == np.float64
+        np.testing.assert_array_equal(column, expected)
+
+
+def test_csv_with_aliases():
+    table = read_table(io.BytesIO(
+        b"id, lat, lon, ele, depth\n"
+        b"BW.FURT, 48.162899, 11.2752, 565.0, 0.0\n"
+        b"BW.RJOB,47.737167,12.795714,860.0,10.5\n"))
+    _check(validate_station_columns(table), ["BW.FURT", "BW.RJOB"],
+           [48.162899, 47.737167], [11.2752, 12.795714], [565.0, 860.0],
+           [0.0, 10.5])
+
+
+def test_npz_and_dictionaries(tmpdir):
+    """
+    npz files and dictionaries may use separate network and station columns
+    and the local depth is optional.
+    """
+    columns = {"network": np.array(["BW", "BW"]),
+               "station": np.array(["FURT", "RJOB"]),
+               "latitude": np.array([48.162899, 47.737167]),
+               "longitude": np.array([11.2752, 12.795714]),
+               "elevation_in_m": np.array([565.0, 860.0])}
+    filename = str(tmpdir.join("stations.npz"))
+    np.savez(filename, **columns)
+    for source in (filename, columns):
+        _check(validate_station_columns(read_table(source)),
+               ["BW.FURT", "BW.RJOB"], [48.162899, 47.737167],
+               [11.2752, 12.795714], [565.0, 860.0], [0.0, 0.0])
+
+
+def test_invalid_columns_raise():
+    valid = {"id": ["BW.FURT", "BW.RJOB"],
+             "lat": [48.162899, 47.737167],
+             "lon": [11.2752, 12.795714],
+             "ele": [565.0, 860.0]}
+    validate_station_columns(read_table(valid))
+
+    def assert_raises(message, **kwargs):
+        columns = dict(valid, **kwargs)
+        columns = dict((k, v) for k, v in columns.items() if v is not None)
+        with pytest.raises(ValueError) as err:
+            validate_station_columns(read_table(columns))
+        assert message in str(err.value)
+
+    assert_raises("need the columns: elevation_in_m", ele=None)
+    assert_raises("same length", ele=[565.0])
+    assert_raises("'latitude' contains values that are not numbers",
+                  lat=["a", "b"])
+    assert_raises("NaN or infinite values (e.g. for station 'BW.RJOB')",
+                  lon=[11.2752, np.nan])
+    assert_raises("'latitude' contains values outside of [-90, 90]",
+                  lat=[48.162899, 91.0])
+    assert_raises("empty values", id=["BW.FURT", ""])
+
+
+def test_station_dicts_are_converted_like_single_ones():
+    stations = [
+        {"id": "BW.FURT", "latitude": "1", "longitude": 2,
+         "elevation_in_m": 3.5, "local_depth_in_m": "4", "other": 1},
+        {"id": u"BW.RJOB", "latitude": 5.0, "longitude": 6.0,
+         "elevation_in_m": 7.0, "local_depth_in_m": None},
+        {"id": 12, "latitude": 5.0, "longitude": 6.0,
+         "elevation_in_m": 7.0, "local_depth_in_m": "A"}]
+    ids, latitude, longitude, elevation, depth = \
+        station_columns_from_dicts(stations)
+    expected = [_station_from_dict(_i) for _i in stations]
+    assert ids == [_i["id"] for _i in expected]
+    assert all(type(_i) == str for _i in ids)
+    assert latitude.tolist() == [_i["latitude"] for _i in expected]
+    assert longitude.tolist() == [_i["longitude"] for _i in expected]
+    assert elevation.tolist() == [_i["elevation_in_m"] for _i in expected]
+    assert depth.tolist() == [4.0, 0.0, 0.0]
+
+
+def test_invalid_dicts_are_reported_at_once():
+    station = {"id": "BW.FURT", "latitude": 1.0, "longitude": 2.0,
+               "elevation_in_m": 3.0}
+    stations = [station, {"id": "BW.A"}, station, {"latitude": 1.0}]
+    with pytest.raises(ValueError) as err:
+        station_columns_from_dicts(stations, offset=10)
+    assert "positions: 11, 13." in str(err.value)
+
+    stations = [dict(station, latitude="A"), station,
+                dict(station, latitude=None)]
+    with pytest.raises(ValueError) as err:
+        station_columns_from_dicts(stations)
+    assert "Could not convert 'latitude' to a float for the dictionaries " \
+        "at the positions: 0, 2." in str(err.value)
+
+
+def test_event_dicts_are_converted_like_single_ones():
+    event = {"latitude": "45.0", "longitude": 12.1, "depth_in_km": 13,
+             "origin_time": "2012-04-12T07:15:48.500000Z",
+             "m_rr": -2.11e+18, "m_tt": -4.22e+19, "m_pp": 4.43e+19,
+             "m_rt": -9.35e+18, "m_rp": -8.38e+18, "m_tp": "-6.44e+18",
+             "description": 1, "other": True}
+    events = [event,
+              dict(event, origin_time=obspy.UTCDateTime(2012, 1, 1),
+                   description=None)]
+    assert events_from_dicts(events) == \
+        [_event_from_dict(_i) for _i in events]
+
+    with pytest.raises(ValueError) as err:
+        events_from_dicts([event, dict(event, m_rr="A"), {}])
+    assert "positions: 2." in str(err.value)
+    with pytest.raises(ValueError) as err:
+        events_from_dicts([event, dict(event, m_rr="A")])
+    assert "'m_rr'" in str(err.value)